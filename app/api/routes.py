@@ -1,42 +1,39 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import AnalysisRequest, AnalysisResponse, FinalResultPayload, EngagementMetrics, ExtractedIntelligence
-from app.controllers.Agents.register import get_or_create_manager, ensure_agent
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.models.schemas import AnalysisRequest, AnalysisResponse, FinalResultPayload, EngagementMetrics, ExtractedIntelligence, EntityCorrelationResponse
+from app.controllers.Agents.register import get_or_create_manager, ensure_agent, refresh_manager_size
 from app.models.context import UserContext
-from app.core.execution_context import session_context
-from app.core.session_intel_store import get_session_intel
-from dotenv import load_dotenv
-load_dotenv()
+from app.core.execution_context import RequestContext, session_context
+from app.core.session_intel_store import get_session_intel, lookup_entity
+from app.core import metrics
+from app.core import tracing
+from app.core.serialization import FastJSONResponse, parse_body, request_body_openapi
+from app.core.config import settings
+from app.core import prefilter
+from app.core import turn_scheduler
+from app.core import circuit_breaker
+from app.core import drain
+from typing import List
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Constants for context keys
-KEY_SESSION_ID = "session_id"
-KEY_MESSAGE_COUNT = "message_count"
-KEY_METADATA = "metadata"
-
-# API Auth
+# API Auth (key registry and rate limits: app/core/auth.py)
 from fastapi import Security, Depends
 from fastapi.security import APIKeyHeader
-import os
+from app.core import auth
 API_KEY_NAME = "x-api-key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
 
 async def get_api_key(api_key: str = Security(api_key_header)):
-    # In production, use a secure comparison or env var
-    # For Hackathon, we can accept any key or a specific one if defined
-    expected_key = os.getenv("API_KEY", "YOUR_SECRET_API_KEY") # Default per doc
-    if api_key != expected_key:
-         raise HTTPException(
-             status_code=403,
-             detail="Could not validate credentials"
-         )
+    # Constant-time check against the registered keys, then the key's rate limit (403 / 429)
+    auth.get_guard().authenticate(api_key)
     return api_key
 
 import asyncio
 import random
+import time
 
 # Timeout for agent response (25 seconds to leave buffer for network latency)
 AGENT_TIMEOUT_SECONDS = 25
@@ -52,68 +49,193 @@ FALLBACK_RESPONSES = [
 
 async def run_agent_with_timeout(agent, user_message: str, timeout: float):
     """Run agent with timeout, return fallback response if timeout occurs."""
+    start = time.perf_counter()
     try:
-        response = await asyncio.wait_for(
-            agent.initiate_agent(user_message, passed_from="user"),
-            timeout=timeout
-        )
+        with tracing.span("initiate_agent", timeout=float(timeout)):
+            response = await asyncio.wait_for(
+                agent.initiate_agent(user_message, passed_from="user"),
+                timeout=timeout
+            )
         return response, False  # response, timed_out
     except asyncio.TimeoutError:
-        logger.warning(f"Agent timed out after {timeout}s, using fallback response")
+        metrics.AGENT_TIMEOUTS.inc()
+        logger.warning("Agent timed out after %ss, using fallback response", timeout)
         return None, True  # response, timed_out
+    finally:
+        metrics.AGENT_LATENCY.observe(time.perf_counter() - start)
+
+def agent_failed(response) -> bool:
+    """
+    True for a response that carries no reply: masai's Agent.initiate_agent catches every
+    exception (a provider 5xx or 429 included) and returns its state with
+    current_node="error" and the error text as the answer.
+    """
+    if isinstance(response, dict):
+        if response.get("current_node") == "error":
+            return True
+        response = response.get("answer")
+    return response is None or not str(response).strip()
+
+
+async def invoke_agent(agent, user_message: str, intel, message_count: int, deadline: float):
+    """
+    Step 5 of a turn: run the agent once the provider's circuit and the turn scheduler
+    allow it. Raises CircuitOpen (fail fast, nothing queued) or TurnTimeout.
+    Returns (response, use_fallback); a failed agent run (agent_failed()) counts against
+    the provider's circuit and gets the fallback reply like a timeout.
+    """
+    breaker = circuit_breaker.AGENT_BREAKER
+    if not breaker.allow():
+        raise circuit_breaker.CircuitOpen(breaker.name)
+    healthy = None  # unknown until the agent call ends
+    try:
+        async with turn_scheduler.admit(intel, message_count, deadline):
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                response, timed_out = await run_agent_with_timeout(agent, user_message, timeout)
+            except Exception:
+                healthy = False
+                raise
+            # A timeout counts against the provider only if the call had a fair share of the
+            # turn budget; a turn that spent most of it queueing says nothing about the provider
+            if not timed_out:
+                healthy = not agent_failed(response)
+                if not healthy:
+                    metrics.AGENT_FAILURES.inc()
+                    logger.warning("Agent run failed, using fallback response: %.200s",
+                                   response.get("answer") if isinstance(response, dict) else response)
+                    response, timed_out = None, True
+            elif timeout >= AGENT_TIMEOUT_SECONDS / 2:
+                healthy = False
+        return response, timed_out
+    finally:
+        if healthy is None:
+            breaker.release()
+        elif healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+async def parse_analysis_request(raw: Request) -> AnalysisRequest:
+    # Raw body -> model in one pydantic-core pass (model_validate_json), instead of
+    # FastAPI's json.loads + per-field validation of a typed body parameter
+    return await parse_body(raw, AnalysisRequest)
 
-@router.post("/analyze", response_model=AnalysisResponse, dependencies=[Depends(get_api_key)])
-async def analyze_message(request: AnalysisRequest):
+
+@router.post(
+    "/analyze",
+    response_model=AnalysisResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(get_api_key)],
+    openapi_extra=request_body_openapi(AnalysisRequest),
+)
+async def analyze_message(request: AnalysisRequest = Depends(parse_analysis_request)):
     """
     Analyze incoming message for scam intent using the HoneyPot Agent.
     """
+    # Draining for shutdown (503), then the per-session rate limit (429), before any agent work
+    drain.ensure_accepting()
+    auth.get_guard().limit_session(request.sessionId)
+    # Root span of the turn; exported per app.core.tracing sampling rules
+    trace = tracing.start_trace()
+    with drain.track_turn(), tracing.span("analyze_message", trace=trace, session_id=request.sessionId,
+                                          message_count=len(request.conversationHistory) + 1):
+        result = await _run_turn(request, trace)
+    # Returned as a Response so FastAPI skips re-validating/encoding through response_model
+    return FastJSONResponse(result.model_dump())
+
+
+def _is_benign_opener(text: str, trace) -> bool:
+    if not settings.PREFILTER_ENABLED:
+        return False
+    classifier = prefilter.get_classifier(settings.PREFILTER_MODEL_PATH)
+    if classifier is None:
+        return False
+    with tracing.span("prefilter", trace=trace):
+        benign = classifier.is_clearly_benign(text)
+    metrics.PREFILTER_DECISIONS.labels("benign" if benign else "escalate").inc()
+    return benign
+
+
+def format_history_line(sender: str, text: str) -> str:
+    """One transcript line of the agent query."""
+    role = "Scammer" if sender == "scammer" else "You (victim)"
+    return f"{role}: {text}"
+
+
+async def _run_turn(request: AnalysisRequest, trace) -> AnalysisResponse:
+    # 1. Create User Context
+    ctx_metadata = request.metadata.model_dump() if request.metadata else {}
+    # Fields were already validated as part of AnalysisRequest
+    ctx = UserContext.model_construct(
+        session_id=request.sessionId,
+        metadata=ctx_metadata
+    )
+    # Every turn re-sends the whole conversation; the WebSocket channel
+    # (app/api/session_channel.py) keeps these lines on the server instead
+    with tracing.span("format_history", trace=trace, messages=len(request.conversationHistory)):
+        history_lines = [format_history_line(msg.sender, msg.text) for msg in request.conversationHistory]
+    return await run_agent_turn(ctx, request.message.text, history_lines, trace)
+
+
+async def run_agent_turn(ctx: UserContext, text: str, history_lines: List[str], trace) -> AnalysisResponse:
+    """Steps 0 and 2-7 of a turn, shared by /analyze and the session channel: agent, context, query, reply."""
     token = None
+    start = time.perf_counter()
     try:
-        # 1. Create User Context
-        ctx_metadata = request.metadata.dict() if request.metadata else {}
-        ctx = UserContext(
-            session_id=request.sessionId,
-            metadata=ctx_metadata
-        )
-        
+        # 0. Clearly benign opener: templated reply, no AgentManager is built
+        if not history_lines and _is_benign_opener(text, trace):
+            return AnalysisResponse(status="success", reply=prefilter.benign_reply())
+
         # 2. Get Manager & Agent
-        agent = ensure_agent("HONEYPOT", ctx)
+        with tracing.span("ensure_agent", trace=trace):
+            agent = ensure_agent("HONEYPOT", ctx)
         
         # 3. Set Execution Context (Inject into ContextVar for Deep Tools)
         # Message count = history + incoming message
-        current_msg_count = len(request.conversationHistory) + 1
+        current_msg_count = len(history_lines) + 1
+        intel = get_session_intel(ctx.session_id)
+        deadline = time.monotonic() + AGENT_TIMEOUT_SECONDS
         
-        token = session_context.set({
-            KEY_SESSION_ID: request.sessionId,
-            KEY_MESSAGE_COUNT: current_msg_count,
-            KEY_METADATA: ctx_metadata,
-            "extracted_intelligence": {},
-            "scam_detected": False
-        })
+        token = session_context.set(RequestContext(
+            session_id=ctx.session_id,
+            message_count=current_msg_count,
+            metadata=ctx.metadata,
+            deadline=deadline,
+            trace=trace,
+            intel=intel,
+        ))
         
         # 4. Construct Query with Full Conversation Context
         # Format history for the agent to understand conversation flow
-        history_context = ""
-        if request.conversationHistory:
-            history_lines = []
-            for msg in request.conversationHistory:
-                role = "Scammer" if msg.sender == "scammer" else "You (victim)"
-                history_lines.append(f"{role}: {msg.text}")
-            history_context = "Previous conversation:\n" + "\n".join(history_lines) + "\n\n"
+        history_start = time.perf_counter()
+        with tracing.span("build_history", messages=len(history_lines)):
+            history_context = ""
+            if history_lines:
+                history_context = "Previous conversation:\n" + "\n".join(history_lines) + "\n\n"
+            
+            # Combine history with current message
+            full_query = f"{history_context}Scammer's latest message: {text}"
+        metrics.HISTORY_BUILD_LATENCY.observe(time.perf_counter() - history_start)
         
-        # Combine history with current message
-        full_query = f"{history_context}Scammer's latest message: {request.message.text}"
-        
-        # 5. Invoke Agent with Timeout
-        response, timed_out = await run_agent_with_timeout(
-            agent, full_query, AGENT_TIMEOUT_SECONDS
-        )
+        # 5. Invoke Agent with Timeout, once the turn scheduler grants an LLM slot
+        # (high-value sessions first when capacity is saturated; queueing counts against the deadline).
+        # While the provider's circuit is open the turn gets a fallback reply at once.
+        try:
+            response, timed_out = await invoke_agent(agent, full_query, intel, current_msg_count, deadline)
+        except circuit_breaker.CircuitOpen:
+            logger.warning("LLM provider circuit open, using fallback response for session %s", ctx.session_id)
+            response, timed_out = None, True
+        except turn_scheduler.TurnTimeout:
+            logger.warning("No LLM slot for session %s before the deadline, using fallback response", ctx.session_id)
+            response, timed_out = None, True
         
         # 6. Parse Response or use fallback
         agent_answer = ""
         if timed_out:
             # Use a random fallback response that sounds like a naive victim
             agent_answer = random.choice(FALLBACK_RESPONSES)
+            metrics.FALLBACK_REPLIES.inc()
         elif isinstance(response, dict):
             agent_answer = response.get("answer", str(response))
         else:
@@ -127,7 +249,8 @@ async def analyze_message(request: AnalysisRequest):
         )
 
     except Exception as e:
-        logger.error(f"Error in /analyze: {e}")
+        logger.error("Error in /analyze: %s", e)
+        metrics.ANALYZE_ERRORS.inc()
         return AnalysisResponse(
             status="error",
             reply=f"Internal Error: {str(e)}"
@@ -136,6 +259,9 @@ async def analyze_message(request: AnalysisRequest):
         # Reset ContextVar to prevent leak across requests
         if token:
             session_context.reset(token)
+            # The turn grew the agent's memory; re-weigh the manager for the cache budget
+            refresh_manager_size(ctx.session_id)
+        metrics.ANALYZE_LATENCY.observe(time.perf_counter() - start)
 
 @router.post("/update-result")
 async def update_result(payload: FinalResultPayload):
@@ -143,6 +269,20 @@ async def update_result(payload: FinalResultPayload):
     Mock endpoint to simulate the mandatory callback to GUVI.
     In production, this logic might be internal or proxy to the actual external API.
     """
-    print(f"Received Final Result Update for Session {payload.sessionId}:")
-    print(payload.dict())
+    logger.info("Received Final Result Update for Session %s: %s", payload.sessionId, payload)
     return {"status": "success", "message": "Result updated successfully"}
+
+@router.get("/intel/entity", response_model=EntityCorrelationResponse, dependencies=[Depends(get_api_key)])
+async def get_entity_correlation(
+    type: str = Query(..., pattern="^(upi|phone|link|bank)$"),
+    value: str = Query(..., min_length=1),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Cross-session correlation: which live sessions reported this UPI ID / phone / link / bank account.
+    The value is normalized the same way as the callback payload before lookup.
+    """
+    result = lookup_entity(type, value, limit=limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Entity not seen in any live session")
+    return result
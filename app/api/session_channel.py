@@ -0,0 +1,204 @@
+"""
+WebSocket session channel: one connection per conversation, deltas only.
+
+/analyze receives the whole conversationHistory on every turn, so payload
+size, validation and formatting grow with the session. On the channel the
+client opens a session once and then sends only the new scammer message; the
+server keeps the transcript (already formatted as agent query lines) and the
+session's user context, and runs the same turn as /analyze
+(routes.run_agent_turn).
+
+Protocol (JSON text frames; auth with the x-api-key header on the handshake):
+
+  -> {"type": "open", "sessionId": "...", "metadata": {...}, "lastSeq": 0,
+      "conversationHistory": [...]}        history only seeds a new transcript
+  <- {"type": "opened", "sessionId": "...", "seq": 3, "replies": [...], "complete": true}
+  -> {"type": "message", "seq": 4, "message": {"sender": "scammer", "text": "...", "timestamp": ...}}
+  <- {"type": "reply", "seq": 4, "status": "success", "reply": "..."}
+  <- {"type": "error", "seq": 4, "code": 409|422|429|503, "detail": "...", ...}
+
+Messages are numbered 1, 2, ... per session. On reconnect the client sends
+"open" with the last seq it has a reply for; the replies it missed (up to
+CHANNEL_REPLAY_WINDOW) come back in "opened" ("complete" is false if some
+were no longer retained). A message with an already processed seq gets the
+stored reply again instead of a second agent turn, so resending after a
+dropped connection is safe. Transcripts outlive connections for
+CHANNEL_TTL_SECONDS. While the server drains for shutdown
+(app/core/drain.py) messages get error 503; the client reconnects to another
+instance and seeds the transcript with conversationHistory.
+
+The handshake takes a token from the API key's bucket like any request, and
+every message frame takes one from both the key's and the session's bucket,
+so neither a long-lived connection nor new session IDs on it get around the
+key's quota.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.routes import API_KEY_NAME, format_history_line, run_agent_turn
+from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+from app.controllers.Agents.utils.memory_budget import SESSION_CACHE_BUDGET
+from app.core import auth, drain, metrics, tracing
+from app.core.config import settings
+from app.core.serialization import dumps_bytes
+from app.models.context import UserContext
+from app.models.schemas import SessionFrame, SessionMessageFrame, SessionOpenFrame
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+CHANNEL_FRAMES = metrics.REGISTRY.counter(
+    "honeypot_channel_frames_total",
+    "Session channel frames by kind (open, resume, message, duplicate, error)", ("kind",))
+CHANNEL_CONNECTIONS = metrics.REGISTRY.gauge("honeypot_channel_connections", "Open session channel WebSockets")
+
+_FRAME = TypeAdapter(SessionFrame)
+
+
+class Transcript:
+    """Server-side state of one conversation on the channel."""
+
+    __slots__ = ("ctx", "lines", "chars", "seq", "replies", "lock")
+
+    def __init__(self, ctx: UserContext, lines: List[str], replay_window: int):
+        self.ctx = ctx
+        self.lines = lines  # agent query lines, as routes.format_history_line() builds them
+        self.chars = sum(len(line) for line in lines)
+        self.seq = 0  # last processed message
+        self.replies: Deque[Dict[str, Any]] = deque(maxlen=replay_window)
+        self.lock = asyncio.Lock()  # one turn at a time, even across a reconnect
+
+    def append(self, line: str) -> None:
+        self.lines.append(line)
+        self.chars += len(line)
+
+    def approx_size(self) -> int:
+        # Cheap estimate for the cache's memory budget: line text (twice: transcript
+        # and the stored replies) plus per-object overhead
+        return 2 * self.chars + 100 * (len(self.lines) + len(self.replies)) + 1024
+
+    def reply_for(self, seq: int) -> Optional[Dict[str, Any]]:
+        for reply in self.replies:
+            if reply["seq"] == seq:
+                return reply
+        return None
+
+    def replies_after(self, seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Retained replies after `seq`, and whether they cover everything the client missed."""
+        missed = [reply for reply in self.replies if reply["seq"] > seq]
+        complete = seq >= self.seq or (bool(missed) and missed[0]["seq"] == seq + 1)
+        return missed, complete
+
+
+_TRANSCRIPTS = TtlLruCache(maxsize=settings.CHANNEL_MAX_SESSIONS, ttl_seconds=settings.CHANNEL_TTL_SECONDS,
+                           budget=SESSION_CACHE_BUDGET)  # sized by Transcript.approx_size()
+metrics.track_cache("channel_transcripts", _TRANSCRIPTS)
+
+
+def _error(code: int, detail: Any, seq: Optional[int] = None, **extra: Any) -> Dict[str, Any]:
+    CHANNEL_FRAMES.labels("error").inc()
+    return {"type": "error", "seq": seq, "code": code, "detail": detail, **extra}
+
+
+async def _send(websocket: WebSocket, frame: Dict[str, Any]) -> None:
+    await websocket.send_text(dumps_bytes(frame).decode())
+
+
+def _open(frame: SessionOpenFrame) -> Tuple[Transcript, Dict[str, Any]]:
+    transcript = _TRANSCRIPTS.get(frame.sessionId)
+    if transcript is None:
+        ctx = UserContext.model_construct(
+            session_id=frame.sessionId,
+            metadata=frame.metadata.model_dump() if frame.metadata else {},
+        )
+        lines = [format_history_line(msg.sender, msg.text) for msg in frame.conversationHistory]
+        transcript = Transcript(ctx, lines, settings.CHANNEL_REPLAY_WINDOW)
+        _TRANSCRIPTS.set(frame.sessionId, transcript)
+        CHANNEL_FRAMES.labels("open").inc()
+    else:
+        CHANNEL_FRAMES.labels("resume").inc()
+    replies, complete = transcript.replies_after(frame.lastSeq)
+    return transcript, {"type": "opened", "sessionId": frame.sessionId, "seq": transcript.seq,
+                        "replies": replies, "complete": complete}
+
+
+async def _turn(transcript: Transcript, frame: SessionMessageFrame, api_key: auth.ApiKey) -> Dict[str, Any]:
+    session_id = transcript.ctx.session_id
+    async with transcript.lock:
+        if frame.seq <= transcript.seq:
+            stored = transcript.reply_for(frame.seq)
+            if stored is None:
+                return _error(409, "Message already processed; its reply is no longer retained", frame.seq)
+            CHANNEL_FRAMES.labels("duplicate").inc()
+            return stored
+        if frame.seq != transcript.seq + 1:
+            return _error(409, "Out-of-order message", frame.seq, expectedSeq=transcript.seq + 1)
+        try:
+            drain.ensure_accepting()
+            guard = auth.get_guard()
+            guard.limit_key(api_key)
+            guard.limit_session(session_id)
+        except HTTPException as e:
+            return _error(e.status_code, e.detail, frame.seq, retryAfter=int(e.headers["Retry-After"]))
+
+        CHANNEL_FRAMES.labels("message").inc()
+        trace = tracing.start_trace()
+        with drain.track_turn(), tracing.span("analyze_message", trace=trace, session_id=session_id,
+                                              message_count=len(transcript.lines) + 1, channel="websocket"):
+            result = await run_agent_turn(transcript.ctx, frame.message.text, transcript.lines, trace)
+        transcript.append(format_history_line(frame.message.sender, frame.message.text))
+        if result.status == "success":
+            transcript.append(format_history_line("user", result.reply))
+        transcript.seq = frame.seq
+        reply = {"type": "reply", "seq": frame.seq, "status": result.status, "reply": result.reply}
+        transcript.replies.append(reply)
+        _TRANSCRIPTS.set(session_id, transcript)  # refresh the TTL
+        return reply
+
+
+@router.websocket("/session")
+async def session_channel(websocket: WebSocket):
+    """Per-conversation channel; see module docstring for the protocol."""
+    try:
+        api_key = auth.get_guard().authenticate(websocket.headers.get(API_KEY_NAME, ""))
+    except HTTPException as e:
+        # Before accept(): the client sees the handshake rejected (HTTP 403)
+        await websocket.close(code=1008 if e.status_code == 403 else 1013, reason=str(e.detail))
+        return
+    await websocket.accept()
+    CHANNEL_CONNECTIONS.inc()
+    transcript: Optional[Transcript] = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            raw = message.get("text") or message.get("bytes") or b""
+            try:
+                frame = _FRAME.validate_json(raw)
+            except ValidationError as e:
+                await _send(websocket, _error(422, e.errors(include_url=False, include_context=False, include_input=False)))
+                continue
+            if isinstance(frame, SessionOpenFrame):
+                transcript, opened = _open(frame)
+                await _send(websocket, opened)
+            elif transcript is None:
+                await _send(websocket, _error(409, "Send an open frame first", frame.seq))
+            else:
+                await _send(websocket, await _turn(transcript, frame, api_key))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        CHANNEL_CONNECTIONS.dec()
+
+
+__all__ = [
+    "router",
+    "Transcript",
+]
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+from functools import partial
 from typing import Any, List
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Importing masai AgentManager (Assuming it's available as per user instruction context)
 # In a real environment, if masai is not installed, this will fail. 
@@ -9,14 +13,14 @@ try:
     from masai.AgentManager.AgentManager import AgentManager, AgentDetails
 except ImportError:
     # Mocking for standalone development if masai is missing
-    print("Warning: masai module not found. Using mocks.")
+    logger.warning("masai module not found. Using mocks.")
     class AgentDetails:
         def __init__(self, capabilities, style, description):
             pass
     class AgentManager:
         def get_agent(self, name): return None
         def create_agent(self, **kwargs): 
-            print(f"[Mock] Creating agent: {kwargs.get('agent_name')}")
+            logger.debug("[Mock] Creating agent: %s", kwargs.get('agent_name'))
             return None
 
 from app.controllers.Agents.HONEYPOT.PROMPTS import (
@@ -27,8 +31,9 @@ from app.controllers.Agents.HONEYPOT.PROMPTS import (
 )
 
 # In a real scenario, we would import tools here. For now, empty list.
-from app.controllers.Agents.Tools.scam_extraction_tools import save_scam_intel
+from app.controllers.Agents.Tools.scam_extraction_tools import asave_scam_intel
 from app.controllers.Agents.Tools.callable_tool import context_tool_callable
+from app.controllers.Agents.utils.provider_proxy import AGENT_ROLES, instrument_agent_roles
 
 
 def create_honeypot_agent(
@@ -45,8 +50,8 @@ def create_honeypot_agent(
     except Exception:
         pass
 
-    # Register Extraction Tool
-    tools: List = [save_scam_intel]
+    # Register Extraction Tool (async-native: masai awaits it on the turn's event loop)
+    tools: List = [asave_scam_intel]
 
     details = AgentDetails(
         capabilities=HONEYPOT_AGENT_CAPABILITIES,
@@ -60,7 +65,8 @@ def create_honeypot_agent(
         memory_order=20, # Priority for recent conversation
         agent_details=details,
         # context_callable=context_tool_callable,
-        callable_config={"router":context_tool_callable, "evaluator":context_tool_callable, "reflector":context_tool_callable, "planner":context_tool_callable},
+        # One callable per role so traces show which role requested the intel summary
+        callable_config={role: partial(context_tool_callable, role=role) for role in AGENT_ROLES},
         long_context=True,
         long_context_order=20, # Priority for retrieved context
         shared_memory_order=3, # Priority for shared context
@@ -68,4 +74,4 @@ def create_honeypot_agent(
         max_tool_output_words=3000
     )
 
-    return manager.get_agent(HONEYPOT_AGENT_NAME)
+    return instrument_agent_roles(manager.get_agent(HONEYPOT_AGENT_NAME))
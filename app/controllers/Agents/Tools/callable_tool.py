@@ -2,22 +2,29 @@
 Context callable for the HoneyPot agent.
 Provides the agent with its own 'memory' of extracted intelligence.
 """
-from app.core.execution_context import get_session_id
+from app.core.execution_context import get_context
 from app.core.session_intel_store import get_session_intel
+from app.core.tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def context_tool_callable(query: str) -> str:
+async def context_tool_callable(query: str, role: str = "") -> str:
     """
     Provides the current state of extracted intelligence for the current session.
     This helps the agent realize what it has already captured so it doesn't repeat itself.
+    `role` is bound per agent role in honeypot_agent.py and only used for tracing.
     """
-    session_id = get_session_id()
-    if not session_id:
+    with span("context_tool_callable", role=role):
+        return _build_intel_summary()
+
+
+def _build_intel_summary() -> str:
+    context = get_context()
+    if not context.session_id:
         return "No session information available."
 
-    intel = get_session_intel(session_id)
+    intel = context.intel if context.intel is not None else get_session_intel(context.session_id)
     
     # Build a single clean string (no trailing commas/tuples)
     context_lines = [
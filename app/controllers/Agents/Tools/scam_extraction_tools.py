@@ -9,16 +9,46 @@ except ImportError:
             return func
         return decorator
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-from app.core.execution_context import get_session_id, get_message_count
-from app.core.session_intel_store import update_session_intel, send_callback_if_ready
+from app.core.execution_context import get_context
+from app.core.session_intel_store import (
+    get_session_intel, intel_delta, note_session_turn, update_session_intel, aupdate_session_intel,
+    send_callback_if_ready, enqueue_callback,
+)
+from app.core import metrics
+from app.core.tracing import traced
+
+REDUNDANT_REPLY = "Nothing new: all of this intelligence is already saved."
+
+
+def _prepare_report(scam_score: Optional[int], **reported: Optional[List[str]]) -> Tuple[str, Dict[str, Any], Dict[str, Any], int, str]:
+    """Shared front half of both tools: (session_id, intel, delta, message_count, agent_notes)."""
+    context = get_context()
+    session_id = context.session_id
+    message_count = context.message_count + 1  # +1 for agent's current turn
+
+    # Determine scam detection based on score threshold
+    scam_detected = scam_score is not None and scam_score > 60
+    agent_notes = f"Scam Score: {scam_score}. Auto-extracted via HoneyPot Agent."
+
+    # Only what the session does not hold yet goes through the merge (the LLM often
+    # re-reports entities it already saved)
+    intel = context.intel if context.intel is not None else get_session_intel(session_id)
+    delta = intel_delta(intel, scam_detected=scam_detected, **reported)
+    metrics.INTEL_TOOL_CALLS.labels("delta" if delta else "redundant").inc()
+    if not delta:
+        note_session_turn(intel, message_count, agent_notes)
+    return session_id, intel, delta, message_count, agent_notes
+
 
 @tool(name = "scam_intel")
+@traced("save_scam_intel")
 def save_scam_intel(
     bank_accounts: Optional[List[str]] = None,
     upi_ids: Optional[List[str]] = None,
@@ -43,32 +73,91 @@ def save_scam_intel(
     Returns:
         Status message confirming save.
     """
-    # Get request context
-    session_id = get_session_id()
-    message_count = get_message_count() + 1  # +1 for agent's current turn
-    
-    # Determine scam detection based on score threshold
-    scam_detected = scam_score is not None and scam_score > 60
-    
+    start = time.perf_counter()
+    session_id, intel, delta, message_count, agent_notes = _prepare_report(
+        scam_score, bank_accounts=bank_accounts, upi_ids=upi_ids, phishing_links=phishing_links,
+        phone_numbers=phone_numbers, suspicious_keywords=suspicious_keywords,
+    )
+    if not delta:
+        # A change deferred by the callback interval still goes out on the next tool call
+        if intel.get("callback_pending"):
+            send_callback_if_ready(session_id, intel)
+        metrics.TOOL_LATENCY.observe(time.perf_counter() - start)
+        return REDUNDANT_REPLY
+
     # Accumulate in Session Store (persists across requests for same session)
     accumulated_intel = update_session_intel(
         session_id=session_id,
-        bank_accounts=bank_accounts,
-        upi_ids=upi_ids,
-        phishing_links=phishing_links,
-        phone_numbers=phone_numbers,
-        suspicious_keywords=suspicious_keywords,
-        scam_detected=scam_detected,
         message_count=message_count,
-        agent_notes=f"Scam Score: {scam_score}. Auto-extracted via HoneyPot Agent."
+        agent_notes=agent_notes,
+        intel=intel,
+        **delta,
     )
     
-    logger.info(f"🚨 INTEL CAPTURED for {session_id}: bank={bank_accounts}, upi={upi_ids}, phone={phone_numbers}")
+    logger.info("🚨 INTEL CAPTURED for %s: %s", session_id, delta)
     
     # Send callback ONLY when conditions are met (significant intel + scam confirmed)
     callback_sent = send_callback_if_ready(session_id, accumulated_intel)
+    metrics.TOOL_LATENCY.observe(time.perf_counter() - start)
     
     if callback_sent:
         return "Intelligence saved and final report sent to central HQ successfully."
     else:
         return "Intelligence captured and accumulated."
+
+
+@tool(name = "scam_intel")
+@traced("save_scam_intel")
+async def asave_scam_intel(
+    bank_accounts: Optional[List[str]] = None,
+    upi_ids: Optional[List[str]] = None,
+    phishing_links: Optional[List[str]] = None,
+    phone_numbers: Optional[List[str]] = None,
+    suspicious_keywords: Optional[List[str]] = None,
+    scam_score: Optional[int] = None
+) -> str:
+    """
+    Use this tool if there is any INTEL to save, else do not use this at all. 
+    Call this tool WHENEVER you identify any of these details in the conversation.
+    Do not call this tool if the info is saved in intel. Always call it to add and update the intel.
+
+    Args:
+        bank_accounts: List of bank account numbers found. (if any)
+        upi_ids: List of UPI IDs found (e.g., name@bank). (if any)
+        phishing_links: List of malicious URLs. (if any)
+        phone_numbers: List of phone numbers extracted. (if any)
+        suspicious_keywords: Key terms used by scammer. (if any)
+        scam_score: Confidence score (0-100) that this is a scam. Use the tool when you can confidently score the scam to be greater than 60.
+    
+    Returns:
+        Status message confirming save.
+    """
+    # Async-native version registered with the agent: the merge runs on the loop (it never
+    # blocks) and the callback is only enqueued, so the tool holds neither the event loop
+    # nor a worker thread while the callback is posted. save_scam_intel is the sync wrapper
+    # kept for the mock agent and legacy callers.
+    start = time.perf_counter()
+    session_id, intel, delta, message_count, agent_notes = _prepare_report(
+        scam_score, bank_accounts=bank_accounts, upi_ids=upi_ids, phishing_links=phishing_links,
+        phone_numbers=phone_numbers, suspicious_keywords=suspicious_keywords,
+    )
+    if not delta:
+        if intel.get("callback_pending"):
+            enqueue_callback(session_id, intel)
+        metrics.TOOL_LATENCY.observe(time.perf_counter() - start)
+        return REDUNDANT_REPLY
+
+    accumulated_intel = await aupdate_session_intel(
+        session_id,
+        message_count=message_count,
+        agent_notes=agent_notes,
+        intel=intel,
+        **delta,
+    )
+    logger.info("🚨 INTEL CAPTURED for %s: %s", session_id, delta)
+    queued = enqueue_callback(session_id, accumulated_intel)
+    metrics.TOOL_LATENCY.observe(time.perf_counter() - start)
+
+    if queued:
+        return "Intelligence saved; the report to central HQ is on its way."
+    return "Intelligence captured and accumulated."
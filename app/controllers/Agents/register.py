@@ -1,64 +1,97 @@
 from __future__ import annotations
-from typing import Callable, Dict, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Any
+import asyncio
 import logging
 
-try:
+if TYPE_CHECKING:
     from masai.AgentManager.AgentManager import AgentManager
-except ImportError:
-    class AgentManager:
-        def __init__(self, **kwargs): 
-            self.agents = {}
-            self.context = kwargs.get('context', {})
-        def create_agent(self, **kwargs):
-            name = kwargs.get('agent_name')
-            print(f"[Mock] Creating agent: {name}")
-            # Minimal mock agent
-            class MockAgent:
-                def __init__(self, name): self.name = name
-                async def initiate_agent(self, query, passed_from=None):
-                    # Simulate tool usage for testing
-                    query_lower = query.lower()
-                    if "bank" in query_lower or "upi" in query_lower:
-                        print(f"[{self.name} Mock Agent] Detected scam potential. *Trigggering save_scam_intel*")
-                        try:
-                            from app.controllers.Agents.Tools.scam_extraction_tools import save_scam_intel
-                            
-                            banks = ["MOCK-BANK-456"] if "bank" in query_lower else []
-                            upis = ["mock@upi"] if "upi" in query_lower else []
-                            
-                            if hasattr(save_scam_intel, 'func'):
-                                save_scam_intel.func(bank_accounts=banks, upi_ids=upis, scam_score=90)
-                            else:
-                                save_scam_intel(bank_accounts=banks, upi_ids=upis, scam_score=90)
-                        except Exception as e:
-                            print(f"[Mock Agent] Tool call failed: {e}")
-                            
-                    return f"[Mock Response from {self.name}] Analysis complete for turn."
-            self.agents[name] = MockAgent(name)
-        def get_agent(self, name):
-            return self.agents.get(name)
-        def cleanup(self):
-            print("[Mock] Cleanup called")
-
-from app.controllers.Agents.HONEYPOT.honeypot_agent import create_honeypot_agent
-from app.controllers.Agents.utils.cleanupAgentResources import _sync_cleanup_wrapper
+
+
+class _MockAgentManager:
+    """Stand-in used when masai is not installed (local development)."""
+    def __init__(self, **kwargs): 
+        self.agents = {}
+        self.context = kwargs.get('context', {})
+    def create_agent(self, **kwargs):
+        name = kwargs.get('agent_name')
+        logger.debug("[Mock] Creating agent: %s", name)
+        # Minimal mock agent
+        class MockAgent:
+            def __init__(self, name): self.name = name
+            async def initiate_agent(self, query, passed_from=None):
+                # Simulate tool usage for testing
+                query_lower = query.lower()
+                if "bank" in query_lower or "upi" in query_lower:
+                    logger.debug("[%s Mock Agent] Detected scam potential. *Triggering save_scam_intel*", self.name)
+                    try:
+                        from app.controllers.Agents.Tools.scam_extraction_tools import save_scam_intel
+
+                        banks = ["MOCK-BANK-456"] if "bank" in query_lower else []
+                        upis = ["mock@upi"] if "upi" in query_lower else []
+
+                        if hasattr(save_scam_intel, 'func'):
+                            save_scam_intel.func(bank_accounts=banks, upi_ids=upis, scam_score=90)
+                        else:
+                            save_scam_intel(bank_accounts=banks, upi_ids=upis, scam_score=90)
+                    except Exception as e:
+                        logger.warning("[Mock Agent] Tool call failed: %s", e)
+
+                return f"[Mock Response from {self.name}] Analysis complete for turn."
+        self.agents[name] = MockAgent(name)
+    def get_agent(self, name):
+        return self.agents.get(name)
+    def cleanup(self):
+        logger.debug("[Mock] Cleanup called")
+
+
+# masai (and through it the LLM SDKs) is imported on first use, not at app import,
+# to keep cold start fast. app.core.warmup pre-imports it in the background.
+_AGENT_MANAGER_CLS: Optional[type] = None
+
+
+def _agent_manager_cls() -> type:
+    global _AGENT_MANAGER_CLS
+    if _AGENT_MANAGER_CLS is None:
+        try:
+            from masai.AgentManager.AgentManager import AgentManager as manager_cls
+        except ImportError:
+            logger.warning("masai module not found. Using mock AgentManager.")
+            manager_cls = _MockAgentManager
+        _AGENT_MANAGER_CLS = manager_cls
+    return _AGENT_MANAGER_CLS
+
+
+from app.controllers.Agents.utils.cleanupAgentResources import _sync_cleanup_wrapper, cleanup_managers
 from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+from app.controllers.Agents.utils.memory_budget import SESSION_CACHE_BUDGET, agent_manager_size
 from app.models.context import UserContext
+from app.core import metrics
 
 logger = logging.getLogger(__name__)
 
 # Agent factories
-AgentFactory = Callable[[AgentManager], Any]
+AgentFactory = Callable[["AgentManager"], Any]
+
+def _create_honeypot_agent(manager: AgentManager) -> Any:
+    # Deferred import: honeypot_agent pulls in masai's tool machinery
+    from app.controllers.Agents.HONEYPOT.honeypot_agent import create_honeypot_agent
+    return create_honeypot_agent(manager)
+
 
 _AGENT_FACTORIES: Dict[str, AgentFactory] = {
-    "HONEYPOT": create_honeypot_agent,
+    "HONEYPOT": _create_honeypot_agent,
 }
 
 _MANAGER_CACHE = TtlLruCache(
     maxsize=100,
     ttl_seconds=3600,
-    cleanup_callback=_sync_cleanup_wrapper  # Centralized cleanup on expiry
+    cleanup_callback=_sync_cleanup_wrapper,  # Centralized cleanup on expiry
+    # Weighted by approximate size (agent memory grows with the transcript); see refresh_manager_size()
+    sizer=agent_manager_size,
+    budget=SESSION_CACHE_BUDGET,
 )
+metrics.track_cache("agent_managers", _MANAGER_CACHE)
+metrics.track_budget(SESSION_CACHE_BUDGET)
 
 
 
@@ -81,6 +114,7 @@ def get_or_create_manager(ctx: UserContext) -> AgentManager:
 
     if manager is None:
         # Create new AgentManager
+        AgentManager = _agent_manager_cls()
         try:
             manager = AgentManager(
                 logging=True,
@@ -95,7 +129,7 @@ def get_or_create_manager(ctx: UserContext) -> AgentManager:
             )
 
         _MANAGER_CACHE.set(key, manager)
-        logger.info(f"Created new AgentManager for session {ctx.session_id}")
+        logger.info("Created new AgentManager for session %s", ctx.session_id)
     else:
         # Keep manager context updated (e.g., new namespaces/features)
         try:
@@ -106,6 +140,11 @@ def get_or_create_manager(ctx: UserContext) -> AgentManager:
     return manager
 
 
+def register_agent_factory(agent_type: str, factory: AgentFactory) -> None:
+    """Register (or replace) the factory used by ensure_agent() for `agent_type`."""
+    _AGENT_FACTORIES[agent_type] = factory
+
+
 def ensure_agent(
     agent_type: str,
     ctx: UserContext,
@@ -129,13 +168,18 @@ def ensure_agent(
 # Maintenance helpers
 # -----------------------------
 
+def refresh_manager_size(session_id: str) -> None:
+    """Re-measure a session's AgentManager after a turn grew its memory (may evict other sessions)."""
+    _MANAGER_CACHE.resize(session_id)
+
+
 def expire_session_manager(session_id: str) -> None:
     """
     Explicitly expire a session's AgentManager from cache.
     """
     key = session_id
     _MANAGER_CACHE.delete(key)
-    logger.info(f"Expired AgentManager for session {session_id}")
+    logger.info("Expired AgentManager for session %s", session_id)
 
 async def cleanup_managers_background_task(interval_seconds: int = 180):
     """
@@ -148,22 +192,34 @@ async def cleanup_managers_background_task(interval_seconds: int = 180):
     The actual cleanup is handled by cleanup_manager_resources() which
     automatically discovers and cleans up all registered resources.
     """
-    logger.info(f"🚀 AgentManager cleanup task started (interval={interval_seconds}s)")
+    logger.info("🚀 AgentManager cleanup task started (interval=%ss)", interval_seconds)
     while True:
         try:
             expired_count = len([k for k, (ts, _) in _MANAGER_CACHE._store.items()
                                 if _MANAGER_CACHE._is_expired(ts)])
             if expired_count > 0:
-                logger.info(f"🧹 Sweeping {expired_count} expired AgentManager(s)...")
+                logger.info("🧹 Sweeping %s expired AgentManager(s)...", expired_count)
             _MANAGER_CACHE.sweep()
         except Exception as e:
-            logger.error(f"❌ Error during cache sweep: {e}")
+            logger.error("❌ Error during cache sweep: %s", e)
         await asyncio.sleep(interval_seconds)
 
 
+async def close_managers(concurrency: int = 8, timeout: float = 10.0) -> Dict[str, int]:
+    """
+    Shutdown: take every AgentManager out of the cache and clean them up with at most
+    `concurrency` in flight (clear() would start all cleanups at once, unawaited).
+    """
+    managers = [manager for _, manager in _MANAGER_CACHE.drain()]
+    return await cleanup_managers(managers, concurrency, timeout)
+
+
 __all__ = [
     "get_or_create_manager",
     "ensure_agent",
+    "refresh_manager_size",
+    "register_agent_factory",
     "expire_user_manager",
     "cleanup_managers_background_task",
+    "close_managers",
 ]
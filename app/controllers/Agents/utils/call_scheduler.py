@@ -0,0 +1,223 @@
+"""
+Provider-call scheduler below the agent layer: cross-session coalescing and
+micro-batching of LLM calls. Off by default (LLM_COALESCE_ENABLED).
+
+RoleModelProxy (and ModelRouter's attempts) submit every provider call here
+instead of awaiting `model.ainvoke()` directly:
+
+- Coalescing: calls with the same call identity (model name + structured
+  output schema) and byte-identical messages share one in-flight provider
+  call; every waiter gets the result (extra waiters get a copy). A waiter
+  timing out or being cancelled leaves the call to the others; when the last
+  waiter leaves, the provider call is cancelled.
+- Micro-batching: unique calls arriving within `window_ms` are flushed
+  together, grouped by identity. A group goes to the provider as one
+  `abatch()` request when the model supports it, otherwise each call is
+  sent on its own `ainvoke()`.
+
+What this buys depends on the call shape. masai formats each prompt into one
+string carrying the wall-clock minute (<TIME>) and the session's history, so
+calls coalesce only when sessions with identical histories call within the
+same minute, and its chat models have no provider-side batch request, so
+nothing is batched. scripts/bench_llm_scheduler.py measures both shapes
+(--shape).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import copy
+import hashlib
+import logging
+import weakref
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+COALESCED_CALLS = metrics.REGISTRY.counter(
+    "honeypot_llm_calls_coalesced_total", "LLM calls answered by an identical in-flight call")
+DISPATCHED_CALLS = metrics.REGISTRY.counter(
+    "honeypot_llm_calls_dispatched_total", "Unique LLM calls sent to providers, by mode (single, batch)", ("mode",))
+BATCH_SIZE = metrics.REGISTRY.histogram(
+    "honeypot_llm_batch_size", "Unique calls per flushed micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64))
+
+CallKey = Tuple[str, str]
+
+
+def message_parts(message: Any) -> Tuple[str, str]:
+    """(role, content) of a langchain message, a {"role", "content"} dict or a plain string."""
+    if isinstance(message, dict):
+        return str(message.get("role", "")), str(message.get("content", ""))
+    content = getattr(message, "content", None)
+    if content is not None:
+        return type(message).__name__, str(content)
+    return "", str(message)
+
+
+def fingerprint(messages: Any) -> str:
+    """Digest of the whole prompt (coalescing key)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for message in messages if isinstance(messages, (list, tuple)) else [messages]:
+        role, content = message_parts(message)
+        digest.update(role.encode() + b"\x00" + content.encode("utf-8", "surrogatepass") + b"\x01")
+    return digest.hexdigest()
+
+
+class _Pending:
+    __slots__ = ("model", "messages", "future", "group", "waiters", "batch", "task")
+
+    def __init__(self, model: Any, messages: Any, future: asyncio.Future, group: str):
+        self.model = model
+        self.messages = messages
+        self.future = future
+        self.group = group  # call identity
+        self.waiters = 0
+        self.batch: List["_Pending"] = [self]  # calls sharing this call's provider request
+        self.task: Optional[asyncio.Task] = None
+
+
+class CallScheduler:
+    """Per-event-loop coalescer/batcher; see module docstring."""
+
+    def __init__(self, window_ms: float = 2.0, max_batch: int = 32):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._inflight: Dict[CallKey, _Pending] = {}
+        self._pending: List[_Pending] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, model: Any, messages: Any, identity: str) -> Any:
+        key = (identity, fingerprint(messages))
+        call = self._inflight.get(key)
+        if call is not None and not call.future.cancelled():
+            COALESCED_CALLS.inc()
+            result = await self._wait(call)
+            try:
+                return copy.deepcopy(result)
+            except Exception:
+                return result
+
+        loop = asyncio.get_running_loop()
+        call = _Pending(model, messages, loop.create_future(), identity)
+        self._inflight[key] = call
+        call.future.add_done_callback(lambda f, key=key: self._done(key, f))
+        self._pending.append(call)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await self._wait(call)
+
+    async def _wait(self, call: _Pending) -> Any:
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if call.waiters == 0:
+                self._abandon(call)
+            raise
+
+    def _abandon(self, call: _Pending) -> None:
+        # Nobody waits for the result any more: drop the call, and its provider request once no
+        # other call in the same request is waited for either
+        call.future.cancel()
+        if call.task is None:
+            if call in self._pending:
+                self._pending.remove(call)
+        elif all(c.future.done() for c in call.batch):
+            call.task.cancel()
+
+    def _done(self, key: CallKey, future: asyncio.Future) -> None:
+        call = self._inflight.get(key)
+        if call is not None and call.future is future:
+            del self._inflight[key]
+        # Mark the exception retrieved: every waiter may already have timed out
+        if not future.cancelled():
+            future.exception()
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        BATCH_SIZE.observe(len(pending))
+        # Same identity = equivalent model config, so any session's model object can carry the
+        # whole group; one provider request per group when the model supports batching
+        groups: Dict[str, List[_Pending]] = {}
+        for call in pending:
+            groups.setdefault(call.group, []).append(call)
+        for calls in groups.values():
+            if len(calls) > 1 and callable(getattr(calls[0].model, "abatch", None)):
+                DISPATCHED_CALLS.labels("batch").inc(len(calls))
+                self._start(calls, self._dispatch_batch(calls))
+            else:
+                DISPATCHED_CALLS.labels("single").inc(len(calls))
+                for call in calls:
+                    self._start([call], self._dispatch_one(call))
+
+    def _start(self, calls: List[_Pending], coro: Any) -> None:
+        task = asyncio.ensure_future(coro)
+        for call in calls:
+            call.batch = calls
+            call.task = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _settle(call: _Pending, result: Any) -> None:
+        if call.future.done():
+            return
+        if isinstance(result, BaseException):
+            call.future.set_exception(result)
+        else:
+            call.future.set_result(result)
+
+    async def _dispatch_one(self, call: _Pending) -> None:
+        try:
+            result = await call.model.ainvoke(call.messages)
+        except Exception as e:
+            result = e
+        self._settle(call, result)
+
+    async def _dispatch_batch(self, calls: List[_Pending]) -> None:
+        try:
+            results = await calls[0].model.abatch([c.messages for c in calls], return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(calls)
+        for call, result in zip(calls, results):
+            self._settle(call, result)
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CallScheduler]" = weakref.WeakKeyDictionary()
+_window_ms = 2.0
+_max_batch = 32
+_enabled = False
+
+
+def configure(enabled: bool = False, window_ms: float = 2.0, max_batch: int = 32) -> None:
+    global _enabled, _window_ms, _max_batch
+    _enabled, _window_ms, _max_batch = enabled, window_ms, max_batch
+    _schedulers.clear()
+
+
+def get_scheduler() -> Optional[CallScheduler]:
+    """Scheduler for the running event loop (futures are loop-bound), or None when disabled."""
+    if not _enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = CallScheduler(_window_ms, _max_batch)
+    return scheduler
+
+
+__all__ = [
+    "message_parts",
+    "fingerprint",
+    "CallScheduler",
+    "configure",
+    "get_scheduler",
+]
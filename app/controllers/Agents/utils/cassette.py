@@ -0,0 +1,311 @@
+"""
+Record/replay of LLM provider calls ("cassettes") at the provider boundary.
+
+RoleModelProxy makes every provider call through the active cassette
+(call()), around its submission to the call scheduler, so coalescing and
+batching behave as in production.
+
+- record: calls go to the provider; each caller's call is appended to the
+  cassette file with its role, the role's base model, the model that served
+  it, the session it was made for, latency and the response it received (or
+  error). Coalesced callers each get a record. A call the caller gave up on
+  (the model router's per-attempt timeout) is recorded as abandoned after
+  the time the caller waited.
+- replay: the provider is not called. A call is answered with the recording
+  for the same role, base model and prompt, after sleeping the recorded
+  latency times `latency_scale`; an abandoned recording then raises
+  asyncio.TimeoutError, so the router falls back as it did when recording
+  whatever the replayed latencies. Sessions often send identical prompts
+  (the same opening message), so the calling session's own recordings of
+  the prompt are served, in recorded order, cycling; other sessions'
+  recordings only when it has none. A prompt that was never recorded (the
+  code under test builds different prompts) gets one of the role's
+  recordings chosen by the prompt digest, so the same prompt always gets the
+  same one whatever order sessions arrive in, unless `strict`, in which case
+  it raises CassetteMiss.
+
+The key is stable across runs of the real agent: the prompt digest is taken
+after removing volatile fields (masai's `<TIME>:...</TIME>`, the wall-clock
+minute; VOLATILE_PROMPT_FIELDS), and the model is the role's configured base
+model, not the tier the model router picked for the call (that depends on
+observed latencies and the session stage).
+
+Cassettes are JSON lines, gzip-compressed when the path ends in .gz; prompts
+are stored as digests only. Responses are kept as JSON: plain values as-is,
+pydantic models as their fields. Replay rebuilds structured output with the
+schema the role's proxy passed to with_structured_output() (masai builds
+its AnswerFormat inside a function, so it cannot be imported by name) and
+other models (langchain messages) from their import path. Anything else is
+replayed as str().
+
+Configured once per process (configure() / configure_from_settings() in the
+lifespan); off by default.
+"""
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Pattern, Tuple
+import asyncio
+import gzip
+import hashlib
+import importlib
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+
+from app.core import metrics
+from app.core.execution_context import get_session_id
+from app.controllers.Agents.utils.call_scheduler import message_parts
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_CALLS = metrics.REGISTRY.counter(
+    "honeypot_cassette_calls_total", "Provider calls served by a cassette (recorded, hit, role_fallback, miss)", ("result",))
+
+FORMAT_VERSION = 2
+
+# (pattern, replacement) applied to prompt text before it is digested
+VOLATILE_PROMPT_FIELDS: List[Tuple[Pattern[str], str]] = [
+    (re.compile(r"<TIME>:.*?</TIME>", re.S), "<TIME>:</TIME>"),  # masai AgentManager prompt template
+]
+
+
+class CassetteMiss(Exception):
+    """Replay found no recording for the call."""
+
+
+class ReplayedProviderError(Exception):
+    """A provider error recorded on the cassette, raised again at replay."""
+
+
+def _model_name(model: Any) -> str:
+    return str(getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__)
+
+
+def prompt_digest(messages: Any) -> str:
+    """Digest of the prompt with VOLATILE_PROMPT_FIELDS blanked (the replay key)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for message in messages if isinstance(messages, (list, tuple)) else [messages]:
+        role, content = message_parts(message)
+        for pattern, replacement in VOLATILE_PROMPT_FIELDS:
+            content = pattern.sub(replacement, content)
+        digest.update(role.encode() + b"\x00" + content.encode("utf-8", "surrogatepass") + b"\x01")
+    return digest.hexdigest()
+
+
+def encode_response(value: Any) -> Dict[str, Any]:
+    model_dump = getattr(value, "model_dump", None)
+    if callable(model_dump):
+        cls = type(value)
+        return {"type": f"{cls.__module__}:{cls.__qualname__}", "json": model_dump(mode="json")}
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return {"text": str(value)}
+    return {"json": value}
+
+
+def decode_response(data: Dict[str, Any], schema: Any = None) -> Any:
+    """Rebuild a recorded response; `schema` is the call's structured-output model, if any."""
+    if "text" in data:
+        return data["text"]
+    path = data.get("type")
+    if path is None:
+        return data["json"]
+    if callable(getattr(schema, "model_validate", None)):
+        return schema.model_validate(data["json"])
+    module, _, qualname = path.partition(":")
+    if "<locals>" in qualname:
+        raise ValueError(f"cannot rebuild {qualname} without its structured-output schema")
+    cls: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        cls = getattr(cls, part)
+    return cls.model_validate(data["json"])
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """One cassette file in record or replay mode; see module docstring."""
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0, strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._file = None
+        self._by_key: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._by_role: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[Any, "itertools.count[int]"] = {}
+        self.recorded = 0
+        if mode == "record":
+            self._file = _open(path, "w")
+            self._file.write(json.dumps({"cassette": FORMAT_VERSION, "recorded_at": time.time()}) + "\n")
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        with _open(self.path, "r") as f:
+            header = json.loads(f.readline())
+            if header.get("cassette") != FORMAT_VERSION:
+                raise ValueError(f"{self.path}: not a version {FORMAT_VERSION} cassette")
+            for line in f:
+                record = json.loads(line)
+                self._by_key[(record["role"], record["model"], record["prompt"])].append(record)
+                self._by_role[record["role"]].append(record)
+        logger.info("Cassette %s: %d recorded calls loaded for replay", self.path,
+                    sum(len(records) for records in self._by_role.values()))
+
+    async def call(self, role: str, model: Any, messages: Any, submit: Callable[[Any, Any], Awaitable[Any]],
+                   base_model: Any = None, schema: Any = None) -> Any:
+        """
+        One provider call for `role`, made by awaiting `submit(model, messages)` (the call scheduler).
+        `model` serves the call; `base_model` (default: model) is the role's configured model, the key.
+        """
+        base = _model_name(model if base_model is None else base_model)
+        session = get_session_id()
+        if self.mode == "replay":
+            return await submit(CassetteModel(self, role, model, base, session, schema), messages)
+        start = time.perf_counter()
+        try:
+            response = await submit(model, messages)
+        except asyncio.CancelledError:
+            # The router's attempt timeout (or the turn) gave up; the scheduler still finishes the call
+            self.record(role, base, session, model, messages, time.perf_counter() - start, abandoned=True)
+            raise
+        except Exception as e:
+            self.record(role, base, session, model, messages, time.perf_counter() - start, error=e)
+            raise
+        self.record(role, base, session, model, messages, time.perf_counter() - start, response)
+        return response
+
+    def record(self, role: str, base_model: str, session: str, model: Any, messages: Any, latency: float,
+               response: Any = None, error: Optional[BaseException] = None, abandoned: bool = False) -> None:
+        record = {"role": role, "model": base_model, "served_by": _model_name(model), "session": session,
+                  "prompt": prompt_digest(messages), "latency": round(latency, 6)}
+        if abandoned:
+            record["abandoned"] = True
+        elif error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        else:
+            record["response"] = encode_response(response)
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self.recorded += 1
+        CASSETTE_CALLS.labels("recorded").inc()
+
+    def _next(self, bucket: Any, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            cursor = self._cursors.get(bucket)
+            if cursor is None:
+                cursor = self._cursors[bucket] = itertools.count()
+            return records[next(cursor) % len(records)]
+
+    def lookup(self, role: str, base_model: str, session: str, messages: Any) -> Dict[str, Any]:
+        key = (role, base_model, prompt_digest(messages))
+        records = self._by_key.get(key)
+        if records:
+            CASSETTE_CALLS.labels("hit").inc()
+            own = [record for record in records if record["session"] == session]
+            if own:
+                return self._next((key, session), own)
+            return self._next(key, records)
+        records = self._by_role.get(role)
+        if self.strict or not records:
+            CASSETTE_CALLS.labels("miss").inc()
+            raise CassetteMiss(f"no recording for {role} call to {base_model} (prompt {key[2]})")
+        CASSETTE_CALLS.labels("role_fallback").inc()
+        # Chosen by the prompt, not by arrival order, so concurrent sessions replay the same way every run
+        return records[int(key[2], 16) % len(records)]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info("Cassette %s: %d calls recorded", self.path, self.recorded)
+
+
+class CassetteModel:
+    """Replay stand-in for a role's model on the way to the call scheduler; delegates everything else."""
+
+    def __init__(self, cassette: Cassette, role: str, inner: Any, base_model: str, session: str = "",
+                 schema: Any = None):
+        self._cassette = cassette
+        self._role = role
+        self._inner = inner
+        self._base_model = base_model
+        self._session = session
+        self._schema = schema
+
+    async def ainvoke(self, messages: Any) -> Any:
+        cassette = self._cassette
+        record = cassette.lookup(self._role, self._base_model, self._session, messages)
+        await asyncio.sleep(record["latency"] * cassette.latency_scale)
+        if record.get("abandoned"):
+            raise asyncio.TimeoutError(f"recorded {self._role} call was abandoned after {record['latency']}s")
+        if "error" in record:
+            raise ReplayedProviderError(record["error"])
+        return decode_response(record["response"], self._schema)
+
+    def __getattr__(self, name: str) -> Any:
+        # Replayed batches run as single calls (the scheduler gathers ainvoke()s)
+        if name == "abatch":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+
+_cassette: Optional[Cassette] = None
+
+
+def configure(mode: str = "", path: str = "", latency_scale: float = 1.0, strict: bool = False) -> Optional[Cassette]:
+    """mode "" disables cassettes; "record" or "replay" needs a path."""
+    global _cassette
+    close()
+    if mode:
+        _cassette = Cassette(path, mode, latency_scale, strict)
+        logger.info("LLM cassette %s mode: %s (latency x%s)", mode, path, latency_scale)
+    return _cassette
+
+
+def configure_from_settings() -> Optional[Cassette]:
+    from app.core.config import settings
+    return configure(settings.LLM_CASSETTE_MODE, settings.LLM_CASSETTE_PATH,
+                     settings.LLM_CASSETTE_LATENCY_SCALE, settings.LLM_CASSETTE_STRICT)
+
+
+def get_cassette() -> Optional[Cassette]:
+    return _cassette
+
+
+def close() -> None:
+    global _cassette
+    if _cassette is not None:
+        _cassette.close()
+        _cassette = None
+
+
+__all__ = [
+    "CassetteMiss",
+    "ReplayedProviderError",
+    "Cassette",
+    "CassetteModel",
+    "VOLATILE_PROMPT_FIELDS",
+    "prompt_digest",
+    "encode_response",
+    "decode_response",
+    "configure",
+    "configure_from_settings",
+    "get_cassette",
+    "close",
+]
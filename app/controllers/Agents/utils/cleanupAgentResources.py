@@ -1,13 +1,14 @@
-try:
-    from masai.AgentManager.AgentManager import AgentManager
-except ImportError:
-    class AgentManager:
-        pass
+from __future__ import annotations
+
 import logging
-from typing import Any, Callable, Dict, List, Optional, Tuple, Protocol
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Protocol
 
 import asyncio
+import time
 
+if TYPE_CHECKING:
+    # Type-only: importing masai at runtime pulls in the LLM SDKs
+    from masai.AgentManager.AgentManager import AgentManager
 
 logger = logging.getLogger(__name__)
 
@@ -51,18 +52,18 @@ async def cleanup_manager_resources(manager: AgentManager) -> None:
             if hasattr(manager, attr_name):
                 resource = getattr(manager, attr_name)
                 if resource and hasattr(resource, 'cleanup') and callable(resource.cleanup):
-                    logger.debug(f"Scheduling cleanup for: {attr_name}")
+                    logger.debug("Scheduling cleanup for: %s", attr_name)
                     cleanup_tasks.append(resource.cleanup())
 
         # Run all cleanups concurrently
         if cleanup_tasks:
             await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-            logger.info(f"✓ Cleaned up {len(cleanup_tasks)} resource(s)")
+            logger.info("✓ Cleaned up %s resource(s)", len(cleanup_tasks))
         else:
             logger.debug("No resources to cleanup")
 
     except Exception as e:
-        logger.error(f"Error during centralized cleanup: {e}")
+        logger.error("Error during centralized cleanup: %s", e)
     
     finally:
         # 3. Explicitly call manager's own cleanup for internal state (agents, context, etc.)
@@ -72,32 +73,94 @@ async def cleanup_manager_resources(manager: AgentManager) -> None:
                 manager.cleanup()
                 logger.info("✓ Cleaned up internal manager state")
             except Exception as e:
-                logger.error(f"Error during manager internal cleanup: {e}")
+                logger.error("Error during manager internal cleanup: %s", e)
 
 
 
 #-------------------------
 # SYNC WRAPPER FOR ASYNC CLEANUP
 #-------------------------
+# Cleanups scheduled from the running loop. The event loop only keeps weak references
+# to tasks, so an unreferenced cleanup could be garbage-collected mid-flight; holding
+# them here also lets shutdown wait for them (await_pending_cleanups()).
+_PENDING_CLEANUPS: Set[asyncio.Task] = set()
+
+
 def _sync_cleanup_wrapper(manager: AgentManager) -> None:
     """
     Synchronous wrapper for async cleanup_manager_resources().
     Required because TtlLruCache.cleanup_callback must be synchronous.
+
+    On the event loop's thread the cleanup is scheduled as a task. Anywhere else
+    (a sync tool in a worker thread evicting under the memory budget, scripts) it
+    runs to completion on a private loop: asyncio.get_event_loop() raises in a
+    thread without a loop, which used to skip the cleanup.
     """
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
             # If event loop is running, schedule as task
-            asyncio.create_task(cleanup_manager_resources(manager))
+            task = loop.create_task(cleanup_manager_resources(manager))
+            _PENDING_CLEANUPS.add(task)
+            task.add_done_callback(_PENDING_CLEANUPS.discard)
         else:
             # If no event loop, run until complete
-            loop.run_until_complete(cleanup_manager_resources(manager))
+            asyncio.run(cleanup_manager_resources(manager))
     except Exception as e:
-        logger.error(f"Error in sync cleanup wrapper: {e}")
+        logger.error("Error in sync cleanup wrapper: %s", e)
+
+
+#-------------------------
+# SHUTDOWN
+#-------------------------
+async def await_pending_cleanups(timeout: float) -> int:
+    """Wait up to `timeout` seconds for cleanups scheduled by _sync_cleanup_wrapper(); returns how many were cancelled."""
+    loop = asyncio.get_running_loop()
+    pending = [task for task in _PENDING_CLEANUPS if task.get_loop() is loop and not task.done()]
+    if not pending:
+        return 0
+    _, still_running = await asyncio.wait(pending, timeout=timeout)
+    for task in still_running:
+        task.cancel()
+    return len(still_running)
+
+
+async def cleanup_managers(managers: Iterable[AgentManager], concurrency: int = 8, timeout: float = 10.0) -> Dict[str, int]:
+    """
+    Clean up `managers` (taken out of the cache with TtlLruCache.drain()) with at most
+    `concurrency` cleanups in flight, plus any cleanups still pending from evictions,
+    within `timeout` seconds. Returns {"cleaned": n, "abandoned": n}.
+    """
+    managers = list(managers)
+    deadline = time.monotonic() + timeout
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def cleanup(manager: AgentManager) -> None:
+        nonlocal done
+        async with semaphore:
+            await cleanup_manager_resources(manager)
+            done += 1
+
+    abandoned = await await_pending_cleanups(timeout)
+    tasks = [asyncio.ensure_future(cleanup(manager)) for manager in managers]
+    if tasks:
+        _, still_running = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+        for task in still_running:
+            task.cancel()
+    abandoned += len(managers) - done
+    if abandoned:
+        logger.warning("Manager cleanup: %d of %d not finished within %ss", abandoned, len(managers), timeout)
+    return {"cleaned": done, "abandoned": abandoned}
 
 
 __all__ = [
     "CleanableResource",
     "cleanup_manager_resources",
     "_sync_cleanup_wrapper",
+    "await_pending_cleanups",
+    "cleanup_managers",
 ]
\ No newline at end of file
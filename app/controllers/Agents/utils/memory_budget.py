@@ -0,0 +1,191 @@
+"""
+Byte accounting for TtlLruCache (ttl_lruCache.py).
+
+- Sizers turn a cached value into an approximate byte count:
+  `deep_sizeof` walks the object graph (bounded, skipping modules, classes,
+  functions and other shared runtime objects); `reported_size` prefers a
+  value's own `approx_size()` estimate and falls back to `deep_sizeof`;
+  `agent_manager_size` estimates an AgentManager from the conversation its
+  role models keep, without walking it (a masai manager reaches far more
+  objects than deep_sizeof's cap, and it is re-measured after every turn).
+- A MemoryBudget is shared by several caches. When their combined bytes go
+  over `max_bytes`, the least recently touched entry across all of them is
+  evicted until the total fits again, so one cache full of large sessions
+  shrinks the others' share instead of the process growing.
+"""
+from __future__ import annotations
+
+from collections import deque
+from types import BuiltinFunctionType, CodeType, FrameType, FunctionType, MethodType, ModuleType
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+import logging
+import sys
+import threading
+
+if TYPE_CHECKING:
+    from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+
+logger = logging.getLogger(__name__)
+
+Sizer = Callable[[Any], int]
+
+# Never counted or followed: shared by every value that references them
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, CodeType, FrameType,
+               type(threading.Lock()), type(threading.RLock()), threading.Thread)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, complex, type(None))
+
+
+def mark_shared_type(cls: type) -> type:
+    """Exclude instances of `cls` (process-wide singletons, pools) from deep_sizeof. Usable as a decorator."""
+    global _SKIP_TYPES
+    if cls not in _SKIP_TYPES:
+        _SKIP_TYPES = _SKIP_TYPES + (cls,)
+    return cls
+
+
+def deep_sizeof(obj: Any, max_objects: int = 5000) -> int:
+    """Approximate bytes reachable from `obj` (each container counted once, at most `max_objects` objects)."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    counted = 0
+    skip = _SKIP_TYPES
+    getsizeof = sys.getsizeof
+    while stack and counted < max_objects:
+        current = stack.pop()
+        counted += 1
+        if isinstance(current, _ATOMIC_TYPES):
+            # Leaves are not de-duplicated: cheaper, and the rare shared string is counted twice
+            total += getsizeof(current)
+            continue
+        if id(current) in seen or isinstance(current, skip):
+            continue
+        seen.add(id(current))
+        try:
+            total += getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(current), "__slots__", ()):
+                value = getattr(current, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+
+# A masai AgentManager with its HONEYPOT agent (role models, prompt templates, tool
+# schemas) before any conversation: 0.43 MB reachable (masai 0.5.2)
+MANAGER_BASE_BYTES = 448 * 1024
+# Per chat_history entry or summary Document besides its text: dict/model, role string
+_MESSAGE_OVERHEAD = 400
+
+
+def _text_size(content: Any) -> int:
+    # getsizeof() of a str is O(1) and accounts for its width (1, 2 or 4 bytes per char)
+    return sys.getsizeof(content) if isinstance(content, str) else sys.getsizeof(str(content))
+
+
+def agent_manager_size(manager: Any) -> int:
+    """
+    Approximate bytes of an AgentManager: MANAGER_BASE_BYTES plus the chat_history and
+    long-context summaries kept by each agent's llm_<role> models. O(messages kept).
+    """
+    total = MANAGER_BASE_BYTES
+    for agent in list(getattr(manager, "agents", {}).values()):
+        for name, llm in list(getattr(agent, "__dict__", {}).items()):
+            if not name.startswith("llm_") or llm is None:
+                continue
+            for message in list(getattr(llm, "chat_history", None) or ()):
+                content = message.get("content", "") if isinstance(message, dict) else getattr(message, "content", message)
+                total += _MESSAGE_OVERHEAD + _text_size(content)
+            for summary in list(getattr(llm, "context_summaries", None) or ()):
+                total += _MESSAGE_OVERHEAD + _text_size(getattr(summary, "page_content", summary))
+    return total
+
+
+def reported_size(value: Any) -> int:
+    """`value.approx_size()` when the value keeps its own estimate, else deep_sizeof(value)."""
+    estimate = getattr(value, "approx_size", None)
+    if callable(estimate):
+        return int(estimate())
+    return deep_sizeof(value)
+
+
+class MemoryBudget:
+    """Byte limit shared by the caches attached to it; see module docstring."""
+
+    def __init__(self, max_bytes: Optional[int] = None, name: str = "default"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self.evictions = 0
+        self._caches: List["TtlLruCache"] = []
+        self._lock = threading.Lock()
+
+    def attach(self, cache: "TtlLruCache") -> None:
+        self._caches.append(cache)
+
+    def configure(self, max_bytes: Optional[int]) -> None:
+        """Set the limit (None: unlimited) and evict down to it right away."""
+        self.max_bytes = max_bytes
+        evicted = self.enforce()
+        if evicted:
+            logger.info("Memory budget %s: evicted %s entries to fit %s bytes", self.name, evicted, max_bytes)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(cache.bytes for cache in self._caches)
+
+    def enforce(self, protect: Optional[tuple] = None) -> int:
+        """
+        Evict globally least recently touched entries until the caches fit in max_bytes.
+        `protect` is (cache, key) of the entry being written, which is never the victim.
+        Returns the number of entries evicted.
+        """
+        if self.max_bytes is None or self.used_bytes <= self.max_bytes:
+            return 0
+        removed = []
+        with self._lock:
+            while self.used_bytes > self.max_bytes:
+                victim = None
+                oldest = None
+                for cache in self._caches:
+                    touched = cache.oldest_touch(protect[1] if protect and protect[0] is cache else None)
+                    if touched is not None and (oldest is None or touched < oldest):
+                        victim, oldest = cache, touched
+                if victim is None:
+                    break
+                entry = victim.pop_oldest(protect[1] if protect and protect[0] is victim else None)
+                if entry is None:
+                    break
+                victim.stats["budget_evictions"] += 1
+                removed.append((victim, entry))
+            self.evictions += len(removed)
+        # Cleanup and listeners run outside the locks (they may write to other caches)
+        for cache, (key, value) in removed:
+            cache.finish_eviction(key, value)
+        return len(removed)
+
+
+# Shared by the per-session caches (agent managers, intel records, channel
+# transcripts); the lifespan sets its limit from settings.CACHE_MEMORY_BUDGET_MB
+SESSION_CACHE_BUDGET = MemoryBudget(name="session_caches")
+
+
+__all__ = [
+    "Sizer",
+    "mark_shared_type",
+    "deep_sizeof",
+    "reported_size",
+    "agent_manager_size",
+    "MANAGER_BASE_BYTES",
+    "MemoryBudget",
+    "SESSION_CACHE_BUDGET",
+]
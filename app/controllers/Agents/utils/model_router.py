@@ -0,0 +1,333 @@
+"""
+Per-role, per-call model routing at the provider boundary.
+
+The "routing" section of model_config/model_config.json defines model tiers
+(model, provider category, latency budget, relative cost) and, per agent role,
+an ordered tier preference that may differ by session stage. For every LLM
+call RoleModelProxy asks ModelRouter for a plan:
+
+- the preferred tier for the role and stage, unless its expected latency
+  (EWMA of observed latency, or its budget before any observation) does not
+  fit in the turn's remaining deadline minus `reserve_ms`, or it is cooling
+  down after being slow or failing;
+- then the remaining tiers, fastest expected first, as fallbacks.
+
+An attempt with a fallback after it gets a timeout of min(budget *
+timeout_factor, remaining time - reserve_ms); a timeout or provider error
+moves on to the next tier while time remains. The last attempt of a plan
+(the only one for a single-tier role) is bounded only by the turn's
+deadline, so a slow but working model is not failed early.
+
+Routing ships disabled ("enabled": false): the tier budgets in
+model_config.json are estimates, not latencies measured against the real
+provider. Measure them (scripts/routing_sim.py shows the effect of a
+configuration) before enabling it.
+Latency observations are shared process-wide per model, since provider
+slowness is not session specific.
+
+Alternative tiers are built from the role's original model by a per-category
+factory (register_model_factory); the default clones the model object and
+swaps its model name.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+from app.core import metrics
+from app.core.tracing import span
+from app.controllers.Agents.utils.memory_budget import mark_shared_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = "model_config/model_config.json"
+
+ROUTED_CALLS = metrics.REGISTRY.counter(
+    "honeypot_model_route_calls_total", "LLM calls by role, tier and outcome (ok, timeout, error)", ("role", "tier", "outcome"))
+ROUTE_FALLBACKS = metrics.REGISTRY.counter(
+    "honeypot_model_route_fallbacks_total", "LLM calls retried on a fallback tier", ("role",))
+
+
+class ModelTier:
+    def __init__(self, name: str, model_name: str, category: str, latency_budget_ms: float, cost: float = 1.0):
+        self.name = name
+        self.model_name = model_name
+        self.category = category
+        self.latency_budget_ms = latency_budget_ms
+        self.cost = cost
+
+    def __repr__(self) -> str:
+        return f"ModelTier({self.name!r}, {self.model_name!r}, budget={self.latency_budget_ms}ms)"
+
+
+class RoutingConfig:
+    def __init__(
+        self,
+        tiers: Dict[str, ModelTier],
+        roles: Dict[str, Dict[str, List[str]]],
+        stages: List[Tuple[str, int]],
+        enabled: bool = True,
+        reserve_ms: float = 2000.0,
+        timeout_factor: float = 2.0,
+        slow_factor: float = 1.5,
+        cooldown_seconds: float = 30.0,
+        failure_threshold: int = 3,
+        ewma_alpha: float = 0.2,
+    ):
+        self.tiers = tiers
+        self.roles = roles  # role -> {"default": [tier, ...], <stage>: [tier, ...]}
+        self.stages = stages  # ordered (stage, max message count); last stage catches the rest
+        self.enabled = enabled
+        self.reserve_ms = reserve_ms
+        self.timeout_factor = timeout_factor
+        self.slow_factor = slow_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.failure_threshold = failure_threshold
+        self.ewma_alpha = ewma_alpha
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RoutingConfig":
+        tiers = {
+            name: ModelTier(name, spec["model_name"], spec.get("category", ""),
+                            float(spec.get("latency_budget_ms", 5000)), float(spec.get("cost", 1.0)))
+            for name, spec in data.get("tiers", {}).items()
+        }
+        roles = {}
+        for role, spec in data.get("roles", {}).items():
+            roles[role] = {stage: [t for t in names if t in tiers] for stage, names in spec.items()}
+        stages = [(name, int(limit)) for name, limit in data.get("stages", {}).items()]
+        return cls(
+            tiers, roles, stages,
+            enabled=bool(data.get("enabled", True)),
+            reserve_ms=float(data.get("reserve_ms", 2000)),
+            timeout_factor=float(data.get("timeout_factor", 2.0)),
+            slow_factor=float(data.get("slow_factor", 1.5)),
+            cooldown_seconds=float(data.get("cooldown_seconds", 30)),
+            failure_threshold=int(data.get("failure_threshold", 3)),
+            ewma_alpha=float(data.get("ewma_alpha", 0.2)),
+        )
+
+    def stage_for(self, message_count: int) -> str:
+        for name, limit in self.stages:
+            if message_count <= limit:
+                return name
+        return self.stages[-1][0] if self.stages else "default"
+
+
+class _LatencyStats:
+    __slots__ = ("ewma", "calls", "failures", "cooldown_until")
+
+    def __init__(self):
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0  # consecutive timeouts/errors
+        self.cooldown_until = 0.0
+
+
+@mark_shared_type  # process-wide; not part of any session's memory
+class ModelRouter:
+    """Chooses tiers per call and tracks observed latency per model."""
+
+    def __init__(self, config: RoutingConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._stats: Dict[str, _LatencyStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, tier: ModelTier) -> _LatencyStats:
+        stats = self._stats.get(tier.model_name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(tier.model_name, _LatencyStats())
+        return stats
+
+    def expected_ms(self, tier: ModelTier) -> float:
+        ewma = self._stats_for(tier).ewma
+        return tier.latency_budget_ms if ewma is None else ewma
+
+    def is_available(self, tier: ModelTier) -> bool:
+        return self._stats_for(tier).cooldown_until <= self._clock()
+
+    def plan(self, role: str, message_count: int, deadline: Optional[float]) -> List[ModelTier]:
+        """Tiers to try in order for one call."""
+        config = self.config
+        spec = config.roles.get(role, {})
+        preferred = spec.get(config.stage_for(message_count)) or spec.get("default") or list(config.tiers)
+        remaining_ms = (deadline - self._clock()) * 1000.0 if deadline is not None else float("inf")
+        fits = [
+            config.tiers[name] for name in preferred
+            if self.is_available(config.tiers[name]) and self.expected_ms(config.tiers[name]) <= remaining_ms - config.reserve_ms
+        ]
+        chosen = fits[:1]
+        # Fallbacks: everything else that is usable, fastest expected first
+        rest = sorted(
+            (t for t in config.tiers.values() if t not in chosen and self.is_available(t)),
+            key=self.expected_ms,
+        )
+        plan = chosen + rest
+        # All tiers cooling down: still try the fastest rather than fail the call
+        return plan or sorted(config.tiers.values(), key=self.expected_ms)[:1]
+
+    def timeout_for(self, tier: ModelTier, deadline: Optional[float], fallback: bool = False) -> Optional[float]:
+        """
+        Per-attempt timeout. With a fallback attempt after this one: the tier's budget times
+        timeout_factor, leaving reserve_ms of the deadline for the fallback. Without: the rest of
+        the deadline (None, no timeout, outside a turn).
+        """
+        remaining = deadline - self._clock() if deadline is not None else None
+        if not fallback:
+            return remaining
+        timeout = tier.latency_budget_ms * self.config.timeout_factor / 1000.0
+        if remaining is not None:
+            timeout = min(timeout, remaining - self.config.reserve_ms / 1000.0)
+        return timeout
+
+    def observe(self, tier: ModelTier, seconds: float, outcome: str = "ok") -> None:
+        """
+        Record one call; outcome is "ok", "timeout" or "error". A tier cools down after
+        `failure_threshold` consecutive failures or when its latency EWMA exceeds budget * slow_factor.
+        """
+        stats = self._stats_for(tier)
+        if outcome != "error":
+            # A fast failure says nothing about latency
+            ms = seconds * 1000.0
+            alpha = self.config.ewma_alpha
+            stats.ewma = ms if stats.ewma is None else (alpha * ms + (1 - alpha) * stats.ewma)
+        stats.calls += 1
+        stats.failures = 0 if outcome == "ok" else stats.failures + 1
+        slow = stats.ewma is not None and stats.ewma > tier.latency_budget_ms * self.config.slow_factor
+        if slow or stats.failures >= self.config.failure_threshold:
+            stats.cooldown_until = self._clock() + self.config.cooldown_seconds
+            stats.failures = 0
+
+    async def ainvoke(self, role: str, model_for: Callable[[ModelTier], Any], messages: Any,
+                      message_count: int, deadline: Optional[float],
+                      call: Optional[Callable[[Any, Any], Awaitable[Any]]] = None) -> Any:
+        """Run one call over the plan; `call(model, messages)` performs an attempt (default model.ainvoke)."""
+        call = call or (lambda model, msgs: model.ainvoke(msgs))
+        plan = self.plan(role, message_count, deadline)
+        last_error: Optional[BaseException] = None
+        for attempt, tier in enumerate(plan):
+            timeout = self.timeout_for(tier, deadline, fallback=attempt < len(plan) - 1)
+            if timeout is not None and timeout <= 0:
+                if attempt < len(plan) - 1:
+                    continue
+                break
+            model = model_for(tier)
+            if model is None:
+                continue
+            if attempt:
+                ROUTE_FALLBACKS.labels(role).inc()
+            start = self._clock()
+            try:
+                shown = None if timeout is None else round(timeout, 3)
+                with span("model_call", tier=tier.name, model=tier.model_name, timeout=shown):
+                    result = await asyncio.wait_for(call(model, messages), timeout=timeout)
+            except asyncio.TimeoutError as e:
+                self.observe(tier, self._clock() - start, "timeout")
+                ROUTED_CALLS.labels(role, tier.name, "timeout").inc()
+                logger.warning("%s call on tier %s timed out after %.1fs", role, tier.name, timeout)
+                last_error = e
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.observe(tier, self._clock() - start, "error")
+                ROUTED_CALLS.labels(role, tier.name, "error").inc()
+                logger.warning("%s call on tier %s failed: %s", role, tier.name, e)
+                last_error = e
+                continue
+            self.observe(tier, self._clock() - start)
+            ROUTED_CALLS.labels(role, tier.name, "ok").inc()
+            return result
+        if last_error is not None:
+            raise last_error
+        raise asyncio.TimeoutError(f"no time left for {role} call")
+
+
+# ============ MODEL FACTORIES ============
+ModelFactory = Callable[[ModelTier, Any], Any]
+
+
+def clone_with_model_name(tier: ModelTier, base: Any) -> Any:
+    """Shallow copy of the role's model with its model name replaced (langchain/masai style objects)."""
+    if hasattr(base, "model_copy"):
+        field = "model" if "model" in getattr(base, "model_fields", {}) else "model_name"
+        return base.model_copy(update={field: tier.model_name})
+    clone = copy.copy(base)
+    for attr in ("model_name", "model"):
+        if isinstance(getattr(clone, attr, None), str):
+            setattr(clone, attr, tier.model_name)
+            return clone
+    return None
+
+
+_FACTORIES: Dict[str, ModelFactory] = {}
+
+
+def register_model_factory(category: str, factory: ModelFactory) -> None:
+    """Build tier models for a provider category (e.g. a fake provider in the simulator)."""
+    _FACTORIES[category] = factory
+
+
+def build_tier_model(tier: ModelTier, base: Any) -> Any:
+    factory = _FACTORIES.get(tier.category, clone_with_model_name)
+    try:
+        return factory(tier, base)
+    except Exception as e:
+        logger.warning("Could not build model for tier %s (%s): %s", tier.name, tier.model_name, e)
+        return None
+
+
+# ============ PROCESS-WIDE ROUTER ============
+_router: Optional[ModelRouter] = None
+_router_loaded = False
+
+
+def load_routing_config(path: str = DEFAULT_CONFIG_PATH, enabled_only: bool = True) -> Optional[RoutingConfig]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f).get("routing")
+    if not data:
+        return None
+    config = RoutingConfig.from_dict(data)
+    return config if (config.enabled or not enabled_only) and config.tiers else None
+
+
+def get_model_router(path: str = DEFAULT_CONFIG_PATH) -> Optional[ModelRouter]:
+    """Router for the app, or None when routing is not configured (calls go to the role's model as before)."""
+    global _router, _router_loaded
+    if not _router_loaded:
+        _router_loaded = True
+        try:
+            config = load_routing_config(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Invalid routing section in %s: %s", path, e)
+            config = None
+        _router = ModelRouter(config) if config is not None else None
+    return _router
+
+
+def set_model_router(router: Optional[ModelRouter]) -> None:
+    """Install a router explicitly (simulator, tests); None disables routing."""
+    global _router, _router_loaded
+    _router, _router_loaded = router, True
+
+
+__all__ = [
+    "ModelTier",
+    "RoutingConfig",
+    "ModelRouter",
+    "ModelFactory",
+    "clone_with_model_name",
+    "register_model_factory",
+    "build_tier_model",
+    "load_routing_config",
+    "get_model_router",
+    "set_model_router",
+]
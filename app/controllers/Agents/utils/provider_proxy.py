@@ -0,0 +1,130 @@
+"""
+Provider-boundary hook for masai agents.
+
+masai builds one MASGenerativeModel per agent role (router, evaluator, reflector,
+planner) and every LLM call of that role goes through `llm_<role>.model.ainvoke()`.
+RoleModelProxy replaces that `.model` attribute so the app can observe each
+provider call per role without patching masai itself. When a ModelRouter is
+configured (model_config.json "routing" section, see model_router.py) async
+calls are routed across model tiers; otherwise they go to the role's model.
+Either way each provider call is submitted through the call scheduler
+(call_scheduler.py) for cross-session coalescing and micro-batching, and
+recorded or replayed when an LLM cassette is active (cassette.py).
+
+instrument_agent_roles also points the provider SDK's HTTP clients at the
+process-wide pools (app/core/http_clients.py), so per-session AgentManagers
+reuse keep-alive connections instead of each opening their own.
+"""
+from typing import Any, Awaitable, Dict, Optional
+
+from app.core.http_clients import share_sdk_clients
+from app.core.execution_context import get_deadline, get_message_count
+from app.core.tracing import span
+from app.controllers.Agents.utils.model_router import ModelRouter, ModelTier, build_tier_model, get_model_router
+from app.controllers.Agents.utils.call_scheduler import get_scheduler
+from app.controllers.Agents.utils.cassette import get_cassette
+
+AGENT_ROLES = ("router", "evaluator", "reflector", "planner")
+
+
+class RoleModelProxy:
+    """Wraps a role's chat model; traces ainvoke()/invoke() and delegates everything else."""
+
+    def __init__(self, role: str, inner: Any, router: Optional[ModelRouter] = None):
+        self._role = role
+        self._inner = inner
+        self._router = router
+        self._tier_models: Dict[str, Any] = {}  # tier name -> model built from inner
+        self._structured_output = None  # (args, kwargs) replayed on tier models
+
+    @property
+    def role(self) -> str:
+        return self._role
+
+    @property
+    def inner(self) -> Any:
+        return self._inner
+
+    def with_structured_output(self, *args, **kwargs) -> "RoleModelProxy":
+        # masai's chat models configure structured output in place and return themselves;
+        # return the proxy so the subsequent ainvoke() still goes through it.
+        self._inner.with_structured_output(*args, **kwargs)
+        self._structured_output = (args, kwargs)
+        for model in self._tier_models.values():
+            if model is not self._inner:
+                model.with_structured_output(*args, **kwargs)
+        return self
+
+    def _model_for(self, tier: ModelTier) -> Any:
+        model = self._tier_models.get(tier.name, False)
+        if model is False:
+            if tier.model_name in (getattr(self._inner, "model", None), getattr(self._inner, "model_name", None)):
+                model = self._inner
+            else:
+                model = build_tier_model(tier, self._inner)
+                if model is not None and self._structured_output is not None:
+                    args, kwargs = self._structured_output
+                    model.with_structured_output(*args, **kwargs)
+            self._tier_models[tier.name] = model
+        return model
+
+    def _schema(self) -> Any:
+        # The structured-output model masai passed to with_structured_output() (its AnswerFormat)
+        if self._structured_output is None:
+            return None
+        args, kwargs = self._structured_output
+        return args[0] if args else kwargs.get("schema")
+
+    def _identity(self, model: Any) -> str:
+        # Calls are interchangeable across sessions only for the same model and output schema
+        name = getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+        return f"{name}|{self._structured_output!r}"
+
+    async def _call(self, model: Any, messages: Any) -> Any:
+        identity = self._identity(model)
+
+        def submit(model: Any, messages: Any) -> Awaitable[Any]:
+            scheduler = get_scheduler()
+            if scheduler is None:
+                return model.ainvoke(messages)
+            return scheduler.submit(model, messages, identity)
+
+        cassette = get_cassette()
+        if cassette is None:
+            return await submit(model, messages)
+        # Keyed on the role's own model: the tier the router picked varies between runs
+        return await cassette.call(self._role, model, messages, submit, base_model=self._inner, schema=self._schema())
+
+    async def ainvoke(self, messages: Any) -> Any:
+        with span(f"agent.{self._role}", role=self._role, model=str(getattr(self._inner, "model", ""))):
+            if self._router is None:
+                return await self._call(self._inner, messages)
+            return await self._router.ainvoke(
+                self._role, self._model_for, messages, get_message_count(), get_deadline(), call=self._call
+            )
+
+    def invoke(self, messages: Any) -> Any:
+        with span(f"agent.{self._role}", role=self._role, model=str(getattr(self._inner, "model", ""))):
+            return self._inner.invoke(messages)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+
+def instrument_agent_roles(agent: Any) -> Any:
+    """Install RoleModelProxy on each role model of a masai agent (idempotent; no-op for mocks)."""
+    for role in AGENT_ROLES:
+        llm = getattr(agent, f"llm_{role}", None)
+        model = getattr(llm, "model", None) if llm is not None else None
+        if model is None or isinstance(model, RoleModelProxy):
+            continue
+        share_sdk_clients(model)
+        llm.model = RoleModelProxy(role, model, router=get_model_router())
+    return agent
+
+
+__all__ = [
+    "AGENT_ROLES",
+    "RoleModelProxy",
+    "instrument_agent_roles",
+]
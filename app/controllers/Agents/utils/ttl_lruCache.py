@@ -1,78 +1,290 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
 import time
 
+if TYPE_CHECKING:
+    from app.controllers.Agents.utils.memory_budget import MemoryBudget
+
+logger = logging.getLogger(__name__)
+
+# Removal reasons passed to listeners registered via add_listener()
+REASON_EXPIRED = "expired"
+REASON_EVICTED = "evicted"
+REASON_DELETED = "deleted"
+REASON_CLEARED = "cleared"
+
 class TtlLruCache:
     """Simple in-process TTL + LRU cache for arbitrary Python objects.
     - Expiration is enforced on get/set; optional sweep() can proactively prune.
-    - LRU is approximated by updating timestamp on get/set and evicting the oldest.
-    - Supports custom cleanup callback for values that don't have cleanup() method.
+    - Entries are kept in last-touch order, so LRU eviction and sweep() only look at
+      the oldest entries (O(1) per removed entry, not a scan of the whole cache).
+    - Supports custom cleanup callback for values that don't have cleanup() method
+      (the callback replaces value.cleanup(); one of them runs per removed value).
+    - Removal listeners (key, value, reason) let other components mirror the cache lifecycle.
+    - With `idle_seconds`, sweep() also reports entries untouched for that long to idle
+      listeners (key, value) once per idle period; they stay cached until the TTL.
+    - With a `sizer` (see memory_budget.py), entries are weighted by approximate bytes:
+      LRU eviction also runs while `bytes` exceeds `max_bytes`, and a shared `budget`
+      evicts across all caches attached to it. Values that grow in place are
+      re-measured with resize().
+    - `stats` keeps plain hit/miss/eviction/expiration counters (read by app.core.metrics).
     """
 
     def __init__(
         self,
         maxsize: int = 100,
         ttl_seconds: int = 1800,
-        cleanup_callback: Optional[Callable[[Any], None]] = None
+        cleanup_callback: Optional[Callable[[Any], None]] = None,
+        idle_seconds: Optional[float] = None,
+        sizer: Optional[Callable[[Any], int]] = None,
+        max_bytes: Optional[int] = None,
+        budget: Optional["MemoryBudget"] = None,
     ):
         self.maxsize = maxsize
         self.ttl = ttl_seconds
+        self.idle_seconds = idle_seconds
         self.cleanup_callback = cleanup_callback
-        self._store: Dict[Any, Tuple[float, Any]] = {}
+        self._store: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        # Keys not yet reported idle, in last-touch order (only with idle_seconds)
+        self._idle_order: "OrderedDict[Any, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Any, Any, str], None]] = []
+        self._idle_listeners: List[Callable[[Any, Any], None]] = []
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "idle": 0,
+                                      "size_evictions": 0, "budget_evictions": 0}
+        if sizer is None and (max_bytes is not None or budget is not None):
+            from app.controllers.Agents.utils.memory_budget import reported_size
+            sizer = reported_size
+        self.sizer = sizer
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.bytes = 0  # approximate bytes of all entries (0 without a sizer)
+        self._sizes: Dict[Any, int] = {}
+        if budget is not None:
+            budget.attach(self)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __contains__(self, key: Any) -> bool:
+        """Whether `key` is held (without touching it or counting a hit/miss)."""
+        return key in self._store
+
+    def add_listener(self, listener: Callable[[Any, Any, str], None]) -> None:
+        """Register a callback invoked as listener(key, value, reason) whenever an entry is removed."""
+        self._listeners.append(listener)
+
+    def add_idle_listener(self, listener: Callable[[Any, Any], None]) -> None:
+        """Register a callback invoked as listener(key, value) when sweep() finds an entry idle."""
+        self._idle_listeners.append(listener)
 
     def _is_expired(self, ts: float) -> bool:
         return (time.time() - ts) > self.ttl
 
+    def _touch(self, key: Any, value: Any, now: float, size: Optional[int] = None) -> None:
+        # Caller holds self._lock
+        if size is not None:
+            self.bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+        self._store[key] = (now, value)
+        self._store.move_to_end(key)
+        if self.idle_seconds is not None:
+            self._idle_order[key] = now
+            self._idle_order.move_to_end(key)
+
+    def _pop(self, key: Any) -> Optional[Tuple[float, Any]]:
+        # Caller holds self._lock
+        self._idle_order.pop(key, None)
+        if self._sizes:
+            self.bytes -= self._sizes.pop(key, 0)
+        return self._store.pop(key, None)
+
+    def _shrink(self, keep: Any) -> List[Tuple[Any, Any]]:
+        # Caller holds self._lock. Evict least recently touched entries (never `keep`)
+        # while over maxsize or max_bytes.
+        evicted = []
+        store = self._store
+        while len(store) > 1 and (len(store) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            keys = iter(store)
+            oldest_key = next(keys)
+            if oldest_key == keep:
+                oldest_key = next(keys)
+            if len(store) <= self.maxsize:
+                self.stats["size_evictions"] += 1
+            evicted.append((oldest_key, self._pop(oldest_key)[1]))
+        return evicted
+
     def get(self, key: Any) -> Any:
-        item = self._store.get(key)
-        if not item:
-            return None
-        ts, value = item
-        if self._is_expired(ts):
-            # Call cleanup if value has cleanup method
-            self._cleanup_value(value)
-            self._store.pop(key, None)
-            return None
-        # touch
-        self._store[key] = (time.time(), value)
-        return value
+        now = time.time()
+        with self._lock:
+            item = self._store.get(key)
+            if not item:
+                self.stats["misses"] += 1
+                return None
+            ts, value = item
+            expired = (now - ts) > self.ttl
+            if expired:
+                self.stats["misses"] += 1
+                self._pop(key)
+            else:
+                # touch
+                self._touch(key, value, now)
+                self.stats["hits"] += 1
+                return value
+        # Call cleanup if value has cleanup method
+        self._cleanup_value(value)
+        self._notify(key, value, REASON_EXPIRED)
+        return None
 
     def set(self, key: Any, value: Any) -> None:
         # prune expired
         self.sweep()
-        # evict if needed
-        if len(self._store) >= self.maxsize:
-            oldest_key = min(self._store.items(), key=lambda kv: kv[1][0])[0]
-            oldest_value = self._store[oldest_key][1]
-            # Call cleanup if value has cleanup method
-            self._cleanup_value(oldest_value)
-            self._store.pop(oldest_key, None)
-        self._store[key] = (time.time(), value)
+        # Measured outside the lock: a sizer may walk the whole value
+        size = self.sizer(value) if self.sizer is not None else None
+        with self._lock:
+            self._touch(key, value, time.time(), size)
+            # evict if needed (the first entry is the least recently touched)
+            evicted = self._shrink(key)
+        for evicted_key, evicted_value in evicted:
+            self.finish_eviction(evicted_key, evicted_value)
+        if self.budget is not None:
+            self.budget.enforce((self, key))
 
-    def delete(self, key: Any) -> None:
+    def resize(self, key: Any) -> Optional[int]:
+        """Re-measure an entry whose value changed in place (without touching it); returns its size."""
+        if self.sizer is None:
+            return None
         item = self._store.get(key)
+        if item is None:
+            return None
+        size = self.sizer(item[1])
+        with self._lock:
+            if key not in self._store:
+                return None
+            self.bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            evicted = self._shrink(key)
+        for evicted_key, evicted_value in evicted:
+            self.finish_eviction(evicted_key, evicted_value)
+        if self.budget is not None:
+            self.budget.enforce((self, key))
+        return size
+
+    def oldest_touch(self, skip: Any = None) -> Optional[float]:
+        """Last-touch time of the least recently touched entry other than `skip` (for MemoryBudget)."""
+        with self._lock:
+            for key, (ts, _) in self._store.items():
+                if key != skip:
+                    return ts
+        return None
+
+    def pop_oldest(self, skip: Any = None) -> Optional[Tuple[Any, Any]]:
+        """Remove the least recently touched entry other than `skip`; the caller must finish_eviction() it."""
+        with self._lock:
+            for key in self._store:
+                if key != skip:
+                    return key, self._pop(key)[1]
+        return None
+
+    def finish_eviction(self, key: Any, value: Any) -> None:
+        # Call cleanup if value has cleanup method
+        self._cleanup_value(value)
+        self._notify(key, value, REASON_EVICTED)
+
+    def delete(self, key: Any) -> None:
+        with self._lock:
+            item = self._pop(key)
         if item:
             # Call cleanup if value has cleanup method
             self._cleanup_value(item[1])
-        self._store.pop(key, None)
+            self._notify(key, item[1], REASON_DELETED)
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Snapshot of (key, value) pairs, least recently touched first; entries are not touched."""
+        with self._lock:
+            return [(key, value) for key, (_, value) in self._store.items()]
+
+    def _take_all(self) -> List[Tuple[Any, Any]]:
+        with self._lock:
+            items = [(key, value) for key, (_, value) in self._store.items()]
+            self._store.clear()
+            self._idle_order.clear()
+            self._sizes.clear()
+            self.bytes = 0
+        return items
 
     def clear(self) -> None:
+        items = self._take_all()
         # Call cleanup on all values
-        for _, value in self._store.values():
+        for _, value in items:
             self._cleanup_value(value)
-        self._store.clear()
+        for key, value in items:
+            self._notify(key, value, REASON_CLEARED)
+
+    def drain(self) -> List[Tuple[Any, Any]]:
+        """
+        Remove every entry WITHOUT running cleanup and return the (key, value) pairs;
+        the caller owns cleaning the values up (e.g. with bounded concurrency at
+        shutdown). Listeners are notified as for clear().
+        """
+        items = self._take_all()
+        for key, value in items:
+            self._notify(key, value, REASON_CLEARED)
+        return items
 
-    def sweep(self) -> None:
-        """Remove all expired entries proactively."""
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """
+        Remove expired entries proactively (at most `limit` per call) and report newly
+        idle entries to idle listeners. Returns the number of entries expired.
+        """
         now = time.time()
-        expired_keys = [k for k, (ts, _) in self._store.items() if (now - ts) > self.ttl]
-        for k in expired_keys:
-            item = self._store.get(k)
-            if item:
-                # Call cleanup if value has cleanup method
-                self._cleanup_value(item[1])
-            self._store.pop(k, None)
+        expired: List[Tuple[Any, Any]] = []
+        idle: List[Tuple[Any, Any]] = []
+        with self._lock:
+            store = self._store
+            while store and (limit is None or len(expired) < limit):
+                key, (ts, value) = next(iter(store.items()))
+                if (now - ts) <= self.ttl:
+                    break
+                self._pop(key)
+                expired.append((key, value))
+            if self.idle_seconds is not None and self._idle_listeners:
+                order = self._idle_order
+                while order and (limit is None or len(idle) < limit):
+                    key, ts = next(iter(order.items()))
+                    if (now - ts) <= self.idle_seconds:
+                        break
+                    order.popitem(last=False)
+                    idle.append((key, store[key][1]))
+        for key, value in expired:
+            # Call cleanup if value has cleanup method
+            self._cleanup_value(value)
+            self._notify(key, value, REASON_EXPIRED)
+        if idle:
+            self.stats["idle"] += len(idle)
+            for key, value in idle:
+                for listener in self._idle_listeners:
+                    try:
+                        listener(key, value)
+                    except Exception as e:
+                        logger.warning("Error in cache idle listener: %s", e)
+        return len(expired)
+
+    def _notify(self, key: Any, value: Any, reason: str) -> None:
+        """Fan out a removal to registered listeners; listener errors never break the cache."""
+        if reason == REASON_EXPIRED:
+            self.stats["expirations"] += 1
+        elif reason == REASON_EVICTED:
+            self.stats["evictions"] += 1
+        for listener in self._listeners:
+            try:
+                listener(key, value, reason)
+            except Exception as e:
+                logger.warning("Error in cache removal listener: %s", e)
 
     def _cleanup_value(self, value: Any) -> None:
         """
@@ -84,26 +296,26 @@ class TtlLruCache:
         - clear() removal of all items
         - sweep() removal of expired items
 
-        Cleanup Order (Dual-Safety):
-        1. FIRST calls `cleanup_callback` (if provided). This allows an external orchestrator
-           (like cleanupAgentResources) to handle complex, async, or aggregated cleanup logic.
-        2. THEN calls `value.cleanup()` (if available). This ensures that even if the callback
-           misses something, the object is given a chance to free its own internal resources.
-        
-        This redundancy ensures "full responsibility" is taken by the cache to free resources,
-        while the callback acts as an enhanced safety layer for external dependencies.
+        Exactly one cleanup runs per removed value:
+        - `cleanup_callback` (if provided) owns the value's whole cleanup. This allows an
+          external orchestrator (like cleanupAgentResources) to handle complex, async, or
+          aggregated cleanup logic; cleanup_manager_resources() calls manager.cleanup()
+          itself, after the external resources are released.
+        - otherwise `value.cleanup()` (if available) frees the object's own resources.
+
+        Calling both ran manager.cleanup() twice per removal, the first time before the
+        manager's external resources were released (scripts/soak_manager_lifecycle.py).
         """
         try:
             if self.cleanup_callback:
                 # Use custom cleanup callback (External Orchestrator)
                 self.cleanup_callback(value)
-            
-            if hasattr(value, 'cleanup') and callable(value.cleanup):
+            elif hasattr(value, 'cleanup') and callable(value.cleanup):
                 # Call value's native cleanup method (Internal Responsibility)
                 value.cleanup()
             
             # else: No cleanup needed - Python's GC handles it
         except Exception as e:
             # Don't fail cache operations due to cleanup errors
-            print(f"Warning: Error during value cleanup: {e}")
+            logger.warning("Error during value cleanup: %s", e)
 
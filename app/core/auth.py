@@ -0,0 +1,234 @@
+"""
+API-key authentication and rate limiting for the public endpoints.
+
+Keys are loaded once (configure_from_settings() in the lifespan, or lazily on
+first use) from API_KEYS, a comma-separated list of
+`name:key[:rate_per_second[:burst]]` entries, plus the legacy single API_KEY. A presented key is looked up by its
+SHA-256 digest and then confirmed with hmac.compare_digest, so the check does
+not leak through timing how much of a key matched.
+
+Every accepted request takes a token from its key's bucket (keys have none
+unless a rate is configured: one key may carry every session), and so does every
+message on a session channel WebSocket (limit_key(), with the key returned at
+the handshake); /analyze and channel messages also take one from the
+session's bucket (so one conversation cannot monopolise a
+key's budget). Either bucket running dry is a 429 with Retry-After, raised
+before any agent work starts. Buckets are __slots__ objects updated in place,
+so an allowed request allocates nothing beyond the key digest. Session buckets
+that have refilled completely carry no state and are pruned when the table is
+full.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import hmac
+import logging
+import math
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+AUTH_DECISIONS = metrics.REGISTRY.counter(
+    "honeypot_auth_decisions_total", "API auth decisions (ok, forbidden, key_limited, session_limited)", ("decision",))
+_OK = AUTH_DECISIONS.labels("ok")
+_FORBIDDEN = AUTH_DECISIONS.labels("forbidden")
+_KEY_LIMITED = AUTH_DECISIONS.labels("key_limited")
+_SESSION_LIMITED = AUTH_DECISIONS.labels("session_limited")
+
+DEFAULT_API_KEY = "YOUR_SECRET_API_KEY"  # per the hackathon doc, when nothing is configured
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at `rate` per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; 0.0 if granted, otherwise seconds until one is available."""
+        tokens = self.tokens + (now - self.updated) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        self.updated = now
+        if tokens >= 1.0:
+            self.tokens = tokens - 1.0
+            return 0.0
+        self.tokens = tokens
+        return (1.0 - tokens) / self.rate
+
+    def full_at(self) -> float:
+        return self.updated + (self.burst - self.tokens) / self.rate
+
+
+class ApiKey:
+    __slots__ = ("name", "digest", "bucket")
+
+    def __init__(self, name: str, key: str, bucket: Optional[TokenBucket]):
+        self.name = name
+        self.digest = hashlib.sha256(key.encode()).digest()
+        self.bucket = bucket
+
+
+def parse_keys(spec: str, rate: float, burst: float) -> Iterable[Tuple[str, str, float, float]]:
+    """Entries of API_KEYS as (name, key, rate, burst); defaults for omitted limits (rate 0: unlimited)."""
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) < 2 or not parts[1]:
+            raise ValueError(f"API_KEYS entry {parts[0]!r} must be name:key[:rate[:burst]]")
+        key_rate = float(parts[2]) if len(parts) > 2 else rate
+        key_burst = float(parts[3]) if len(parts) > 3 else max(burst, key_rate)
+        yield parts[0], parts[1], key_rate, key_burst
+
+
+class ApiGuard:
+    """Key registry plus per-key and per-session token buckets; see module docstring."""
+
+    def __init__(
+        self,
+        keys: Iterable[Tuple[str, str, float, float]],
+        session_rate: float = 1.0,
+        session_burst: float = 5.0,
+        max_sessions: int = 10000,
+        enabled: bool = True,
+        clock=time.monotonic,
+    ):
+        self.enabled = enabled
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        self._clock = clock
+        now = clock()
+        self._keys: Dict[bytes, ApiKey] = {}
+        for name, key, rate, burst in keys:
+            bucket = TokenBucket(rate, burst, now) if enabled and rate > 0 else None
+            api_key = ApiKey(name, key, bucket)
+            self._keys[api_key.digest] = api_key
+        self._sessions: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def authenticate(self, presented: str) -> ApiKey:
+        """The registered key for `presented` (403 if unknown), after taking a token from its bucket."""
+        digest = hashlib.sha256(presented.encode()).digest()
+        api_key = self._keys.get(digest)
+        if api_key is None or not hmac.compare_digest(api_key.digest, digest):
+            _FORBIDDEN.inc()
+            raise HTTPException(status_code=403, detail="Could not validate credentials")
+        self.limit_key(api_key)
+        _OK.inc()
+        return api_key
+
+    def limit_key(self, api_key: ApiKey) -> None:
+        """Take a token from an authenticated key's bucket; 429 if it is empty."""
+        if api_key.bucket is not None:
+            wait = api_key.bucket.take(self._clock())
+            if wait:
+                _KEY_LIMITED.inc()
+                raise _too_many_requests(wait, "API key")
+
+    def limit_session(self, session_id: str) -> None:
+        """Take a token from the session's bucket; 429 if it is empty."""
+        if not self.enabled or self.session_rate <= 0:
+            return
+        now = self._clock()
+        bucket = self._sessions.get(session_id)
+        if bucket is None:
+            with self._lock:
+                if len(self._sessions) >= self.max_sessions:
+                    self._prune(now)
+                bucket = self._sessions.setdefault(
+                    session_id, TokenBucket(self.session_rate, self.session_burst, now))
+        wait = bucket.take(now)
+        if wait:
+            _SESSION_LIMITED.inc()
+            raise _too_many_requests(wait, "session")
+
+    def _prune(self, now: float) -> None:
+        # A full bucket is the same as no bucket; drop those first, then the stalest
+        full = [sid for sid, bucket in self._sessions.items() if bucket.full_at() <= now]
+        for sid in full:
+            del self._sessions[sid]
+        if len(self._sessions) >= self.max_sessions:
+            for sid in sorted(self._sessions, key=lambda s: self._sessions[s].updated)[: self.max_sessions // 10 or 1]:
+                del self._sessions[sid]
+
+    def stats(self) -> Dict[str, int]:
+        return {"keys": len(self._keys), "session_buckets": len(self._sessions)}
+
+
+def _too_many_requests(wait: float, scope: str) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Rate limit exceeded for this {scope}",
+        headers={"Retry-After": str(max(1, math.ceil(wait)))},
+    )
+
+
+# ============ PROCESS-WIDE GUARD ============
+_guard: Optional[ApiGuard] = None
+_guard_lock = threading.Lock()
+
+
+def configure(
+    api_keys: str = "",
+    key_rate: float = 0.0,
+    key_burst: float = 0.0,
+    session_rate: float = 1.0,
+    session_burst: float = 5.0,
+    max_sessions: int = 10000,
+    enabled: bool = True,
+) -> ApiGuard:
+    """Build the process-wide guard from API_KEYS (plus the legacy API_KEY env var)."""
+    global _guard
+    keys = list(parse_keys(api_keys, key_rate, key_burst))
+    legacy = os.getenv("API_KEY") or (None if keys else DEFAULT_API_KEY)
+    if legacy:
+        keys.append(("default", legacy, key_rate, key_burst))
+    guard = ApiGuard(keys, session_rate, session_burst, max_sessions, enabled)
+    with _guard_lock:
+        _guard = guard
+    logger.info("API auth: %s key(s) loaded, rate limiting %s", len(guard), "on" if enabled else "off")
+    return guard
+
+
+def configure_from_settings() -> ApiGuard:
+    from app.core.config import settings
+    return configure(
+        settings.API_KEYS,
+        settings.RATE_LIMIT_KEY_PER_SECOND,
+        settings.RATE_LIMIT_KEY_BURST,
+        settings.RATE_LIMIT_SESSION_PER_SECOND,
+        settings.RATE_LIMIT_SESSION_BURST,
+        settings.RATE_LIMIT_MAX_SESSIONS,
+        settings.RATE_LIMIT_ENABLED,
+    )
+
+
+def get_guard() -> ApiGuard:
+    return _guard if _guard is not None else configure_from_settings()
+
+
+__all__ = [
+    "TokenBucket",
+    "ApiKey",
+    "ApiGuard",
+    "parse_keys",
+    "configure",
+    "configure_from_settings",
+    "get_guard",
+]
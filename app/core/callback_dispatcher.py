@@ -0,0 +1,165 @@
+"""
+Batched, off-request-path dispatcher for per-session background jobs
+(final-result callbacks on session idle/expiry, see session_intel_store.py).
+
+submit() is O(1) and never blocks: it records the job under its key (a later
+submit for the same key replaces the pending job, so a session flushed twice
+before the dispatcher gets to it is sent once, with its latest state) and
+wakes the dispatcher thread. The thread runs its own event loop; every
+`window_seconds` it takes up to `max_batch` pending jobs and runs them with at
+most `concurrency` in flight. Pending jobs beyond `max_pending` are dropped
+and counted, so a burst of expiries cannot grow memory without bound.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+DISPATCHED_JOBS = metrics.REGISTRY.counter(
+    "honeypot_dispatcher_jobs_total", "Background dispatcher jobs by dispatcher and result (done, failed, coalesced, dropped)",
+    ("dispatcher", "result"))
+DISPATCH_BATCH_SIZE = metrics.REGISTRY.histogram(
+    "honeypot_dispatcher_batch_size", "Jobs per dispatched batch", buckets=(1, 4, 16, 64, 256, 1024))
+PENDING_JOBS = metrics.REGISTRY.gauge(
+    "honeypot_dispatcher_pending", "Jobs waiting in a background dispatcher", ("dispatcher",))
+
+Job = Callable[[Any, Any], Awaitable[Any]]
+
+
+class BatchedDispatcher:
+    """Runs job(key, value) for submitted keys on a background event loop; see module docstring."""
+
+    def __init__(
+        self,
+        name: str,
+        job: Job,
+        max_batch: int = 256,
+        concurrency: int = 8,  # httpx async pools lose throughput beyond ~8-10 concurrent requests per host
+        window_seconds: float = 0.05,
+        max_pending: int = 100_000,
+    ):
+        self.name = name
+        self._job = job
+        self.max_batch = max_batch
+        self.concurrency = concurrency
+        self.window = window_seconds
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._stopping = False
+        self._in_flight = 0
+        PENDING_JOBS.labels(name).set_function(lambda: len(self._pending) + self._in_flight)
+
+    def submit(self, key: Any, value: Any) -> bool:
+        """Queue job(key, value); False if the dispatcher is full or closed."""
+        if self._stopping:
+            DISPATCHED_JOBS.labels(self.name, "dropped").inc()
+            return False
+        with self._lock:
+            if key in self._pending:
+                self._pending[key] = value
+                DISPATCHED_JOBS.labels(self.name, "coalesced").inc()
+                return True
+            if len(self._pending) >= self.max_pending:
+                DISPATCHED_JOBS.labels(self.name, "dropped").inc()
+                return False
+            was_empty = not self._pending
+            self._pending[key] = value
+        if not self._started.is_set():
+            self._start()
+        elif was_empty:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def pending(self) -> int:
+        return len(self._pending) + self._in_flight
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"dispatcher-{self.name}", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wake = asyncio.Event()
+        self._started.set()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(key: Any, value: Any) -> None:
+            async with semaphore:
+                try:
+                    await self._job(key, value)
+                    DISPATCHED_JOBS.labels(self.name, "done").inc()
+                except Exception as e:
+                    DISPATCHED_JOBS.labels(self.name, "failed").inc()
+                    logger.warning("%s job for %s failed: %s", self.name, key, e)
+
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    break
+                self._wake.clear()
+                await self._wake.wait()
+                # Let a burst accumulate into one batch
+                await asyncio.sleep(self.window)
+            with self._lock:
+                count = min(self.max_batch, len(self._pending))
+                batch = [self._pending.popitem(last=False) for _ in range(count)]
+                self._in_flight += count
+            if not batch:
+                continue
+            DISPATCH_BATCH_SIZE.observe(len(batch))
+            try:
+                await asyncio.gather(*(run(key, value) for key, value in batch))
+            finally:
+                self._in_flight -= len(batch)
+        await self._on_close()
+
+    async def _on_close(self) -> None:
+        # Release connections opened on this loop
+        try:
+            from app.core.http_clients import get_http_clients
+            await get_http_clients().aclose_loop()
+        except Exception as e:
+            logger.debug("Dispatcher %s: closing HTTP clients failed: %s", self.name, e)
+
+    def close(self, timeout: float = 10.0) -> Dict[str, int]:
+        """Stop accepting jobs, run what is pending for up to `timeout` seconds; report leftovers."""
+        self._stopping = True
+        if self._thread is None:
+            return {"abandoned": 0}
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass  # loop already finished
+        deadline = time.monotonic() + timeout
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        abandoned = self.pending() if self._thread.is_alive() else 0
+        if abandoned:
+            logger.warning("Dispatcher %s closed with %s job(s) not run", self.name, abandoned)
+        return {"abandoned": abandoned}
+
+
+__all__ = [
+    "BatchedDispatcher",
+]
@@ -0,0 +1,177 @@
+"""
+Circuit breakers for the service's two outbound dependencies: the LLM
+provider (agent turns) and the GUVI callback endpoint.
+
+Without them a degraded dependency costs every caller the full timeout
+(AGENT_TIMEOUT_SECONDS for a turn, 5s for a callback POST), and the waiting
+coroutines and their buffers pile up. A breaker counts consecutive failures:
+
+- closed: calls go through. `failure_threshold` failures in a row open it.
+- open: allow() refuses at once (the caller serves a fallback reply, or parks
+  the callback in the outbox) for `recovery_seconds`.
+- half_open: after that, up to `half_open_probes` calls go through as probes.
+  A success closes the circuit; a failure opens it for another
+  `recovery_seconds`.
+
+Every allow() that returned True must be followed by record_success(),
+record_failure() or release() (the call ended without telling anything about
+the dependency, e.g. it was cancelled or never left the process), otherwise a
+half-open probe slot stays taken. Failures reported while the circuit is
+already open (calls started before it tripped) change nothing.
+
+Breakers are shared by all event loops and threads (the callback dispatcher
+posts from its own thread), so state changes take a lock; allow() on a closed
+circuit is a single attribute read.
+"""
+from typing import Callable, Dict
+import logging
+import threading
+import time
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.REGISTRY.gauge(
+    "honeypot_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("circuit",))
+CIRCUIT_TRANSITIONS = metrics.REGISTRY.counter(
+    "honeypot_circuit_transitions_total", "Circuit breaker state changes by the state entered", ("circuit", "state"))
+CIRCUIT_REJECTED = metrics.REGISTRY.counter(
+    "honeypot_circuit_rejected_total", "Calls refused without reaching the dependency", ("circuit",))
+
+
+class CircuitOpen(Exception):
+    """The dependency's circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing; see module docstring."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = True
+        self.state = CLOSED
+        self.failures = 0  # consecutive, while closed
+        self.opened_at = 0.0
+        self._probes = 0  # probes in flight, while half-open
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rejected = CIRCUIT_REJECTED.labels(name)
+        CIRCUIT_STATE.labels(name).set_function(lambda: _STATE_VALUES[self.state])
+
+    def configure(self, failure_threshold: int, recovery_seconds: float, half_open_probes: int = 1,
+                  enabled: bool = True) -> None:
+        """Apply settings and close the circuit (lifespan startup)."""
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.recovery_seconds = recovery_seconds
+            self.half_open_probes = half_open_probes
+            self.enabled = enabled
+            self.state = CLOSED
+            self.failures = self._probes = 0
+
+    def _enter(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+        if state == OPEN:
+            self.opened_at = self._clock()
+            logger.warning("Circuit %s opened for %ss", self.name, self.recovery_seconds)
+        else:
+            logger.info("Circuit %s %s", self.name, "half-open, probing" if state == HALF_OPEN else "closed")
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 when not open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_seconds - self._clock())
+
+    def accepting(self) -> bool:
+        """Whether allow() could grant a call now; takes nothing (used to decide when to retry parked work)."""
+        if not self.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.retry_after() <= 0.0
+        return self._probes < self.half_open_probes
+
+    def allow(self) -> bool:
+        """Take a call; False means fail fast. See the module docstring for what must follow a True."""
+        if not self.enabled or self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0.0:
+                self._enter(HALF_OPEN)
+                self._probes = 0
+            if self.state == CLOSED or (self.state == HALF_OPEN and self._probes < self.half_open_probes):
+                if self.state == HALF_OPEN:
+                    self._probes += 1
+                return True
+        self._rejected.inc()
+        return False
+
+    def record_success(self) -> None:
+        if self.state == CLOSED:
+            self.failures = 0
+            return
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._enter(CLOSED)
+                self.failures = self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == CLOSED:
+                self.failures += 1
+                if self.enabled and self.failures >= self.failure_threshold:
+                    self._enter(OPEN)
+            elif self.state == HALF_OPEN:
+                self._probes = 0
+                self._enter(OPEN)
+
+    def release(self) -> None:
+        if self.state != HALF_OPEN:
+            return
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+
+AGENT_BREAKER = CircuitBreaker("llm_provider")
+CALLBACK_BREAKER = CircuitBreaker("guvi_callback", recovery_seconds=15.0)
+
+
+def configure_from_settings() -> None:
+    from app.core.config import settings
+    AGENT_BREAKER.configure(settings.AGENT_CIRCUIT_FAILURES, settings.AGENT_CIRCUIT_RECOVERY_SECONDS,
+                            enabled=settings.CIRCUIT_BREAKERS_ENABLED)
+    CALLBACK_BREAKER.configure(settings.CALLBACK_CIRCUIT_FAILURES, settings.CALLBACK_CIRCUIT_RECOVERY_SECONDS,
+                               enabled=settings.CIRCUIT_BREAKERS_ENABLED)
+
+
+def snapshot() -> Dict[str, str]:
+    return {breaker.name: breaker.state for breaker in (AGENT_BREAKER, CALLBACK_BREAKER)}
+
+
+__all__ = [
+    "CLOSED",
+    "HALF_OPEN",
+    "OPEN",
+    "CircuitOpen",
+    "CircuitBreaker",
+    "AGENT_BREAKER",
+    "CALLBACK_BREAKER",
+    "configure_from_settings",
+    "snapshot",
+]
@@ -1,6 +1,10 @@
 import os
+from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
+# Populate os.environ once for modules that read it directly (API_KEY, masai's provider keys)
+load_dotenv()
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "HackathonScam Honey-Pot"
     API_V1_STR: str = "/api/v1"
@@ -9,6 +13,121 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
 
+    # Cold start: defer heavy imports (masai/LLM SDKs) and pre-warm them in the
+    # background once the server is up, instead of importing before serving.
+    FAST_START: bool = False
+
+    # Tracing (see app/core/tracing.py)
+    TRACING_ENABLED: bool = True
+    # Export file for sampled traces; empty exports nothing. Must be an absolute path
+    # (up to (TRACE_EXPORT_BACKUPS + 1) * TRACE_EXPORT_MAX_BYTES on disk).
+    TRACE_EXPORT_PATH: str = ""
+    TRACE_SAMPLE_RATE: float = 0.01  # fraction of turns exported regardless of duration
+    TRACE_SLOW_SECONDS: float = 10.0  # turns slower than this are always exported
+    TRACE_EXPORT_MAX_BYTES: int = 50 * 2**20  # rotate the export file at this size; 0 never rotates
+    TRACE_EXPORT_BACKUPS: int = 3  # rotated files kept (<path>.1 ... <path>.N)
+    TRACE_EXPORT_QUEUE_SIZE: int = 1000  # traces waiting for the writer thread; more are dropped
+
+    # Pre-classifier: answer clearly benign first messages without building an agent
+    # (see app/core/prefilter.py; disabled automatically if the model file is missing)
+    PREFILTER_ENABLED: bool = True
+    PREFILTER_MODEL_PATH: str = "model_config/prefilter_model.json"
+
+    # Provider-call scheduler: coalesce identical LLM calls across sessions and
+    # micro-batch the rest (see app/controllers/Agents/utils/call_scheduler.py).
+    # Off by default: masai's single-string prompts rarely coalesce and its models
+    # cannot batch, so for the real agent it only adds LLM_BATCH_WINDOW_MS per call
+    LLM_COALESCE_ENABLED: bool = False
+    LLM_BATCH_WINDOW_MS: float = 2.0
+    LLM_MAX_BATCH: int = 32
+
+    # LLM cassettes (see app/controllers/Agents/utils/cassette.py): "record" writes every
+    # provider call to LLM_CASSETTE_PATH, "replay" answers from it with no provider
+    # calls (recorded latencies times LLM_CASSETTE_LATENCY_SCALE). "" disables.
+    LLM_CASSETTE_MODE: str = ""
+    LLM_CASSETTE_PATH: str = ""
+    LLM_CASSETTE_LATENCY_SCALE: float = 1.0
+    LLM_CASSETTE_STRICT: bool = False  # replay: unknown prompts fail instead of reusing the role's recordings
+
+    # Agent turn admission (see app/core/turn_scheduler.py): at most this many turns
+    # run the agent at once, waiting turns ranked by session value. 0 disables.
+    # TURN_PRIORITY_AGING > 0 also bounds how long a turn can be overtaken (1 / aging seconds).
+    LLM_TURN_CONCURRENCY: int = 64
+    TURN_PRIORITY_AGING: float = 0.0
+
+    # Circuit breakers (see app/core/circuit_breaker.py): after this many consecutive
+    # failures (timeouts, errors, 5xx) turns get the fallback reply at once and callbacks
+    # wait in the outbox; one probe call goes through every RECOVERY_SECONDS
+    CIRCUIT_BREAKERS_ENABLED: bool = True
+    AGENT_CIRCUIT_FAILURES: int = 5
+    AGENT_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    CALLBACK_CIRCUIT_FAILURES: int = 5
+    CALLBACK_CIRCUIT_RECOVERY_SECONDS: float = 15.0
+
+    # Health and readiness (see app/core/health.py): /readyz answers 503 while a threshold
+    # is exceeded, and 200 again once every reading is under READY_RECOVERY_RATIO of its
+    # threshold. READY_MAX_TURN_QUEUE 0, READY_MAX_FALLBACK_RATE 1.0 and
+    # READY_MAX_CACHE_UTILIZATION 0 disable their check.
+    HEALTH_SAMPLE_INTERVAL_SECONDS: float = 0.5
+    HEALTH_RATE_WINDOW_SECONDS: float = 30.0  # window of the timeout / fallback rates
+    READY_MAX_LOOP_LAG_MS: float = 200.0
+    READY_MAX_TURN_QUEUE: int = 64  # turns waiting for an LLM slot
+    READY_MAX_FALLBACK_RATE: float = 0.5  # of the window's turns; ignored while the provider circuit is open
+    READY_MIN_WINDOW_TURNS: int = 20  # fewer turns in the window: fallback rate not judged
+    READY_MAX_CACHE_UTILIZATION: float = 0.0  # entries / maxsize or bytes / budget of the session caches
+    READY_RECOVERY_RATIO: float = 0.8
+
+    # Session intel store sweep: TTL expiry and idle detection for final callbacks
+    # (idle threshold: SESSION_IDLE_SECONDS, read by app/core/session_intel_store.py)
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 5.0
+    FINAL_CALLBACK_DRAIN_SECONDS: float = 10.0  # shutdown budget for queued final callbacks
+
+    # Graceful drain on shutdown (see app/core/drain.py): new turns get 503, running
+    # turns get DRAIN_TIMEOUT_SECONDS to finish (a full agent turn is 25s), then
+    # callbacks are flushed and AgentManagers cleaned up with bounded concurrency
+    DRAIN_TIMEOUT_SECONDS: float = 30.0
+    DRAIN_CLEANUP_CONCURRENCY: int = 8
+    DRAIN_CLEANUP_SECONDS: float = 10.0
+
+    # API keys and rate limits (see app/core/auth.py). API_KEYS: comma-separated
+    # name:key[:rate_per_second[:burst]]; the legacy API_KEY env var is also accepted.
+    # Per-key limits are off by default (rate 0): the evaluation platform drives every
+    # session with one key. To cap a key, size it from its peak traffic: concurrent
+    # sessions / seconds between a session's messages (500 sessions at one message per
+    # 5s = 100/s), with headroom, and a burst of at least the sessions that can send at once
+    API_KEYS: str = ""
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_KEY_PER_SECOND: float = 0.0  # 0 = unlimited; API_KEYS entries can set their own
+    RATE_LIMIT_KEY_BURST: float = 0.0
+    RATE_LIMIT_SESSION_PER_SECOND: float = 1.0  # a conversation turn every second is already fast
+    RATE_LIMIT_SESSION_BURST: float = 5.0
+    RATE_LIMIT_MAX_SESSIONS: int = 10000  # session buckets kept before idle ones are pruned
+
+    # Shared byte budget of the per-session caches (agent managers, intel records,
+    # channel transcripts); least recently used sessions are evicted beyond it. 0 disables.
+    CACHE_MEMORY_BUDGET_MB: float = 256.0
+
+    # WebSocket session channel (see app/api/session_channel.py)
+    CHANNEL_MAX_SESSIONS: int = 1000  # transcripts kept for resume, LRU beyond this
+    CHANNEL_TTL_SECONDS: int = 3600
+    CHANNEL_REPLAY_WINDOW: int = 16  # replies kept per session for resume / resent messages
+
+    # Outbound HTTP connection pools (see app/core/http_clients.py)
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_PER_HOST: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP2_ENABLED: bool = True  # used only when the h2 package is installed
+    HTTP_DNS_TTL_SECONDS: float = 60.0  # 0 disables the DNS cache
+
+    # Logging (see app/core/logging_config.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_ASYNC: bool = True  # queue + writer thread; false writes synchronously on the caller
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped, never block
+    LOG_RATE_LIMIT_BURST: int = 20  # per logger/level/message template per window; 0 disables
+    LOG_RATE_LIMIT_WINDOW_SECONDS: float = 10.0
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,164 @@
+"""
+Graceful drain for rolling restarts.
+
+The lifespan shutdown (app/main.py) runs shutdown(), which goes through these
+stages in order, each with its own budget:
+
+1. stop admitting turns: /analyze answers 503 with Retry-After and the
+   session channel an error frame with code 503 (ensure_accepting()), so a
+   load balancer or client retries on another replica;
+2. wait up to DRAIN_TIMEOUT_SECONDS for the turns already running
+   (track_turn()) to finish; their replies still go out;
+3. stop the session sweep and queue a final callback for every live session
+   whose latest intel was not sent yet (the intel store lives only in this
+   process), then post the callbacks queued in the dispatchers and the
+   outbox within FINAL_CALLBACK_DRAIN_SECONDS;
+4. clean up the cached AgentManagers, at most DRAIN_CLEANUP_CONCURRENCY at
+   once, together with cleanups that cache evictions scheduled earlier,
+   within DRAIN_CLEANUP_SECONDS.
+
+What could not finish in time is counted per stage, logged and returned.
+
+uvicorn itself stops accepting connections and waits for running HTTP
+requests before it starts the lifespan shutdown (up to
+--timeout-graceful-shutdown, when set). Session channel turns, requests
+cancelled by that timeout, and other servers are covered by stage 2. Calling
+begin() earlier, from a pre-stop hook, makes readiness fail before the
+process is signalled.
+"""
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_SECONDS = 5
+
+_draining = False
+_in_flight = 0
+
+DRAIN_REJECTED = metrics.REGISTRY.counter(
+    "honeypot_drain_rejected_total", "Turns refused with 503 because the process is draining")
+metrics.REGISTRY.gauge("honeypot_draining", "1 while the process drains for shutdown", func=lambda: int(_draining))
+metrics.REGISTRY.gauge("honeypot_turns_in_flight", "Agent turns running (drain waits for them)", func=lambda: _in_flight)
+
+
+def begin() -> None:
+    """Stop admitting new turns (idempotent)."""
+    global _draining
+    if not _draining:
+        _draining = True
+        logger.info("Draining: new turns are refused, %d in flight", _in_flight)
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def in_flight() -> int:
+    return _in_flight
+
+
+def reset() -> None:
+    """Admit turns again (a new lifespan in the same process, e.g. tests and benchmarks)."""
+    global _draining
+    _draining = False
+
+
+def ensure_accepting() -> None:
+    """Raise 503 with Retry-After while draining."""
+    if _draining:
+        DRAIN_REJECTED.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down; retry on another instance",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+
+@contextmanager
+def track_turn() -> Iterator[None]:
+    """Count the block as an in-flight turn that shutdown waits for."""
+    global _in_flight
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+
+
+async def wait_for_turns(timeout: float, poll_seconds: float = 0.05) -> int:
+    """Wait until no turn is in flight or `timeout` passes; returns the turns still running."""
+    deadline = time.monotonic() + timeout
+    while _in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(poll_seconds)
+    return _in_flight
+
+
+async def _stage(report: Dict[str, Any], name: str, step: Callable[[], Awaitable[Any]]) -> None:
+    start = time.monotonic()
+    try:
+        report[name] = await step()
+    except Exception as e:
+        logger.error("Drain stage %s failed: %s", name, e)
+        report[name] = {"error": str(e)}
+    logger.info("Drain stage %s done in %.2fs: %s", name, time.monotonic() - start, report[name])
+
+
+async def shutdown(
+    turn_timeout: float = 30.0,
+    callback_timeout: float = 10.0,
+    cleanup_concurrency: int = 8,
+    cleanup_timeout: float = 10.0,
+    sweep_task: Optional["asyncio.Task[Any]"] = None,
+) -> Dict[str, Any]:
+    """Run the drain stages (see module docstring); returns what each stage left undone."""
+    from app.controllers.Agents.register import close_managers
+    from app.core import session_intel_store
+
+    start = time.monotonic()
+    begin()
+    report: Dict[str, Any] = {}
+
+    async def turns() -> Dict[str, int]:
+        return {"abandoned": await wait_for_turns(turn_timeout)}
+
+    async def callbacks() -> Dict[str, int]:
+        if sweep_task is not None:
+            sweep_task.cancel()
+        flushed = session_intel_store.flush_live_sessions()
+        result = await asyncio.to_thread(session_intel_store.close_final_callbacks, callback_timeout)
+        return {"flushed": flushed, **result}
+
+    async def managers() -> Dict[str, int]:
+        return await close_managers(cleanup_concurrency, cleanup_timeout)
+
+    await _stage(report, "turns", turns)
+    await _stage(report, "callbacks", callbacks)
+    await _stage(report, "managers", managers)
+
+    # "outbox": callbacks still parked behind an open circuit, i.e. lost as well
+    lost = sum(stage.get("abandoned", 0) + stage.get("outbox", 0) for stage in report.values())
+    if lost or any("error" in stage for stage in report.values()):
+        logger.warning("Drain finished in %.2fs with work abandoned: %s", time.monotonic() - start, report)
+    else:
+        logger.info("Drain finished in %.2fs, nothing abandoned", time.monotonic() - start)
+    return report
+
+
+__all__ = [
+    "begin",
+    "is_draining",
+    "in_flight",
+    "reset",
+    "ensure_accepting",
+    "track_turn",
+    "wait_for_turns",
+    "shutdown",
+]
@@ -0,0 +1,131 @@
+"""
+Cross-session inverted index for campaign correlation.
+
+Maps a normalized entity (UPI ID, phone number, phishing link, bank account)
+to the sessions that reported it, with first-seen/last-seen timestamps.
+Updated incrementally from session_intel_store.update_session_intel() and
+pruned when a session leaves the session intel store, so its size is bounded
+by the same TTL/LRU policy.
+
+The index is written from several threads (sync tools run in worker threads,
+callback dispatcher threads update the store, budget evictions remove
+sessions) while /intel/entity reads it on the event loop, so every access to
+its maps holds one lock.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import threading
+import time
+
+# Entity types exposed by the index (API `type` parameter)
+ENTITY_UPI = "upi"
+ENTITY_PHONE = "phone"
+ENTITY_LINK = "link"
+ENTITY_BANK = "bank"
+
+Normalizer = Callable[[List[str]], List[str]]
+
+
+class EntityIndex:
+    """
+    In-process inverted index: "<type>:<normalized value>" -> {session_id: [first_seen, last_seen]}.
+
+    All operations are dict lookups; a lookup costs O(sessions for that entity).
+    A reverse map (session_id -> entity keys) makes session removal O(entities in session).
+    Thread-safe: normalization runs outside the lock, map updates and reads inside it.
+    """
+
+    def __init__(self, normalizers: Dict[str, Normalizer]):
+        self._normalizers = normalizers
+        # entity key -> session_id -> [first_seen, last_seen]
+        self._postings: Dict[str, Dict[str, List[float]]] = {}
+        # entity key -> [first_seen, last_seen] while any session holding it is live
+        self._seen: Dict[str, List[float]] = {}
+        # session_id -> entity keys (for O(k) removal on expiry)
+        self._by_session: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, entity_type: str, values: Iterable[str]) -> Set[str]:
+        normalize = self._normalizers.get(entity_type)
+        if normalize is None:
+            raise ValueError(f"Unknown entity type '{entity_type}'")
+        keys = set()
+        for value in values:
+            if not value or not value.strip():
+                continue
+            for normalized in normalize([value]):
+                normalized = normalized.strip()
+                if entity_type == ENTITY_UPI:
+                    normalized = normalized.lower()  # UPI handles are case-insensitive
+                keys.add(f"{entity_type}:{normalized}")
+        return keys
+
+    def add(self, session_id: str, entity_type: str, values: Iterable[str], now: Optional[float] = None) -> None:
+        """Record that `session_id` reported `values` of `entity_type`."""
+        now = time.time() if now is None else now
+        keys = self._keys(entity_type, values)
+        with self._lock:
+            session_keys = self._by_session.setdefault(session_id, set())
+            for key in keys:
+                sessions = self._postings.setdefault(key, {})
+                stamp = sessions.get(session_id)
+                if stamp is None:
+                    sessions[session_id] = [now, now]
+                else:
+                    stamp[1] = now
+                seen = self._seen.get(key)
+                if seen is None:
+                    self._seen[key] = [now, now]
+                else:
+                    seen[1] = now
+                session_keys.add(key)
+
+    def remove_session(self, session_id: str) -> None:
+        """Drop all postings for a session (called when it leaves the session store)."""
+        with self._lock:
+            for key in self._by_session.pop(session_id, ()):
+                sessions = self._postings.get(key)
+                if sessions is None:
+                    continue
+                sessions.pop(session_id, None)
+                if not sessions:
+                    self._postings.pop(key, None)
+                    self._seen.pop(key, None)
+
+    def lookup(self, entity_type: str, value: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Return correlation data for one entity, or None if no live session reported it.
+        Sessions are ordered by most recent sighting.
+        """
+        for key in self._keys(entity_type, [value]):
+            with self._lock:
+                sessions = self._postings.get(key)
+                if not sessions:
+                    continue
+                first_seen, last_seen = self._seen[key]
+                # Copy the stamps: add() updates them in place once the lock is released
+                postings = [(sid, tuple(stamp)) for sid, stamp in sessions.items()]
+            ranked = sorted(postings, key=lambda kv: kv[1][1], reverse=True)[:limit]
+            return {
+                "type": entity_type,
+                "entity": key.split(":", 1)[1],
+                "firstSeen": first_seen,
+                "lastSeen": last_seen,
+                "sessionCount": len(postings),
+                "sessions": [
+                    {"sessionId": sid, "firstSeen": stamp[0], "lastSeen": stamp[1]}
+                    for sid, stamp in ranked
+                ],
+            }
+        return None
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+
+__all__ = [
+    "EntityIndex",
+    "ENTITY_UPI",
+    "ENTITY_PHONE",
+    "ENTITY_LINK",
+    "ENTITY_BANK",
+]
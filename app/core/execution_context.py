@@ -2,20 +2,140 @@
 Execution Context for request-scoped data.
 Uses ContextVar for async-safe, per-request isolation.
 
-Only stores: session_id and message_count (needed by tools during execution).
-Intel accumulation is handled by session_intel_store.py instead.
+Each turn sets one immutable RequestContext: session_id, message_count,
+metadata, the turn's trace and deadline, and a handle to the session's intel
+record (needed by tools and the model router during execution). Intel
+accumulation is handled by session_intel_store.py instead.
+
+asyncio tasks and asyncio.to_thread() copy the ContextVar automatically;
+loop.run_in_executor() and executor.submit() do not, so work handed to a
+thread pool directly must go through bind_context() / run_in_executor().
+The context is immutable, so sharing it with worker threads is safe.
 """
-from contextvars import ContextVar
-from typing import Dict, Any
+from contextvars import ContextVar, copy_context
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional, TypeVar
+import asyncio
+import functools
+
+T = TypeVar("T")
+
+_EMPTY_METADATA: Dict[str, Any] = {}
+
+
+class RequestContext:
+    """Per-turn execution context; immutable (build a new one with replace())."""
+
+    __slots__ = ("session_id", "message_count", "metadata", "deadline", "trace", "trace_id", "intel")
+
+    def __init__(
+        self,
+        session_id: str = "",
+        message_count: int = 0,
+        metadata: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        trace: Any = None,
+        intel: Optional[Dict[str, Any]] = None,
+    ):
+        setattr_ = object.__setattr__
+        setattr_(self, "session_id", session_id)
+        setattr_(self, "message_count", message_count)
+        setattr_(self, "metadata", _EMPTY_METADATA if metadata is None else metadata)
+        setattr_(self, "deadline", deadline)
+        setattr_(self, "trace", trace)
+        setattr_(self, "trace_id", trace.trace_id if trace is not None else None)
+        setattr_(self, "intel", intel)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"RequestContext is immutable (cannot set {name!r})")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"RequestContext is immutable (cannot delete {name!r})")
+
+    def replace(self, **changes: Any) -> "RequestContext":
+        fields = {
+            "session_id": self.session_id,
+            "message_count": self.message_count,
+            "metadata": self.metadata,
+            "deadline": self.deadline,
+            "trace": self.trace,
+            "intel": self.intel,
+        }
+        fields.update(changes)
+        return RequestContext(**fields)
+
+    def __repr__(self) -> str:
+        return (f"RequestContext(session_id={self.session_id!r}, message_count={self.message_count}, "
+                f"deadline={self.deadline}, trace_id={self.trace_id})")
+
+
+# Shared default outside a turn; safe because it cannot be mutated
+EMPTY_CONTEXT = RequestContext()
 
 # Request-scoped context
-session_context: ContextVar[Dict[str, Any]] = ContextVar("session_context", default={})
+session_context: ContextVar[RequestContext] = ContextVar("session_context", default=EMPTY_CONTEXT)
+
+
+def get_context() -> RequestContext:
+    return session_context.get()
 
 def get_session_id() -> str:
-    return session_context.get().get("session_id", "")
+    return session_context.get().session_id
 
 def get_message_count() -> int:
-    return session_context.get().get("message_count", 0)
+    return session_context.get().message_count
 
 def get_metadata() -> Dict[str, Any]:
-    return session_context.get().get("metadata", {})
+    return session_context.get().metadata
+
+
+def get_trace() -> Any:
+    """TraceContext of the current turn (app.core.tracing), or None when not traced."""
+    return session_context.get().trace
+
+
+def get_trace_id() -> Optional[str]:
+    return session_context.get().trace_id
+
+
+def get_deadline() -> Optional[float]:
+    """time.monotonic() by which the current turn's agent work must finish, or None outside a turn."""
+    return session_context.get().deadline
+
+
+def get_intel_record() -> Optional[Dict[str, Any]]:
+    """The session's intel record as of the start of the turn (session_intel_store), or None."""
+    return session_context.get().intel
+
+
+def bind_context(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap `func` to run in a copy of the caller's context (for executor.submit and friends)."""
+    context = copy_context()
+
+    @functools.wraps(func)
+    def bound(*args: Any, **kwargs: Any) -> T:
+        return context.run(func, *args, **kwargs)
+
+    return bound
+
+
+async def run_in_executor(executor: Optional[Executor], func: Callable[..., T], *args: Any) -> T:
+    """loop.run_in_executor() that carries the current request context into the worker thread."""
+    return await asyncio.get_running_loop().run_in_executor(executor, bind_context(func), *args)
+
+
+__all__ = [
+    "RequestContext",
+    "EMPTY_CONTEXT",
+    "session_context",
+    "get_context",
+    "get_session_id",
+    "get_message_count",
+    "get_metadata",
+    "get_trace",
+    "get_trace_id",
+    "get_deadline",
+    "get_intel_record",
+    "bind_context",
+    "run_in_executor",
+]
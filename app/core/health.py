@@ -0,0 +1,245 @@
+"""
+Load-aware liveness (/healthz) and readiness (/readyz) for load balancers
+and autoscalers.
+
+LoadMonitor runs as a background task on the serving event loop. Every
+`interval` seconds it measures how late its own sleep wakes up (event-loop
+lag, smoothed as an EWMA), samples the turn counters into a ring covering
+`window` seconds, and re-evaluates readiness against the thresholds:
+
+- loop lag (EWMA) above `max_loop_lag_ms`;
+- more than `max_queue` turns waiting in the admission queue
+  (app/core/turn_scheduler.py), also smoothed as an EWMA of the samples (the
+  instantaneous depth swings by a slot's worth of turns between ticks);
+- fallback replies above `max_fallback_rate` of the turns in the window,
+  once the window holds `min_window_turns` turns; not counted while the LLM
+  provider's circuit is open or probing (an upstream outage hits every
+  instance, moving sessions elsewhere would not help);
+- a tracked cache or memory budget filled beyond `max_cache_utilization`
+  (0 disables; caches stay full of idle sessions until their TTL, so this
+  suits deployments sized by sessions rather than traffic).
+
+Readiness flips to false as soon as one threshold is exceeded and back to
+true once every value is under `recovery_ratio` of its threshold, so an
+instance near a limit does not flap in and out of the pool. Draining for
+shutdown (app/core/drain.py) makes it false at once.
+
+The endpoints only read what the monitor computed plus a few counters and
+len() of the caches, O(1) per request: no cache entry is read, touched or
+locked, and no histogram is walked.
+"""
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.core import circuit_breaker, drain, metrics, turn_scheduler
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = metrics.REGISTRY.gauge(
+    "honeypot_event_loop_lag_seconds", "Event-loop lag (EWMA of the health monitor's late wake-ups)")
+READY = metrics.REGISTRY.gauge("honeypot_ready", "1 while /readyz reports ready")
+READINESS_FLIPS = metrics.REGISTRY.counter(
+    "honeypot_readiness_changes_total", "Readiness transitions by new state (ready, not_ready)", ("state",))
+
+EWMA_ALPHA = 0.3
+
+
+def _counter_sample() -> Tuple[int, float, float]:
+    # Every /analyze and channel turn observes ANALYZE_LATENCY once
+    return metrics.ANALYZE_LATENCY.count, metrics.FALLBACK_REPLIES.value, metrics.AGENT_TIMEOUTS.value
+
+
+class LoadMonitor:
+    """Samples loop lag and turn counters on a timer and keeps readiness; see module docstring."""
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        window: float = 30.0,
+        max_loop_lag_ms: float = 200.0,
+        max_queue: int = 64,
+        max_fallback_rate: float = 0.5,
+        min_window_turns: int = 20,
+        max_cache_utilization: float = 0.0,
+        recovery_ratio: float = 0.8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        self.lag = 0.0  # seconds, EWMA
+        self.lag_last = 0.0
+        self.queue = 0.0  # waiting turns, EWMA
+        self.ready = True
+        self.reasons: List[str] = []
+        self.last_sample_at: Optional[float] = None
+        self._samples: Deque[Tuple[float, int, float, float]] = deque()
+        self.configure(interval, window, max_loop_lag_ms, max_queue, max_fallback_rate, min_window_turns,
+                       max_cache_utilization, recovery_ratio)
+        READY.set_function(lambda: int(self.is_ready()))
+
+    def configure(
+        self,
+        interval: float = 0.5,
+        window: float = 30.0,
+        max_loop_lag_ms: float = 200.0,
+        max_queue: int = 64,
+        max_fallback_rate: float = 0.5,
+        min_window_turns: int = 20,
+        max_cache_utilization: float = 0.0,
+        recovery_ratio: float = 0.8,
+    ) -> None:
+        self.interval = interval
+        self.window = window
+        self.max_loop_lag = max_loop_lag_ms / 1000.0
+        self.max_queue = max_queue
+        self.max_fallback_rate = max_fallback_rate
+        self.min_window_turns = min_window_turns
+        self.max_cache_utilization = max_cache_utilization
+        self.recovery_ratio = recovery_ratio
+        self._samples = deque(self._samples, maxlen=max(2, int(window / interval) + 1))
+
+    # ---- sampling (monitor task) ----
+
+    async def run(self) -> None:
+        """Background task (started by the lifespan handler)."""
+        logger.info("Load monitor started (interval=%ss, window=%ss)", self.interval, self.window)
+        while True:
+            start = self.clock()
+            await asyncio.sleep(self.interval)
+            try:
+                self.observe_lag(max(0.0, self.clock() - start - self.interval))
+                self.sample()
+            except Exception as e:
+                logger.error("Load monitor tick failed: %s", e)
+
+    def observe_lag(self, lag: float) -> None:
+        self.lag_last = lag
+        self.lag += EWMA_ALPHA * (lag - self.lag)
+        EVENT_LOOP_LAG.set(self.lag)
+
+    def sample(self) -> None:
+        now = self.clock()
+        self.queue += EWMA_ALPHA * (self.admission()["queued"] - self.queue)
+        self._samples.append((now, *_counter_sample()))
+        self.last_sample_at = now
+        self._evaluate()
+
+    # ---- readings (O(1)) ----
+
+    def rates(self) -> Dict[str, Any]:
+        """Turns, fallback and agent timeout rates over the sampled window."""
+        if len(self._samples) < 2:
+            return {"window_seconds": 0.0, "turns": 0, "turns_per_second": 0.0, "fallback_rate": 0.0,
+                    "timeout_rate": 0.0}
+        t0, turns0, fallbacks0, timeouts0 = self._samples[0]
+        t1, turns1, fallbacks1, timeouts1 = self._samples[-1]
+        turns = turns1 - turns0
+        return {
+            "window_seconds": round(t1 - t0, 3),
+            "turns": turns,
+            "turns_per_second": round(turns / (t1 - t0), 3) if t1 > t0 else 0.0,
+            "fallback_rate": round((fallbacks1 - fallbacks0) / turns, 4) if turns else 0.0,
+            "timeout_rate": round((timeouts1 - timeouts0) / turns, 4) if turns else 0.0,
+        }
+
+    def admission(self) -> Dict[str, int]:
+        try:
+            scheduler = turn_scheduler.get_scheduler()
+        except RuntimeError:  # no running loop
+            scheduler = None
+        if scheduler is None:
+            return {"queued": 0, "active": 0, "capacity": 0}
+        return {"queued": len(scheduler), "active": scheduler.active, "capacity": scheduler.capacity}
+
+    def caches(self) -> Dict[str, Dict[str, Any]]:
+        occupancy: Dict[str, Dict[str, Any]] = {}
+        for name, cache in metrics.TRACKED_CACHES.items():
+            entries = len(cache)
+            occupancy[name] = {"entries": entries, "max_entries": cache.maxsize,
+                               "utilization": round(entries / cache.maxsize, 4) if cache.maxsize else 0.0}
+        for name, budget in metrics.TRACKED_BUDGETS.items():
+            used = budget.used_bytes  # sum over the few attached caches' byte counters
+            occupancy[f"budget:{name}"] = {"bytes": used, "max_bytes": budget.max_bytes,
+                                           "utilization": round(used / budget.max_bytes, 4) if budget.max_bytes else 0.0}
+        return occupancy
+
+    def _measures(self) -> Tuple[Dict[str, Any], List[Tuple[str, float, float]]]:
+        """Current readings, and (name, value, threshold) for every enabled readiness check."""
+        rates = self.rates()
+        admission = self.admission()
+        caches = self.caches()
+        circuits = circuit_breaker.snapshot()
+        checks: List[Tuple[str, float, float]] = [("event_loop_lag", self.lag, self.max_loop_lag)]
+        if self.max_queue > 0 and admission["capacity"]:
+            checks.append(("turn_queue", self.queue, self.max_queue))
+        if (self.max_fallback_rate < 1.0 and rates["turns"] >= self.min_window_turns
+                and circuits.get(circuit_breaker.AGENT_BREAKER.name) == circuit_breaker.CLOSED):
+            checks.append(("fallback_rate", rates["fallback_rate"], self.max_fallback_rate))
+        if self.max_cache_utilization > 0:
+            for name, cache in caches.items():
+                checks.append((f"cache:{name}", cache["utilization"], self.max_cache_utilization))
+        readings = {
+            "event_loop_lag_ms": round(self.lag * 1000, 3),
+            "event_loop_lag_last_ms": round(self.lag_last * 1000, 3),
+            "turns_in_flight": drain.in_flight(),
+            "admission": {**admission, "queued_avg": round(self.queue, 2)},
+            "caches": caches,
+            "rates": rates,
+            "circuits": circuits,
+        }
+        return readings, checks
+
+    def _evaluate(self) -> None:
+        _, checks = self._measures()
+        if self.ready:
+            exceeded = [name for name, value, limit in checks if value > limit]
+        else:
+            # Hysteresis: stay out of the pool until every reading is well under its limit
+            exceeded = [name for name, value, limit in checks if value > limit * self.recovery_ratio]
+        ready = not exceeded
+        if ready != self.ready:
+            READINESS_FLIPS.labels("ready" if ready else "not_ready").inc()
+            if ready:
+                logger.info("Ready again (readings under %.0f%% of their thresholds)", self.recovery_ratio * 100)
+            else:
+                logger.warning("Not ready: %s over threshold", ", ".join(exceeded))
+        self.ready = ready
+        self.reasons = exceeded
+
+    def is_ready(self) -> bool:
+        return self.ready and not drain.is_draining()
+
+    def report(self) -> Dict[str, Any]:
+        readings, _ = self._measures()
+        reasons = list(self.reasons)
+        if drain.is_draining():
+            reasons.insert(0, "draining")
+        age = None if self.last_sample_at is None else round(self.clock() - self.last_sample_at, 3)
+        return {"ready": self.is_ready(), "reasons": reasons, "sample_age_seconds": age, **readings}
+
+
+MONITOR = LoadMonitor()
+
+
+def configure_from_settings() -> LoadMonitor:
+    from app.core.config import settings
+    MONITOR.configure(
+        interval=settings.HEALTH_SAMPLE_INTERVAL_SECONDS,
+        window=settings.HEALTH_RATE_WINDOW_SECONDS,
+        max_loop_lag_ms=settings.READY_MAX_LOOP_LAG_MS,
+        max_queue=settings.READY_MAX_TURN_QUEUE,
+        max_fallback_rate=settings.READY_MAX_FALLBACK_RATE,
+        min_window_turns=settings.READY_MIN_WINDOW_TURNS,
+        max_cache_utilization=settings.READY_MAX_CACHE_UTILIZATION,
+        recovery_ratio=settings.READY_RECOVERY_RATIO,
+    )
+    return MONITOR
+
+
+__all__ = [
+    "LoadMonitor",
+    "MONITOR",
+    "configure_from_settings",
+]
@@ -0,0 +1,394 @@
+"""
+Process-wide outbound HTTP connection manager.
+
+Every outbound HTTP call (GUVI callbacks, LLM provider SDKs) takes its client
+from here instead of opening its own connections:
+
+- one pooled httpx client per origin (scheme, host, port), so connection
+  limits and keep-alive are per host and a slow host cannot starve another;
+- HTTP/2 when the `h2` package is installed (HTTP2_ENABLED), otherwise
+  HTTP/1.1 keep-alive;
+- a TTL cache in front of getaddrinfo, so new connections to a known host
+  skip the DNS round trip (TLS still verifies against the hostname);
+- async clients are per event loop (httpx connections are loop-bound), sync
+  clients are shared by all threads;
+- the shared clients ignore close() from their users (SDK wrappers close
+  "their" client on teardown); only the manager closes the pools
+  (ashutdown() from the app lifespan);
+- the connection pool (transport) is per origin; clients over it are per
+  timeout and redirect setting, so an SDK keeps its own timeout (google-genai:
+  none unless configured) instead of HTTP_TIMEOUT_SECONDS.
+
+New TCP connections are counted per host in
+honeypot_http_connections_opened_total: with pooling this stays near the
+number of hosts while requests keep growing.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import importlib.util
+import logging
+import socket
+import threading
+import time
+import weakref
+
+import httpcore
+import httpx
+
+from app.core import metrics
+from app.controllers.Agents.utils.memory_budget import mark_shared_type
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS_OPENED = metrics.REGISTRY.counter(
+    "honeypot_http_connections_opened_total", "New outbound TCP connections by host", ("host",))
+DNS_LOOKUPS = metrics.REGISTRY.counter(
+    "honeypot_http_dns_lookups_total", "Outbound DNS resolutions by result (hit, miss)", ("result",))
+
+Origin = Tuple[str, str, int]
+ClientKey = Tuple[Origin, Tuple[Optional[float], ...], bool]
+
+
+class DnsCache:
+    """getaddrinfo results per (host, port), kept for `ttl` seconds."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, host: str, port: int) -> Optional[List[str]]:
+        entry = self._entries.get((host, port))
+        if entry is not None and entry[0] > time.monotonic():
+            DNS_LOOKUPS.labels("hit").inc()
+            return entry[1]
+        return None
+
+    def _store(self, host: str, port: int, infos: List[Any]) -> List[str]:
+        # Keep resolver order (RFC 6724 preference), drop duplicates per family/type
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[(host, port)] = (time.monotonic() + self.ttl, addresses)
+        DNS_LOOKUPS.labels("miss").inc()
+        return addresses
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        if _is_ip(host) or self.ttl <= 0:
+            return [host]
+        cached = self._cached(host, port)
+        if cached is not None:
+            return cached
+        return self._store(host, port, socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+
+    async def aresolve(self, host: str, port: int) -> List[str]:
+        if _is_ip(host) or self.ttl <= 0:
+            return [host]
+        cached = self._cached(host, port)
+        if cached is not None:
+            return cached
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return self._store(host, port, infos)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _is_ip(host: str) -> bool:
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (OSError, ValueError):
+            continue
+    return False
+
+
+class _CachingSyncBackend(httpcore.NetworkBackend):
+    """Resolves through DnsCache, then connects to each address in turn."""
+
+    def __init__(self, dns: DnsCache):
+        self._dns = dns
+        self._inner = httpcore.SyncBackend()
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        last_error: Optional[Exception] = None
+        for address in self._dns.resolve(host, port):
+            try:
+                stream = self._inner.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                last_error = e
+                continue
+            CONNECTIONS_OPENED.labels(host).inc()
+            return stream
+        raise last_error or httpcore.ConnectError(f"no address for {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._inner.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float) -> None:
+        self._inner.sleep(seconds)
+
+
+class _CachingAsyncBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self, dns: DnsCache):
+        self._dns = dns
+        self._inner = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        last_error: Optional[Exception] = None
+        for address in await self._dns.aresolve(host, port):
+            try:
+                stream = await self._inner.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                last_error = e
+                continue
+            CONNECTIONS_OPENED.labels(host).inc()
+            return stream
+        raise last_error or httpcore.ConnectError(f"no address for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._inner.sleep(seconds)
+
+
+@mark_shared_type  # pooled process-wide; not charged to the sessions holding a reference
+class _SharedClient(httpx.Client):
+    def close(self) -> None:
+        pass  # the pool is owned by HttpClientManager
+
+
+@mark_shared_type
+class _SharedAsyncClient(httpx.AsyncClient):
+    async def aclose(self) -> None:
+        pass  # the pool is owned by HttpClientManager
+
+
+def _install_backend(transport: Any, backend: Any) -> None:
+    # httpx has no public hook for the network backend; its pool reads this attribute per new connection
+    pool = getattr(transport, "_pool", None)
+    if pool is not None and hasattr(pool, "_network_backend"):
+        pool._network_backend = backend
+    else:
+        logger.debug("httpx transport without a pool backend; DNS cache not installed")
+
+
+def origin_of(url: str) -> Origin:
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return parsed.scheme, parsed.host, port
+
+
+class HttpClientManager:
+    """Pooled httpx clients per origin; see module docstring."""
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 20,
+        max_keepalive_per_host: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 10.0,
+        http2: bool = True,
+        dns_ttl: float = 60.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.dns = DnsCache(dns_ttl)
+        self._sync_pools: Dict[Origin, httpx.HTTPTransport] = {}
+        self._sync: Dict[ClientKey, _SharedClient] = {}
+        self._async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Origin, httpx.AsyncHTTPTransport]]" = \
+            weakref.WeakKeyDictionary()
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, _SharedAsyncClient]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _key(self, url: str, timeout: Optional[httpx.Timeout], follow_redirects: bool) -> ClientKey:
+        timeout = self.timeout if timeout is None else timeout
+        return origin_of(url), (timeout.connect, timeout.read, timeout.write, timeout.pool), follow_redirects
+
+    def client(self, url: str, timeout: Optional[httpx.Timeout] = None, follow_redirects: bool = False) -> httpx.Client:
+        """Sync client for the origin of `url` (thread-safe, shared); `timeout` defaults to the manager's."""
+        key = self._key(url, timeout, follow_redirects)
+        client = self._sync.get(key)
+        if client is None:
+            with self._lock:
+                client = self._sync.get(key)
+                if client is None:
+                    origin = key[0]
+                    transport = self._sync_pools.get(origin)
+                    if transport is None:
+                        transport = self._sync_pools[origin] = httpx.HTTPTransport(limits=self.limits, http2=self.http2)
+                        _install_backend(transport, _CachingSyncBackend(self.dns))
+                    client = self._sync[key] = _SharedClient(
+                        transport=transport, timeout=self.timeout if timeout is None else timeout, follow_redirects=follow_redirects)
+        return client
+
+    def async_client(self, url: str, timeout: Optional[httpx.Timeout] = None,
+                     follow_redirects: bool = False) -> httpx.AsyncClient:
+        """Async client for the origin of `url` on the running event loop; `timeout` defaults to the manager's."""
+        loop = asyncio.get_running_loop()
+        key = self._key(url, timeout, follow_redirects)
+        clients = self._async.get(loop)
+        if clients is None:
+            clients = self._async.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            pools = self._async_pools.get(loop)
+            if pools is None:
+                pools = self._async_pools.setdefault(loop, {})
+            origin = key[0]
+            transport = pools.get(origin)
+            if transport is None:
+                transport = pools[origin] = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+                _install_backend(transport, _CachingAsyncBackend(self.dns))
+            client = clients[key] = _SharedAsyncClient(
+                transport=transport, timeout=self.timeout if timeout is None else timeout, follow_redirects=follow_redirects)
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "sync_origins": len(self._sync_pools),
+            "async_origins": sum(len(pools) for pools in self._async_pools.values()),
+        }
+
+    def close(self) -> None:
+        """Close the sync pools (async pools need ashutdown() on their loop)."""
+        with self._lock:
+            transports, self._sync_pools, self._sync = list(self._sync_pools.values()), {}, {}
+        for transport in transports:
+            try:
+                transport.close()
+            except Exception as e:
+                logger.warning("Error closing HTTP client: %s", e)
+
+    async def aclose_loop(self) -> None:
+        """Close the async pools of the running event loop."""
+        loop = asyncio.get_running_loop()
+        self._async.pop(loop, None)
+        transports = self._async_pools.pop(loop, {})
+        results = await asyncio.gather(*(t.aclose() for t in transports.values()), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Error closing async HTTP client: %s", result)
+
+    async def aclose(self) -> None:
+        """Close the running loop's async pools, then the sync pools."""
+        await self.aclose_loop()
+        self.close()
+
+
+# ============ SDK CLIENT SHARING ============
+# Attribute names under which provider SDKs keep their httpx client
+# (openai: OpenAI._client; google-genai: BaseApiClient._httpx_client / _async_httpx_client)
+_SDK_HOLDERS = ("root_client", "root_async_client", "client", "async_client", "_api_client")
+_SDK_CLIENT_ATTRS = ("_client", "_httpx_client", "_async_httpx_client")
+
+
+def _sdk_base_url(holder: Any, client: Any) -> str:
+    # google-genai sends absolute URLs from clients without a base_url; its endpoint is in _http_options
+    options = getattr(holder, "_http_options", None)
+    for candidate in (getattr(holder, "base_url", None), getattr(client, "base_url", None),
+                      getattr(options, "base_url", None)):
+        url = str(candidate or "")
+        if url.startswith("http"):
+            return url
+    return ""
+
+
+def share_sdk_clients(model: Any, manager: Optional["HttpClientManager"] = None) -> int:
+    """
+    Point the httpx clients inside a provider SDK model at the shared pools.
+    Returns how many clients were replaced (0 for models without httpx clients).
+    """
+    manager = manager or get_http_clients()
+    try:
+        asyncio.get_running_loop()
+        has_loop = True
+    except RuntimeError:
+        has_loop = False
+    holders: List[Any] = [model]
+    for name in _SDK_HOLDERS:
+        holder = getattr(model, name, None)
+        if holder is not None:
+            holders += [holder, getattr(holder, "_api_client", None)]
+    replaced = 0
+    seen = set()
+    for holder in holders:
+        if holder is None or id(holder) in seen:
+            continue
+        seen.add(id(holder))
+        for attr in _SDK_CLIENT_ATTRS:
+            current = getattr(holder, attr, None)
+            if isinstance(current, (_SharedClient, _SharedAsyncClient)):
+                continue
+            base_url = _sdk_base_url(holder, current)
+            if not base_url:
+                continue
+            # Keep the SDK's own timeout and redirect handling; only the connections are shared
+            options = {"timeout": getattr(current, "timeout", None),
+                       "follow_redirects": bool(getattr(current, "follow_redirects", False))}
+            try:
+                if isinstance(current, httpx.Client):
+                    setattr(holder, attr, manager.client(base_url, **options))
+                elif isinstance(current, httpx.AsyncClient) and has_loop:
+                    setattr(holder, attr, manager.async_client(base_url, **options))
+                else:
+                    continue
+            except (AttributeError, TypeError) as e:
+                logger.debug("Cannot share %s.%s: %s", type(holder).__name__, attr, e)
+                continue
+            replaced += 1
+    return replaced
+
+
+# ============ PROCESS-WIDE MANAGER ============
+_manager: Optional[HttpClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def configure(**options: Any) -> HttpClientManager:
+    """Replace the process-wide manager (closing the old sync pools)."""
+    global _manager
+    with _manager_lock:
+        old, _manager = _manager, HttpClientManager(**options)
+    if old is not None:
+        old.close()
+    return _manager
+
+
+def get_http_clients() -> HttpClientManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = HttpClientManager()
+    return _manager
+
+
+async def ashutdown() -> None:
+    """Close all pooled connections (lifespan shutdown)."""
+    if _manager is not None:
+        await _manager.aclose()
+
+
+__all__ = [
+    "DnsCache",
+    "HttpClientManager",
+    "origin_of",
+    "share_sdk_clients",
+    "configure",
+    "get_http_clients",
+    "ashutdown",
+]
@@ -0,0 +1,202 @@
+"""
+Non-blocking logging pipeline.
+
+Application loggers hand records to a QueueHandler on the root logger; a
+QueueListener thread does the JSON encoding and the stream write, so a slow
+stdout (pipe to a log shipper, dyno log drain) never stalls the event loop.
+
+- Records are structured JSON lines (ts, level, logger, msg, session_id, ...).
+- Repeated messages are rate limited per (logger, level, format string):
+  `burst` records per `window` seconds, then suppressed; the next record that
+  gets through carries the number suppressed in between.
+- Call sites use %-style arguments, so nothing is formatted for disabled
+  levels or rate-limited records; messages are rendered once on the calling
+  thread (arguments may be mutable intel lists) and encoded on the writer.
+- A full queue drops the record instead of blocking; drops are counted in
+  honeypot_log_records_dropped_total.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, TextIO, Tuple
+import atexit
+import datetime
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from app.core import metrics
+from app.core.execution_context import get_session_id
+from app.core.serialization import dumps_bytes
+
+LOG_RECORDS_DROPPED = metrics.REGISTRY.counter(
+    "honeypot_log_records_dropped_total",
+    "Log records not written, by reason (rate_limited, queue_full)",
+    labelnames=("reason",),
+)
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is emitted as a field
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "session_id", "suppressed"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # Set by NonBlockingQueueHandler; read here when logging synchronously
+        session_id = getattr(record, "session_id", None) or get_session_id()
+        if session_id:
+            entry["session_id"] = session_id
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return dumps_bytes(entry).decode("utf-8")
+
+
+class RateLimitFilter(logging.Filter):
+    """Allow `burst` records per `window` seconds for each (logger, level, format string)."""
+
+    def __init__(self, burst: int = 20, window: float = 10.0, max_keys: int = 4096):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window_start, count_in_window, suppressed_since_last_emit]
+        self._state: "OrderedDict[Tuple[str, int, Any], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = [now, 0, 0]
+                if len(self._state) > self.max_keys:
+                    self._state.popitem(last=False)
+            else:
+                self._state.move_to_end(key)
+            if now - state[0] >= self.window:
+                state[0], state[1] = now, 0
+            if state[1] >= self.burst:
+                state[2] += 1
+                LOG_RECORDS_DROPPED.labels("rate_limited").inc()
+                return False
+            state[1] += 1
+            record.suppressed, state[2] = state[2], 0
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that tags the session and drops (counted) instead of blocking when full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render on the calling thread: args may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "session_id"):
+            record.session_id = get_session_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+def setup_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    stream: Optional[TextIO] = None,
+    asynchronous: bool = True,
+    queue_size: int = 10_000,
+    rate_limit_burst: int = 20,
+    rate_limit_window: float = 10.0,
+) -> None:
+    """Install the pipeline on the root logger (idempotent: replaces a previous setup)."""
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        writer.setFormatter(JsonFormatter())
+    else:
+        writer.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    rate_limit = RateLimitFilter(burst=rate_limit_burst, window=rate_limit_window)
+    if asynchronous:
+        global _listener, _queue_handler
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        # Rate limit before enqueueing so suppressed records cost no rendering or queue slot
+        _queue_handler = NonBlockingQueueHandler(records)
+        _queue_handler.addFilter(rate_limit)
+        _listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(_queue_handler)
+    else:
+        writer.addFilter(rate_limit)
+        root.addHandler(writer)
+    root.setLevel(level.upper())
+
+
+def shutdown_logging() -> None:
+    """
+    Drain the queue and stop the writer thread (app shutdown, interpreter exit).
+    Records logged afterwards are written synchronously by the same stream handler.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    listener, handler = _listener, _queue_handler
+    _listener = _queue_handler = None
+    root = logging.getLogger()
+    for writer in listener.handlers:
+        for log_filter in handler.filters:
+            writer.addFilter(log_filter)
+        root.addHandler(writer)
+    root.removeHandler(handler)
+    listener.stop()
+
+
+def queue_depth() -> int:
+    return _listener.queue.qsize() if _listener is not None else 0
+
+
+metrics.REGISTRY.gauge("honeypot_log_queue_depth", "Log records waiting for the writer thread", func=queue_depth)
+
+
+atexit.register(shutdown_logging)
+
+__all__ = [
+    "JsonFormatter",
+    "RateLimitFilter",
+    "NonBlockingQueueHandler",
+    "setup_logging",
+    "shutdown_logging",
+    "queue_depth",
+]
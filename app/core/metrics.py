@@ -0,0 +1,294 @@
+"""
+In-process metrics registry exposed in Prometheus text format at /metrics.
+
+Designed for the /analyze hot path:
+- Counter/Histogram updates are a few attribute writes (no locks, no allocation
+  for unlabelled series). Updates from worker threads may race under the GIL;
+  a rare lost increment is acceptable for operational metrics.
+- Gauges and cache statistics are pulled lazily at scrape time, so nothing is
+  computed per request.
+
+Overhead budget: instrumentation must add <= 10 microseconds per /analyze
+request (measured by scripts/bench_metrics.py).
+"""
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+
+# Latency buckets in seconds; upper range covers the 25s agent timeout.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 30.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.value = 0.0
+        self._children: Dict[Tuple[str, ...], "Counter"] = {}
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def labels(self, *labelvalues: str) -> "Counter":
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = Counter(self.name, self.documentation)
+            self._children[labelvalues] = child
+        return child
+
+    def collect(self) -> List[str]:
+        if not self.labelnames:
+            return [f"{self.name} {_format_value(self.value)}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class Gauge:
+    """Point-in-time value. Either set() directly or computed by `func` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], float]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.value = 0.0
+        self._func = func
+        self._children: Dict[Tuple[str, ...], "Gauge"] = {}
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, func: Callable[[], float]) -> None:
+        self._func = func
+
+    def labels(self, *labelvalues: str) -> "Gauge":
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = Gauge(self.name, self.documentation)
+            self._children[labelvalues] = child
+        return child
+
+    def get(self) -> float:
+        if self._func is not None:
+            try:
+                return float(self._func())
+            except Exception:
+                return math.nan
+        return self.value
+
+    def collect(self) -> List[str]:
+        if not self.labelnames:
+            return [f"{self.name} {_format_value(self.get())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"
+            for values, child in self._children.items()
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect plus three increments."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = ()
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if cumulative + count >= rank and count:
+                return lower + (upper - lower) * ((rank - cumulative) / count)
+            cumulative += count
+            lower = upper
+        return self.buckets[-1]
+
+    def collect(self) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics in registration order and renders the Prometheus exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Any) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), func: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, func))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a hook run before each scrape (used to pull cache statistics)."""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Any:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ============ HOT-PATH METRICS ============
+ANALYZE_LATENCY = REGISTRY.histogram("honeypot_analyze_seconds", "Total /analyze handler latency")
+AGENT_LATENCY = REGISTRY.histogram("honeypot_agent_seconds", "Agent invocation time per turn")
+HISTORY_BUILD_LATENCY = REGISTRY.histogram("honeypot_history_build_seconds", "Time to format conversation history into the agent query")
+TOOL_LATENCY = REGISTRY.histogram("honeypot_tool_seconds", "scam_intel tool execution time")
+CALLBACK_LATENCY = REGISTRY.histogram("honeypot_callback_seconds", "GUVI callback POST time")
+
+AGENT_TIMEOUTS = REGISTRY.counter("honeypot_agent_timeouts_total", "Agent turns that hit AGENT_TIMEOUT_SECONDS")
+AGENT_FAILURES = REGISTRY.counter(
+    "honeypot_agent_failures_total", "Agent turns that returned masai's error state or no answer")
+FALLBACK_REPLIES = REGISTRY.counter("honeypot_fallback_replies_total", "Replies served from FALLBACK_RESPONSES")
+ANALYZE_ERRORS = REGISTRY.counter("honeypot_analyze_errors_total", "/analyze requests that returned status=error")
+CALLBACK_OUTCOMES = REGISTRY.counter("honeypot_callbacks_total", "Callback attempts by outcome", ("outcome",))
+INTEL_TOOL_CALLS = REGISTRY.counter(
+    "honeypot_intel_tool_calls_total", "scam_intel tool calls by result (delta, redundant: nothing new to save)", ("result",))
+PREFILTER_DECISIONS = REGISTRY.counter("honeypot_prefilter_decisions_total", "First-message pre-classifier decisions (benign, escalate)", ("decision",))
+
+# Cache statistics (pulled from TtlLruCache.stats at scrape time)
+CACHE_ENTRIES = REGISTRY.gauge("honeypot_cache_entries", "Live entries per TtlLruCache", ("cache",))
+CACHE_HITS = REGISTRY.counter("honeypot_cache_hits_total", "TtlLruCache get() hits", ("cache",))
+CACHE_MISSES = REGISTRY.counter("honeypot_cache_misses_total", "TtlLruCache get() misses", ("cache",))
+CACHE_EVICTIONS = REGISTRY.counter("honeypot_cache_evictions_total", "TtlLruCache removals by LRU pressure", ("cache",))
+CACHE_EXPIRATIONS = REGISTRY.counter("honeypot_cache_expirations_total", "TtlLruCache removals by TTL expiry", ("cache",))
+CACHE_BYTES = REGISTRY.gauge("honeypot_cache_bytes", "Approximate bytes held per size-aware TtlLruCache", ("cache",))
+CACHE_PRESSURE_EVICTIONS = REGISTRY.counter(
+    "honeypot_cache_pressure_evictions_total",
+    "LRU evictions forced by memory rather than entry count (trigger: max_bytes, budget)", ("cache", "trigger"))
+BUDGET_LIMIT = REGISTRY.gauge("honeypot_memory_budget_bytes", "Byte limit of a shared cache memory budget", ("budget",))
+BUDGET_USED = REGISTRY.gauge("honeypot_memory_budget_used_bytes", "Bytes held by the caches sharing a memory budget", ("budget",))
+
+
+# name -> cache, for readers that need more than the exported series (app/core/health.py)
+TRACKED_CACHES: Dict[str, Any] = {}
+TRACKED_BUDGETS: Dict[str, Any] = {}
+
+
+def track_cache(name: str, cache: Any) -> None:
+    """Expose a TtlLruCache's size and hit/miss/eviction counts under cache=`name`."""
+    TRACKED_CACHES[name] = cache
+    CACHE_ENTRIES.labels(name).set_function(lambda: len(cache))
+
+    def _collect() -> None:
+        stats = cache.stats
+        CACHE_HITS.labels(name).value = stats["hits"]
+        CACHE_MISSES.labels(name).value = stats["misses"]
+        CACHE_EVICTIONS.labels(name).value = stats["evictions"]
+        CACHE_EXPIRATIONS.labels(name).value = stats["expirations"]
+        if getattr(cache, "sizer", None) is not None:
+            CACHE_PRESSURE_EVICTIONS.labels(name, "max_bytes").value = stats["size_evictions"]
+            CACHE_PRESSURE_EVICTIONS.labels(name, "budget").value = stats["budget_evictions"]
+
+    if getattr(cache, "sizer", None) is not None:
+        CACHE_BYTES.labels(name).set_function(lambda: cache.bytes)
+    REGISTRY.add_collector(_collect)
+
+
+def track_budget(budget: Any) -> None:
+    """Expose a MemoryBudget's limit and usage under budget=`budget.name`."""
+    TRACKED_BUDGETS[budget.name] = budget
+    BUDGET_LIMIT.labels(budget.name).set_function(lambda: budget.max_bytes or 0)
+    BUDGET_USED.labels(budget.name).set_function(lambda: budget.used_bytes)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+__all__ = [
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "TRACKED_CACHES",
+    "TRACKED_BUDGETS",
+    "track_cache",
+    "track_budget",
+    "render_metrics",
+]
@@ -0,0 +1,160 @@
+"""
+Cheap scam-intent pre-classifier, run before the HONEYPOT agent is built.
+
+A logistic model over hashed word 1-2 grams plus dense features derived from
+the intel store's tactic vocabularies (urgency, credential, authority,
+payment) and extraction regexes (UPI, phone, link, bank account). It is
+trained offline by scripts/train_prefilter.py and loaded from
+model_config/prefilter_model.json; scoring is pure Python, ~tens of µs.
+
+Only the FIRST message of a session is ever short-circuited, and only when
+its score is below the model's benign threshold and no payment entity
+appears in it; everything else escalates to the agent. Without a model file
+the pre-classifier is disabled and every message escalates.
+"""
+from typing import Dict, List, Optional
+import json
+import logging
+import math
+import os
+import random
+import re
+import zlib
+
+from app.core.session_intel_store import (
+    BANK_PATTERN,
+    PHONE_PATTERN,
+    TACTIC_VOCABULARIES,
+    UPI_PATTERN,
+    URL_PATTERN,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "model_config/prefilter_model.json"
+N_HASH_FEATURES = 2 ** 18
+
+ENTITY_PATTERNS = {
+    "upi": UPI_PATTERN,
+    "phone": PHONE_PATTERN,
+    "link": URL_PATTERN,
+    "bank": BANK_PATTERN,
+}
+
+# Neutral, mildly confused replies for clearly benign openers; keeps the persona
+# without committing to anything the agent would have to contradict later
+BENIGN_REPLIES = [
+    "Hello! Sorry, who is this? I don't think I have this number saved.",
+    "Hi, I think you may have the wrong number. Who are you trying to reach?",
+    "Hello? Sorry, I didn't get that. Who is this please?",
+    "Hi! Do I know you? My phone doesn't show a name.",
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _hash(feature: str) -> int:
+    # crc32 rather than hash(): stable across processes (PYTHONHASHSEED)
+    return zlib.crc32(feature.encode("utf-8")) % N_HASH_FEATURES
+
+
+def featurize(text: str) -> Dict[int, float]:
+    """Sparse feature vector: hashed word uni/bigrams + vocabulary and entity indicators."""
+    lowered = text.lower()
+    tokens = _TOKEN_PATTERN.findall(lowered)
+    features: Dict[int, float] = {}
+    for i, token in enumerate(tokens):
+        index = _hash("w:" + token)
+        features[index] = features.get(index, 0.0) + 1.0
+        if i:
+            index = _hash("b:" + tokens[i - 1] + " " + token)
+            features[index] = features.get(index, 0.0) + 1.0
+    # Length-normalize the n-gram counts so long messages don't saturate the score
+    if tokens:
+        norm = 1.0 / math.sqrt(len(tokens))
+        for index in features:
+            features[index] *= norm
+    for tactic, words in TACTIC_VOCABULARIES.items():
+        hits = sum(1 for word in words if word in lowered)
+        if hits:
+            features[_hash("v:" + tactic)] = min(hits, 3) / 3.0
+    for entity in entity_hits(text):
+        features[_hash("e:" + entity)] = 1.0
+    return features
+
+
+def entity_hits(text: str) -> List[str]:
+    return [name for name, pattern in ENTITY_PATTERNS.items() if pattern.search(text)]
+
+
+class PreClassifier:
+    """Logistic scorer over featurize(); threshold is chosen at training time."""
+
+    def __init__(self, weights: Dict[int, float], bias: float, threshold: float):
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: str) -> "PreClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        weights = {int(k): float(v) for k, v in data["weights"].items()}
+        return cls(weights, float(data["bias"]), float(data["threshold"]))
+
+    def save(self, path: str, **meta) -> None:
+        data = {
+            "version": 1,
+            "n_hash_features": N_HASH_FEATURES,
+            "bias": self.bias,
+            "threshold": self.threshold,
+            "weights": {str(k): round(v, 6) for k, v in sorted(self.weights.items()) if abs(v) > 1e-6},
+            **meta,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+
+    def score(self, text: str) -> float:
+        """Probability that the message is a scam."""
+        z = self.bias + sum(self.weights.get(i, 0.0) * v for i, v in featurize(text).items())
+        if z < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def is_clearly_benign(self, text: str) -> bool:
+        # Any payment entity escalates regardless of score
+        return self.score(text) < self.threshold and not entity_hits(text)
+
+
+_classifier: Optional[PreClassifier] = None
+_loaded = False
+
+
+def get_classifier(path: str = DEFAULT_MODEL_PATH) -> Optional[PreClassifier]:
+    """Load the model once; None (pre-classifier disabled) if the file is missing or invalid."""
+    global _classifier, _loaded
+    if not _loaded:
+        _loaded = True
+        if os.path.exists(path):
+            try:
+                _classifier = PreClassifier.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Pre-classifier model %s could not be loaded: %s", path, e)
+        else:
+            logger.info("No pre-classifier model at %s; all messages go to the agent", path)
+    return _classifier
+
+
+def benign_reply() -> str:
+    return random.choice(BENIGN_REPLIES)
+
+
+__all__ = [
+    "DEFAULT_MODEL_PATH",
+    "BENIGN_REPLIES",
+    "featurize",
+    "entity_hits",
+    "PreClassifier",
+    "get_classifier",
+    "benign_reply",
+]
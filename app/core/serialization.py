@@ -0,0 +1,82 @@
+"""
+Fast JSON serialization for the request hot path.
+
+- dumps_bytes(): orjson when installed, otherwise compact stdlib json.
+- FastJSONResponse: JSONResponse rendered with dumps_bytes(); returned directly
+  from /analyze so FastAPI skips its response_model re-validation/encoding pass.
+- parse_body(): validates a raw request body with pydantic v2
+  model_validate_json() (single pass in pydantic-core, no intermediate dict),
+  raising FastAPI's RequestValidationError so clients still get a 422.
+"""
+from typing import Any, Dict, Type, TypeVar
+import json
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+async def parse_body(request: Request, model: Type[ModelT]) -> ModelT:
+    body = await request.body()
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        errors = [
+            {**error, "loc": ("body",) + tuple(error.get("loc", ()))}
+            for error in e.errors(include_url=False)
+        ]
+        raise RequestValidationError(errors, body=body)
+
+
+def _inline_defs(node: Any, defs: Dict[str, Any]) -> Any:
+    # "#/$defs/..." refs only resolve inside a standalone JSON schema, not in the
+    # OpenAPI document, so nested models are inlined (request models are not recursive)
+    if isinstance(node, dict):
+        ref = node.get("$ref", "")
+        if ref.startswith("#/$defs/"):
+            return _inline_defs(defs[ref[len("#/$defs/"):]], defs)
+        return {k: _inline_defs(v, defs) for k, v in node.items() if k != "$defs"}
+    if isinstance(node, list):
+        return [_inline_defs(v, defs) for v in node]
+    return node
+
+
+def request_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """openapi_extra for routes that parse their body with parse_body() instead of a typed parameter."""
+    schema = model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_defs(schema, schema.get("$defs", {}))}},
+        }
+    }
+
+
+__all__ = [
+    "dumps_bytes",
+    "FastJSONResponse",
+    "parse_body",
+    "request_body_openapi",
+]
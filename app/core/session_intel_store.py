@@ -2,12 +2,23 @@
 Session-persistent intelligence store for accumulating intel across multiple API requests.
 Keyed by session_id, managed with TTL for cleanup.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+from app.controllers.Agents.utils.memory_budget import SESSION_CACHE_BUDGET, deep_sizeof
+from app.core.entity_index import EntityIndex, ENTITY_UPI, ENTITY_PHONE, ENTITY_LINK, ENTITY_BANK
+from app.core import metrics
+from app.core.tracing import traced
+from app.core.serialization import dumps_bytes
+from app.core.callback_dispatcher import BatchedDispatcher
+from app.core.circuit_breaker import CALLBACK_BREAKER
+from collections import OrderedDict
+import asyncio
+import hashlib
 import logging
-import requests
-import json
+import os
 import re
+import threading
+import time
 
 # ============ REGEX PATTERNS FOR INTEL NORMALIZATION ============
 # UPI ID pattern: name@bank or name@upi
@@ -19,6 +30,19 @@ URL_PATTERN = re.compile(r'https?://[^\s<>"\')\]]+', re.IGNORECASE)
 # Bank account pattern: digits with optional dashes/spaces
 BANK_PATTERN = re.compile(r'\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{0,4}')
 
+# ============ SCAM TACTIC VOCABULARIES ============
+# Used for agent notes and as features of the pre-classifier (app/core/prefilter.py)
+URGENCY_WORDS = ["urgent", "immediate", "block", "suspend", "lock", "freeze", "expire", "hour", "minute", "today"]
+CREDENTIAL_WORDS = ["otp", "pin", "password", "cvv", "expiry", "card number", "secret"]
+AUTHORITY_WORDS = ["bank", "rbi", "police", "government", "official", "department", "officer"]
+PAYMENT_WORDS = ["upi", "transfer", "send", "payment", "account", "deposit"]
+TACTIC_VOCABULARIES = {
+    "urgency": URGENCY_WORDS,
+    "credential": CREDENTIAL_WORDS,
+    "authority": AUTHORITY_WORDS,
+    "payment": PAYMENT_WORDS,
+}
+
 def normalize_upi_ids(raw_list: List[str]) -> List[str]:
     """Extract and normalize UPI IDs to format: name@bank"""
     result = []
@@ -50,6 +74,12 @@ def normalize_phishing_links(raw_list: List[str]) -> List[str]:
         result.extend(matches)
     return list(set(result)) if result else raw_list
 
+def normalize_bank_accounts(raw_list: List[str]) -> List[str]:
+    """Normalize bank account numbers to bare digits (drops spaces/dashes)"""
+    result = [re.sub(r'\D', '', item) for item in raw_list]
+    result = [digits for digits in result if digits]
+    return list(set(result)) if result else raw_list
+
 def normalize_keywords(raw_list: List[str]) -> List[str]:
     """Normalize keywords to lowercase, stripped format"""
     return list(set([kw.lower().strip() for kw in raw_list if kw.strip()]))
@@ -67,23 +97,19 @@ def generate_agent_notes(intel: Dict[str, Any]) -> str:
     tactics = []
     
     # Urgency/Fear tactics
-    urgency_words = ["urgent", "immediate", "block", "suspend", "lock", "freeze", "expire", "hour", "minute", "today"]
-    if any(word in keywords_text for word in urgency_words):
+    if any(word in keywords_text for word in URGENCY_WORDS):
         tactics.append("urgency/fear tactics")
     
     # Credential theft attempts
-    credential_words = ["otp", "pin", "password", "cvv", "expiry", "card number", "secret"]
-    if any(word in keywords_text for word in credential_words):
+    if any(word in keywords_text for word in CREDENTIAL_WORDS):
         tactics.append("credential theft attempts")
     
     # Authority impersonation
-    authority_words = ["bank", "rbi", "police", "government", "official", "department", "officer"]
-    if any(word in keywords_text for word in authority_words):
+    if any(word in keywords_text for word in AUTHORITY_WORDS):
         tactics.append("authority impersonation")
     
     # Payment redirection
-    payment_words = ["upi", "transfer", "send", "payment", "account", "deposit"]
-    if any(word in keywords_text for word in payment_words):
+    if any(word in keywords_text for word in PAYMENT_WORDS):
         tactics.append("payment redirection")
     
     # Build tactics summary
@@ -117,9 +143,48 @@ logger = logging.getLogger(__name__)
 
 # Session store: Maps session_id -> accumulated intelligence
 # TTL of 1 hour (3600 seconds) to clean up inactive sessions
-_SESSION_INTEL_STORE: TtlLruCache = TtlLruCache(maxsize=500, ttl_seconds=3600)
+# Sessions untouched for SESSION_IDLE_SECONDS get a final callback (they stay in the
+# store and can resume; see the end-of-session section below)
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "300"))
+_SESSION_INTEL_STORE: TtlLruCache = TtlLruCache(maxsize=500, ttl_seconds=3600, idle_seconds=SESSION_IDLE_SECONDS,
+                                                 sizer=deep_sizeof, budget=SESSION_CACHE_BUDGET)
+metrics.track_cache("session_intel", _SESSION_INTEL_STORE)
+metrics.REGISTRY.gauge("honeypot_live_sessions", "Sessions currently held in the intel store",
+                       func=lambda: len(_SESSION_INTEL_STORE))
+
+# Cross-session entity index (campaign correlation).
+# Postings are dropped when their session leaves _SESSION_INTEL_STORE, so the
+# index shares the store's TTL/LRU bound.
+_ENTITY_INDEX = EntityIndex(normalizers={
+    ENTITY_UPI: normalize_upi_ids,
+    ENTITY_PHONE: normalize_phone_numbers,
+    ENTITY_LINK: normalize_phishing_links,
+    ENTITY_BANK: normalize_bank_accounts,
+})
+_SESSION_INTEL_STORE.add_listener(lambda session_id, _intel, _reason: _ENTITY_INDEX.remove_session(session_id))
 
-CALLBACK_URL = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
+# Overridable so load tests and staging can point callbacks at a local stand-in
+CALLBACK_URL = os.getenv("GUVI_CALLBACK_URL", "https://hackathon.guvi.in/api/updateHoneyPotFinalResult")
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Callback policy: post only when the session's intel content (entities, scam flag)
+# changed since the last successful callback, and at most once per
+# CALLBACK_MIN_INTERVAL_SECONDS. A change inside the interval stays pending until the
+# next tool call after it, or the final flush when the session leaves the store.
+CALLBACK_DEDUP_ENABLED = os.getenv("CALLBACK_DEDUP_ENABLED", "true").lower() != "false"
+CALLBACK_MIN_INTERVAL_SECONDS = float(os.getenv("CALLBACK_MIN_INTERVAL_SECONDS", "5"))
+CALLBACK_FINAL_FLUSH_ENABLED = os.getenv("CALLBACK_FINAL_FLUSH_ENABLED", "true").lower() != "false"
+_clock = time.monotonic  # replaced by replay tools running on simulated time
+
+# While the callback endpoint's circuit is open (app/core/circuit_breaker.py) callbacks
+# are not attempted; the session is parked in the outbox instead (latest state wins,
+# oldest sessions dropped beyond CALLBACK_OUTBOX_MAX) and re-sent as a final callback
+# once the circuit lets calls through again (drained by the sweep task).
+CALLBACK_OUTBOX_MAX = int(os.getenv("CALLBACK_OUTBOX_MAX", "10000"))
+_CALLBACK_OUTBOX: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_OUTBOX_LOCK = threading.Lock()
+metrics.REGISTRY.gauge("honeypot_callback_outbox", "Sessions whose callback waits for the endpoint's circuit to close",
+                       func=lambda: len(_CALLBACK_OUTBOX))
 
 def get_session_intel(session_id: str) -> Dict[str, Any]:
     """Get accumulated intel for a session."""
@@ -133,6 +198,10 @@ def get_session_intel(session_id: str) -> Dict[str, Any]:
             "suspiciousKeywords": [],
             "scam_detected": False,
             "callback_sent": False,
+            "callback_fingerprint": None,  # content digest of the last successful callback
+            "callback_full_fingerprint": None,  # ... including message count and notes
+            "callback_sent_at": None,
+            "callback_pending": False,  # a changed payload was deferred by the min interval
             "message_count": 0,
             "agent_notes": ""
         }
@@ -140,6 +209,54 @@ def get_session_intel(session_id: str) -> Dict[str, Any]:
     return intel
 
 
+def intel_delta(
+    intel: Dict[str, Any],
+    bank_accounts: Optional[List[str]] = None,
+    upi_ids: Optional[List[str]] = None,
+    phishing_links: Optional[List[str]] = None,
+    phone_numbers: Optional[List[str]] = None,
+    suspicious_keywords: Optional[List[str]] = None,
+    scam_detected: bool = False,
+) -> Dict[str, Any]:
+    """
+    What a report would add to the session's record, as update_session_intel() keyword
+    arguments: per list, the values not stored yet (same exact-match dedup as the merge),
+    and scam_detected if it newly confirms the scam. Empty when the report is redundant.
+    """
+    delta: Dict[str, Any] = {}
+    for argument, field, values in (
+        ("bank_accounts", "bankAccounts", bank_accounts),
+        ("upi_ids", "upiIds", upi_ids),
+        ("phishing_links", "phishingLinks", phishing_links),
+        ("phone_numbers", "phoneNumbers", phone_numbers),
+        ("suspicious_keywords", "suspiciousKeywords", suspicious_keywords),
+    ):
+        if values:
+            known = set(intel[field])
+            new = [value for value in dict.fromkeys(values) if value not in known]
+            if new:
+                delta[argument] = new
+    if scam_detected and not intel["scam_detected"]:
+        delta["scam_detected"] = True
+    return delta
+
+
+def note_session_turn(intel: Dict[str, Any], message_count: int, agent_notes: str = "") -> None:
+    """Message count and notes of a redundant report: updated in place, no store write."""
+    if message_count > intel["message_count"]:
+        intel["message_count"] = message_count
+    if agent_notes:
+        intel["agent_notes"] = agent_notes
+
+
+async def aupdate_session_intel(session_id: str, **kwargs: Any) -> Dict[str, Any]:
+    """
+    update_session_intel() for async callers. The merge itself never blocks (no I/O;
+    store listeners only enqueue final callbacks), so it runs inline on the loop.
+    """
+    return update_session_intel(session_id, **kwargs)
+
+
 def update_session_intel(
     session_id: str, 
     bank_accounts: Optional[List[str]] = None,
@@ -149,13 +266,17 @@ def update_session_intel(
     suspicious_keywords: Optional[List[str]] = None,
     scam_detected: bool = False,
     message_count: int = 0,
-    agent_notes: str = ""
+    agent_notes: str = "",
+    intel: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Merge new intel into session's accumulated store.
+    `intel` is the session's record when the caller already holds it (the turn's
+    RequestContext); it is written back, so a record evicted mid-turn is restored.
     Returns the updated intel dict.
     """
-    intel = get_session_intel(session_id)
+    if intel is None:
+        intel = get_session_intel(session_id)
     
     # Merge lists (deduplicate)
     if bank_accounts:
@@ -178,9 +299,27 @@ def update_session_intel(
         intel["agent_notes"] = agent_notes
     
     _SESSION_INTEL_STORE.set(session_id, intel)
+
+    # Index only the newly reported entities (incremental update)
+    if bank_accounts:
+        _ENTITY_INDEX.add(session_id, ENTITY_BANK, bank_accounts)
+    if upi_ids:
+        _ENTITY_INDEX.add(session_id, ENTITY_UPI, upi_ids)
+    if phishing_links:
+        _ENTITY_INDEX.add(session_id, ENTITY_LINK, phishing_links)
+    if phone_numbers:
+        _ENTITY_INDEX.add(session_id, ENTITY_PHONE, phone_numbers)
+    if session_id not in _SESSION_INTEL_STORE:
+        # Removed after set(): its listener may have run before the postings above existed
+        _ENTITY_INDEX.remove_session(session_id)
     return intel
 
 
+def lookup_entity(entity_type: str, value: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+    """Find live sessions that reported the given entity (normalized the same way as callbacks)."""
+    return _ENTITY_INDEX.lookup(entity_type, value, limit=limit)
+
+
 def should_send_callback(intel: Dict[str, Any]) -> bool:
     """
     Determine if callback should be sent based on intel quality.
@@ -203,15 +342,9 @@ def should_send_callback(intel: Dict[str, Any]) -> bool:
     return has_bank or has_upi or has_phone or has_link
 
 
-def send_callback_if_ready(session_id: str, intel: Dict[str, Any]) -> bool:
-    """
-    Send callback to GUVI if conditions are met.
-    Returns True if callback was sent successfully.
-    """
-    if not should_send_callback(intel):
-        return False
-    
-    payload = {
+def build_callback_payload(session_id: str, intel: Dict[str, Any]) -> Dict[str, Any]:
+    """Final-result payload (FinalResultPayload shape) from a session intel record."""
+    return {
         "sessionId": session_id,
         "scamDetected": intel.get("scam_detected", False),
         "totalMessagesExchanged": intel.get("message_count", 0),
@@ -224,19 +357,274 @@ def send_callback_if_ready(session_id: str, intel: Dict[str, Any]) -> bool:
         },
         "agentNotes": generate_agent_notes(intel)
     }
-    
-    logger.info(f"📤 Sending callback for session {session_id}: {json.dumps(payload)}")
-    
+
+
+def callback_fingerprints(payload: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    (content digest, full digest) of a callback payload. Content covers the scam flag
+    and extracted entities (list order ignored); full adds the message count and notes.
+    """
+    extracted = {key: sorted(values) for key, values in payload["extractedIntelligence"].items()}
+    content = dumps_bytes({"scamDetected": payload["scamDetected"], "extractedIntelligence": extracted})
+    content_digest = hashlib.blake2b(content, digest_size=16)
+    full_digest = content_digest.copy()
+    full_digest.update(dumps_bytes([payload["totalMessagesExchanged"], payload["agentNotes"]]))
+    return content_digest.hexdigest(), full_digest.hexdigest()
+
+
+def _encode_callback(session_id: str, payload: Dict[str, Any]) -> bytes:
+    # Serialized once: the same bytes are posted and (only if INFO is enabled) logged
+    body = dumps_bytes(payload)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("📤 Sending callback for session %s: %s", session_id, body.decode("utf-8"))
+    return body
+
+
+def _record_response(response: Any, start: float) -> bool:
+    metrics.CALLBACK_LATENCY.observe(time.perf_counter() - start)
+    if response.status_code == 200:
+        logger.info("✅ Callback sent successfully.")
+        metrics.CALLBACK_OUTCOMES.labels("success").inc()
+        CALLBACK_BREAKER.record_success()
+        return True
+    # Other 4xx: the endpoint is up and rejected this payload; only 5xx/429 count against it
+    if response.status_code >= 500 or response.status_code == 429:
+        CALLBACK_BREAKER.record_failure()
+    else:
+        CALLBACK_BREAKER.record_success()
+    logger.warning("⚠️ Callback failed: %s - %s", response.status_code, response.text)
+    metrics.CALLBACK_OUTCOMES.labels("http_error").inc()
+    return False
+
+
+def _record_error(error: Exception, start: float) -> bool:
+    metrics.CALLBACK_LATENCY.observe(time.perf_counter() - start)
+    metrics.CALLBACK_OUTCOMES.labels("exception").inc()
+    CALLBACK_BREAKER.record_failure()
+    logger.error("❌ Callback error: %s", error)
+    return False
+
+
+def _circuit_allows(session_id: str, intel: Dict[str, Any]) -> bool:
+    """Take a call from the endpoint's circuit; when it is open, park the session in the outbox."""
+    if CALLBACK_BREAKER.allow():
+        return True
+    metrics.CALLBACK_OUTCOMES.labels("circuit_open").inc()
+    with _OUTBOX_LOCK:
+        _CALLBACK_OUTBOX[session_id] = intel
+        _CALLBACK_OUTBOX.move_to_end(session_id)
+        if len(_CALLBACK_OUTBOX) > CALLBACK_OUTBOX_MAX:
+            _CALLBACK_OUTBOX.popitem(last=False)
+            metrics.CALLBACK_OUTCOMES.labels("outbox_dropped").inc()
+    return False
+
+
+def drain_callback_outbox(force: bool = False) -> int:
+    """
+    Queue the parked sessions as final callbacks once the circuit accepts calls again
+    (or unconditionally with `force`, at shutdown). Returns how many were queued.
+    """
+    if not _CALLBACK_OUTBOX or not (force or CALLBACK_BREAKER.accepting()):
+        return 0
+    with _OUTBOX_LOCK:
+        parked = list(_CALLBACK_OUTBOX.items())
+        _CALLBACK_OUTBOX.clear()
+    for session_id, intel in parked:
+        _FINAL_CALLBACKS.submit(session_id, intel)
+    logger.info("Re-queued %d parked callbacks", len(parked))
+    return len(parked)
+
+
+def _post_callback(session_id: str, payload: Dict[str, Any]) -> bool:
+    body = _encode_callback(session_id, payload)
+    start = time.perf_counter()
     try:
-        response = requests.post(CALLBACK_URL, json=payload, timeout=5)
-        if response.status_code == 200:
-            logger.info("✅ Callback sent successfully.")
-            intel["callback_sent"] = True
-            _SESSION_INTEL_STORE.set(session_id, intel)
-            return True
-        else:
-            logger.warning(f"⚠️ Callback failed: {response.status_code} - {response.text}")
-            return False
+        from app.core.http_clients import get_http_clients  # deferred: keeps httpx out of app import time
+        # Pooled keep-alive connection to the callback host instead of a new TCP+TLS handshake per call
+        response = get_http_clients().client(CALLBACK_URL).post(CALLBACK_URL, content=body, headers=_JSON_HEADERS, timeout=5)
     except Exception as e:
-        logger.error(f"❌ Callback error: {e}")
+        return _record_error(e, start)
+    return _record_response(response, start)
+
+
+async def _apost_callback(session_id: str, payload: Dict[str, Any]) -> bool:
+    body = _encode_callback(session_id, payload)
+    start = time.perf_counter()
+    try:
+        from app.core.http_clients import get_http_clients
+        client = get_http_clients().async_client(CALLBACK_URL)
+        response = await client.post(CALLBACK_URL, content=body, headers=_JSON_HEADERS, timeout=5)
+    except asyncio.CancelledError:
+        CALLBACK_BREAKER.release()  # outcome unknown (dispatcher shutting down)
+        raise
+    except Exception as e:
+        return _record_error(e, start)
+    return _record_response(response, start)
+
+
+def _mark_sent(intel: Dict[str, Any], fingerprints: Tuple[str, str]) -> None:
+    intel["callback_sent"] = True
+    intel["callback_fingerprint"], intel["callback_full_fingerprint"] = fingerprints
+    intel["callback_sent_at"] = _clock()
+    intel["callback_pending"] = False
+
+
+def _live_payload(session_id: str, intel: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Tuple[str, str]]]:
+    """Payload and fingerprints if a callback is due now under the callback policy, else None."""
+    if not should_send_callback(intel):
+        metrics.CALLBACK_OUTCOMES.labels("skipped").inc()
+        return None
+
+    payload = build_callback_payload(session_id, intel)
+    fingerprints = callback_fingerprints(payload)
+    if CALLBACK_DEDUP_ENABLED:
+        if fingerprints[0] == intel.get("callback_fingerprint"):
+            # e.g. the LLM re-reported an entity that is already saved
+            metrics.CALLBACK_OUTCOMES.labels("unchanged").inc()
+            return None
+        sent_at = intel.get("callback_sent_at")
+        if sent_at is not None and _clock() - sent_at < CALLBACK_MIN_INTERVAL_SECONDS:
+            intel["callback_pending"] = True
+            metrics.CALLBACK_OUTCOMES.labels("deferred").inc()
+            return None
+    return payload, fingerprints
+
+
+@traced("send_callback_if_ready")
+def send_callback_if_ready(session_id: str, intel: Dict[str, Any]) -> bool:
+    """
+    Send callback to GUVI if conditions are met and the intel changed since the last one
+    (see CALLBACK_DEDUP_ENABLED / CALLBACK_MIN_INTERVAL_SECONDS).
+    Returns True if callback was sent successfully.
+
+    Updates `intel` in place and never writes it back to the store: the session may
+    have expired, been evicted or been flushed by the drain while the POST ran, and
+    the thread this runs on (a tool worker, the callback dispatcher) must not evict
+    other sessions.
+    """
+    prepared = _live_payload(session_id, intel)
+    if prepared is None or not _circuit_allows(session_id, intel) or not _post_callback(session_id, prepared[0]):
         return False
+    _mark_sent(intel, prepared[1])
+    return True
+
+
+async def asend_callback_if_ready(session_id: str, intel: Dict[str, Any]) -> bool:
+    """send_callback_if_ready() on the async HTTP client."""
+    prepared = _live_payload(session_id, intel)
+    if prepared is None or not _circuit_allows(session_id, intel) or not await _apost_callback(session_id, prepared[0]):
+        return False
+    _mark_sent(intel, prepared[1])
+    return True
+
+
+# Async tool path: the tool only enqueues (O(1)); the policy checks and the POST run on
+# the dispatcher's thread, and a session enqueued again before its turn is sent once,
+# with its latest state
+_LIVE_CALLBACKS = BatchedDispatcher("callback", asend_callback_if_ready)
+
+
+def enqueue_callback(session_id: str, intel: Dict[str, Any]) -> bool:
+    """Queue send_callback_if_ready() off the caller's event loop; False if no callback can be due."""
+    if not should_send_callback(intel):
+        metrics.CALLBACK_OUTCOMES.labels("skipped").inc()
+        return False
+    return _LIVE_CALLBACKS.submit(session_id, intel)
+
+
+# ============ END OF SESSION ============
+# A session "ends" when it goes idle (no tool call or turn for SESSION_IDLE_SECONDS)
+# or leaves the store (TTL expiry, LRU eviction, delete). Either way its latest state
+# is flushed as a final callback, unless exactly that payload was already sent.
+# Cache listeners only queue the session on a BatchedDispatcher (O(1)); payloads are
+# built and posted on the dispatcher's own thread and event loop.
+
+def _final_payload(session_id: str, intel: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Tuple[str, str]]]:
+    if not should_send_callback(intel):
+        return None
+    payload = build_callback_payload(session_id, intel)
+    fingerprints = callback_fingerprints(payload)
+    if fingerprints[1] == intel.get("callback_full_fingerprint"):
+        metrics.CALLBACK_OUTCOMES.labels("unchanged").inc()
+        return None
+    return payload, fingerprints
+
+
+def flush_session_callback(session_id: str, intel: Dict[str, Any]) -> bool:
+    """
+    Final callback when a session ends: post the latest state unless exactly this
+    payload (including message count) was already sent. Does not touch the store,
+    so it is safe for sessions that were just removed from it.
+    """
+    prepared = _final_payload(session_id, intel)
+    if prepared is None or not _circuit_allows(session_id, intel) or not _post_callback(session_id, prepared[0]):
+        return False
+    _mark_sent(intel, prepared[1])
+    return True
+
+
+async def aflush_session_callback(session_id: str, intel: Dict[str, Any]) -> bool:
+    """flush_session_callback() on the async HTTP client (used by the dispatcher)."""
+    prepared = _final_payload(session_id, intel)
+    if prepared is None or not _circuit_allows(session_id, intel) or not await _apost_callback(session_id, prepared[0]):
+        return False
+    _mark_sent(intel, prepared[1])
+    return True
+
+
+_FINAL_CALLBACKS = BatchedDispatcher("final_callback", aflush_session_callback)
+
+
+def _queue_final_callback(session_id: str, intel: Dict[str, Any], _reason: str = "idle") -> None:
+    if CALLBACK_FINAL_FLUSH_ENABLED and should_send_callback(intel):
+        _FINAL_CALLBACKS.submit(session_id, intel)
+
+
+_SESSION_INTEL_STORE.add_listener(_queue_final_callback)
+_SESSION_INTEL_STORE.add_idle_listener(_queue_final_callback)
+
+
+async def sweep_sessions_background_task(interval_seconds: float = 5.0, chunk: int = 1000):
+    """
+    Background task (started by the lifespan handler): expire sessions past the TTL and
+    detect idle ones, and re-queue parked callbacks once the endpoint's circuit allows.
+    Sweeps in chunks and yields between them so a large expiry wave never holds the
+    event loop for long.
+    """
+    logger.info("Session sweep task started (interval=%ss, idle=%ss)", interval_seconds, SESSION_IDLE_SECONDS)
+    while True:
+        try:
+            while _SESSION_INTEL_STORE.sweep(limit=chunk) >= chunk:
+                await asyncio.sleep(0)
+            drain_callback_outbox()
+        except Exception as e:
+            logger.error("❌ Error during session sweep: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
+def flush_live_sessions() -> int:
+    """
+    Shutdown: queue a final callback for every session still in the store (the intel
+    lives only in this process), unless its latest state was already sent. Returns
+    how many were queued.
+    """
+    if not CALLBACK_FINAL_FLUSH_ENABLED:
+        return 0
+    queued = 0
+    for session_id, intel in _SESSION_INTEL_STORE.items():
+        if should_send_callback(intel) and _FINAL_CALLBACKS.submit(session_id, intel):
+            queued += 1
+    if queued:
+        logger.info("Queued final callbacks for %d live sessions", queued)
+    return queued
+
+
+def close_final_callbacks(timeout: float = 10.0) -> Dict[str, int]:
+    """Post the live and final callbacks still queued (lifespan shutdown); returns what was abandoned."""
+    deadline = time.monotonic() + timeout
+    abandoned = _LIVE_CALLBACKS.close(timeout)["abandoned"]
+    drain_callback_outbox(force=True)  # last attempt; those the open circuit refuses again are lost
+    result = _FINAL_CALLBACKS.close(max(0.0, deadline - time.monotonic()))
+    result["abandoned"] += abandoned
+    result["outbox"] = len(_CALLBACK_OUTBOX)
+    return result
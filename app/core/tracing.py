@@ -0,0 +1,294 @@
+"""
+Per-turn span tracing.
+
+A TraceContext is created for every /analyze turn and carried in
+the turn's RequestContext (app.core.execution_context), so tools and context callables running deep
+inside the agent can attach child spans. The active span is tracked in its own
+ContextVar, which asyncio tasks, asyncio.to_thread() and
+execution_context.run_in_executor() copy.
+
+Finished traces are exported as one OTLP/JSON `ExportTraceServiceRequest` per
+line (the format written by the OpenTelemetry collector file exporter).
+Sampling is decided when the turn ends: a random TRACE_SAMPLE_RATE fraction is
+kept, and any turn slower than TRACE_SLOW_SECONDS is always kept so timeouts
+can be diagnosed. Inspect exported traces with scripts/trace_report.py.
+Nothing is exported unless TRACE_EXPORT_PATH names an absolute path (it is
+empty by default, so a server never fills its working directory).
+
+Export never touches the file on the event loop: finished traces are handed
+to a bounded queue and a writer thread (logging's QueueListener, as for log
+records in app/core/logging_config.py) encodes and appends them. The file is
+rotated at TRACE_EXPORT_MAX_BYTES, keeping TRACE_EXPORT_BACKUPS old files; a
+full queue drops the trace (honeypot_traces_dropped_total).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import atexit
+import functools
+import inspect
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.execution_context import get_trace
+from app.core.serialization import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "honeypot-api"
+
+TRACES_DROPPED = metrics.REGISTRY.counter(
+    "honeypot_traces_dropped_total", "Sampled traces not exported because the export queue was full")
+
+
+class Span:
+    """A timed unit of work inside a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class TraceContext:
+    """Collects the spans of one turn until the root span finishes."""
+
+    __slots__ = ("trace_id", "spans", "root")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+
+
+class _OtlpFormatter(logging.Formatter):
+    """Encodes the TraceContext carried in record.msg as one ExportTraceServiceRequest line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        trace: TraceContext = record.msg
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [span.to_otlp() for span in trace.spans],
+                }],
+            }]
+        }
+        return dumps_bytes(request).decode("utf-8")
+
+
+class _WriterThread(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for a free slot: the queue may be full of traces when close() is called
+        self.queue.put(self._sentinel)
+
+
+class JsonlSpanExporter:
+    """
+    Appends one OTLP/JSON trace per line to a local file, from a writer thread.
+
+    export() only enqueues (dropping when `queue_size` traces are waiting); the
+    thread starts on the first export and is stopped by close(), which writes
+    out what is queued. The file rotates at `max_bytes` (0: no cap) with
+    `backups` old files kept as <path>.1 ... <path>.<backups>.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 2**20, backups: int = 3, queue_size: int = 1000):
+        self.path = path
+        self._writer = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self._writer.setFormatter(_OtlpFormatter())
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self._listener: Optional[_WriterThread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: TraceContext) -> None:
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = _WriterThread(self._queue, self._writer)
+                    self._listener.start()
+        record = logging.LogRecord(__name__, logging.INFO, "", 0, trace, None, None)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Write out the queued traces and stop the writer thread (a later export starts it again)."""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+        self._writer.close()
+
+
+def _default_exporter() -> Optional[JsonlSpanExporter]:
+    path = settings.TRACE_EXPORT_PATH
+    if not settings.TRACING_ENABLED or not path:
+        return None
+    if not os.path.isabs(path):
+        logger.warning("TRACE_EXPORT_PATH %r is not an absolute path; traces are not exported", path)
+        return None
+    return JsonlSpanExporter(path, settings.TRACE_EXPORT_MAX_BYTES, settings.TRACE_EXPORT_BACKUPS,
+                             settings.TRACE_EXPORT_QUEUE_SIZE)
+
+
+_exporter: Optional[JsonlSpanExporter] = _default_exporter()
+
+# Active span for parent/child linkage (copied into tasks and to_thread workers)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def set_exporter(exporter: Optional[Any]) -> None:
+    """Replace the exporter (any object with export(trace)); None disables tracing."""
+    global _exporter
+    _exporter = exporter
+
+
+def shutdown() -> None:
+    """Flush queued traces to the file (app shutdown, interpreter exit)."""
+    close = getattr(_exporter, "close", None)
+    if close is not None:
+        close()
+
+
+def start_trace() -> Optional[TraceContext]:
+    """Begin a new trace for a turn, or return None when tracing is disabled."""
+    if _exporter is None:
+        return None
+    return TraceContext()
+
+
+def current_trace() -> Optional[TraceContext]:
+    """Trace of the current turn, as carried in session_context."""
+    return get_trace()
+
+
+@contextmanager
+def span(name: str, trace: Optional[TraceContext] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the active span. No-op (yields None) outside a traced turn.
+    The trace's first span becomes its root; the trace is exported when the root ends.
+    """
+    trace = trace or current_trace()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace.trace_id, parent.span_id if parent and parent.trace_id == trace.trace_id else None, name, attributes)
+    if trace.root is None:
+        trace.root = current
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.spans.append(current)
+        if trace.root is current:
+            _finish(trace)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of span() for sync and async functions (keeps the signature for tool schemas)."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _export_queue_depth() -> int:
+    depth = getattr(_exporter, "queue_depth", None)
+    return depth() if depth is not None else 0
+
+
+metrics.REGISTRY.gauge("honeypot_trace_queue_depth", "Traces waiting for the export writer thread",
+                       func=_export_queue_depth)
+
+
+def _finish(trace: TraceContext) -> None:
+    exporter = _exporter
+    if exporter is None or trace.root is None:
+        return
+    if trace.root.duration < settings.TRACE_SLOW_SECONDS and random.random() >= settings.TRACE_SAMPLE_RATE:
+        return
+    try:
+        exporter.export(trace)
+    except Exception as e:
+        logger.warning("Trace export failed: %s", e)
+
+
+atexit.register(shutdown)
+
+__all__ = [
+    "Span",
+    "TraceContext",
+    "JsonlSpanExporter",
+    "set_exporter",
+    "shutdown",
+    "start_trace",
+    "current_trace",
+    "span",
+    "traced",
+]
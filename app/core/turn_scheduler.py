@@ -0,0 +1,236 @@
+"""
+Priority admission for agent turns when LLM capacity is saturated.
+
+At most `capacity` turns run the agent at once (LLM_TURN_CONCURRENCY). While
+all slots are busy, waiting turns are ranked by what the session's next turn
+is likely to yield instead of being served first come, first served.
+turn_priority() scores them from the session's intel record:
+
+- confirmed scams (scam_detected) that still miss entity types come first,
+  the more types missing the higher (a scammer who has shared nothing yet
+  still holds everything; one who shared most of it has little left);
+- then confirmed scams with every entity type extracted;
+- then unconfirmed sessions, by message count (engaged conversations first).
+
+Ties go to the earlier deadline, then to arrival order. A turn still waiting
+at its deadline leaves the queue (the caller answers with a fallback reply)
+instead of taking a slot it can no longer use.
+
+Starvation protection is per session: a turn that expired in the queue sets
+STARVED_FLAG on the session's intel record, and the session's next turn
+ranks above everything else. A conversation therefore never gets two
+fallback replies in a row from queueing, however many high-value sessions
+compete. Optionally (`aging` > 0) a waiting turn also gains `aging` value
+per second; the key value + aging * (now - enqueued_at) then differs between
+two waiters by a constant, so it is fixed at enqueue time and no turn is
+overtaken by later arrivals for more than 1 / aging seconds. Under heavy
+overload that hard bound costs most of the benefit of ranking (see
+scripts/sim_turn_scheduler.py), so it is off by default.
+
+TurnQueue is the ordering alone on an explicit clock (also driven by the
+simulator); TurnScheduler adds the slots and asyncio futures, one per event
+loop.
+"""
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+import weakref
+
+from app.core import metrics
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+TURN_QUEUE_DEPTH = metrics.REGISTRY.gauge("honeypot_turn_queue_depth", "Agent turns waiting for an LLM slot")
+TURN_QUEUE_WAIT = metrics.REGISTRY.histogram("honeypot_turn_queue_wait_seconds", "Time queued turns waited for an LLM slot")
+TURN_ADMISSIONS = metrics.REGISTRY.counter(
+    "honeypot_turn_admissions_total", "Turn scheduler decisions (immediate, queued, expired)", ("outcome",))
+
+ENTITY_FIELDS = ("bankAccounts", "upiIds", "phishingLinks", "phoneNumbers")
+ENGAGED_MESSAGES = 10  # message count at which a session counts as fully engaged
+STARVED_FLAG = "turn_starved"  # intel record key: the session's last turn expired in the queue
+
+
+def turn_priority(intel: Optional[Dict[str, Any]], message_count: int) -> float:
+    """Value of running this session's next turn, 0..1 (see module docstring)."""
+    if not intel:
+        return 0.0
+    if intel.get(STARVED_FLAG):
+        return 1.0
+    engagement = min(message_count, ENGAGED_MESSAGES) / ENGAGED_MESSAGES
+    if not intel.get("scam_detected"):
+        return 0.3 * engagement
+    missing = sum(1 for field in ENTITY_FIELDS if not intel.get(field))
+    if not missing:
+        return 0.3 + 0.1 * engagement
+    return 0.5 + 0.3 * missing / len(ENTITY_FIELDS) + 0.1 * engagement
+
+
+class TurnTimeout(Exception):
+    """The turn's deadline passed while it waited for a slot."""
+
+
+class Waiter:
+    __slots__ = ("item", "cancelled")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.cancelled = False
+
+
+class TurnQueue:
+    """Priority queue with optional aging; see module docstring. Cancelled waiters are skipped lazily."""
+
+    def __init__(self, aging: float = 0.0):
+        self.aging = aging
+        self._heap: List[Tuple[float, float, int, Waiter]] = []
+        self._seq = itertools.count()
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def push(self, item: Any, value: float, now: float, deadline: float = math.inf) -> Waiter:
+        waiter = Waiter(item)
+        # value + aging * (t - now), ranked at any later t, is this key plus a common term
+        heapq.heappush(self._heap, (self.aging * now - value, deadline, next(self._seq), waiter))
+        self._live += 1
+        return waiter
+
+    def cancel(self, waiter: Waiter) -> None:
+        if not waiter.cancelled:
+            waiter.cancelled = True
+            self._live -= 1
+
+    def pop(self) -> Optional[Waiter]:
+        heap = self._heap
+        while heap:
+            waiter = heapq.heappop(heap)[3]
+            if not waiter.cancelled:
+                waiter.cancelled = True  # served; no longer cancellable
+                self._live -= 1
+                return waiter
+        return None
+
+
+class TurnScheduler:
+    """`capacity` slots per event loop, handed to waiting turns in TurnQueue order."""
+
+    def __init__(self, capacity: int, aging: float = 0.0):
+        self.capacity = capacity
+        self.active = 0
+        self._queue = TurnQueue(aging)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, value: float, deadline: float) -> float:
+        """Take a slot (deadline: time.monotonic() based); returns the seconds waited. Raises TurnTimeout."""
+        if self.active < self.capacity and not self._queue:
+            self.active += 1
+            TURN_ADMISSIONS.labels("immediate").inc()
+            return 0.0
+        now = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        waiter = self._queue.push(future, value, now, deadline)
+        TURN_QUEUE_DEPTH.inc()
+        try:
+            with span("turn_queue", value=round(value, 3), depth=len(self._queue)):
+                await asyncio.wait_for(future, max(0.0, deadline - now))
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # 3.12+ wait_for can time out after release() handed us the slot in the same loop iteration
+                self.release()
+            else:
+                self._queue.cancel(waiter)
+            TURN_ADMISSIONS.labels("expired").inc()
+            raise TurnTimeout() from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as the caller went away
+            else:
+                self._queue.cancel(waiter)
+            raise
+        finally:
+            TURN_QUEUE_DEPTH.dec()
+        waited = time.monotonic() - now
+        TURN_ADMISSIONS.labels("queued").inc()
+        TURN_QUEUE_WAIT.observe(waited)
+        return waited
+
+    def release(self) -> None:
+        """Give the slot to the best waiting turn, or free it."""
+        while True:
+            waiter = self._queue.pop()
+            if waiter is None:
+                self.active -= 1
+                return
+            if not waiter.item.done():
+                waiter.item.set_result(None)  # the slot passes on; active is unchanged
+                return
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TurnScheduler]" = weakref.WeakKeyDictionary()
+_capacity = 64
+_aging = 0.0
+
+
+def configure(capacity: int = 64, aging: float = 0.0) -> None:
+    """capacity <= 0 disables admission control (every turn runs at once)."""
+    global _capacity, _aging
+    _capacity, _aging = capacity, aging
+    _schedulers.clear()
+
+
+def get_scheduler() -> Optional[TurnScheduler]:
+    """Scheduler for the running event loop (futures are loop-bound), or None when disabled."""
+    if _capacity <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = TurnScheduler(_capacity, _aging)
+    return scheduler
+
+
+@asynccontextmanager
+async def admit(intel: Optional[Dict[str, Any]], message_count: int, deadline: float) -> AsyncIterator[None]:
+    """
+    Hold an LLM slot for the block, ranked by the session's intel record.
+    Raises TurnTimeout if no slot frees up before `deadline`; the record is
+    flagged so the session's next turn goes first.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        yield
+        return
+    try:
+        await scheduler.acquire(turn_priority(intel, message_count), deadline)
+    except TurnTimeout:
+        if intel is not None:
+            intel[STARVED_FLAG] = True
+        raise
+    if intel is not None:
+        intel.pop(STARVED_FLAG, None)
+    try:
+        yield
+    finally:
+        scheduler.release()
+
+
+__all__ = [
+    "ENTITY_FIELDS",
+    "STARVED_FLAG",
+    "turn_priority",
+    "TurnTimeout",
+    "TurnQueue",
+    "TurnScheduler",
+    "configure",
+    "get_scheduler",
+    "admit",
+]
@@ -0,0 +1,65 @@
+"""
+Cold-start control: pre-import heavy modules that the app loads lazily.
+
+The API process imports masai (and through it the OpenAI/Gemini SDKs, pandas,
+numpy), the HONEYPOT agent and the outbound HTTP clients (httpx) only on first use. At startup the
+lifespan handler either imports them before serving (default) or, with
+FAST_START=true, pre-warms them in a background thread after the server is up
+so the first session does not pay the import cost.
+"""
+from typing import Dict, Optional
+import asyncio
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the request path; listed heaviest first
+HEAVY_MODULES = (
+    "masai.AgentManager.AgentManager",
+    "app.controllers.Agents.HONEYPOT.honeypot_agent",
+    "app.core.http_clients",
+)
+
+# module -> seconds spent importing it during pre-warm (None if unavailable)
+_import_times: Dict[str, Optional[float]] = {}
+_warm = threading.Event()
+
+
+def prewarm() -> Dict[str, Optional[float]]:
+    """Import HEAVY_MODULES (idempotent; already-imported modules cost nothing)."""
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            _import_times[name] = time.perf_counter() - start
+        except ImportError:
+            _import_times[name] = None
+    _warm.set()
+    logger.info("Pre-warm complete: %s", {k: (round(v, 3) if v is not None else None) for k, v in _import_times.items()})
+    return dict(_import_times)
+
+
+async def prewarm_in_background() -> None:
+    """Yield once so the server finishes binding, then import in a worker thread."""
+    await asyncio.sleep(0)
+    await asyncio.to_thread(prewarm)
+
+
+def is_warm() -> bool:
+    return _warm.is_set()
+
+
+def import_times() -> Dict[str, Optional[float]]:
+    return dict(_import_times)
+
+
+__all__ = [
+    "HEAVY_MODULES",
+    "prewarm",
+    "prewarm_in_background",
+    "is_warm",
+    "import_times",
+]
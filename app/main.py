@@ -1,11 +1,84 @@
+from contextlib import asynccontextmanager
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.logging_config import setup_logging, shutdown_logging
+
+# Before importing the routers so import-time log records go through the pipeline
+setup_logging(
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    asynchronous=settings.LOG_ASYNC,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    rate_limit_burst=settings.LOG_RATE_LIMIT_BURST,
+    rate_limit_window=settings.LOG_RATE_LIMIT_WINDOW_SECONDS,
+)
+
 from app.api.routes import router
+from app.api.session_channel import router as session_channel_router
+from app.core.metrics import render_metrics
+from app.core.serialization import FastJSONResponse
+from app.core import auth, circuit_breaker, drain, health, tracing, turn_scheduler
+from app.core.warmup import prewarm, prewarm_in_background
+from app.core.prefilter import get_classifier
+from app.controllers.Agents.utils import call_scheduler, cassette
+from app.controllers.Agents.utils.memory_budget import SESSION_CACHE_BUDGET
+from app.core.session_intel_store import sweep_sessions_background_task
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core import http_clients  # deferred with the other outbound clients (httpx)
+    http_clients.configure(
+        max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_per_host=settings.HTTP_MAX_KEEPALIVE_PER_HOST,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        timeout=settings.HTTP_TIMEOUT_SECONDS,
+        http2=settings.HTTP2_ENABLED,
+        dns_ttl=settings.HTTP_DNS_TTL_SECONDS,
+    )
+    auth.configure_from_settings()
+    SESSION_CACHE_BUDGET.configure(int(settings.CACHE_MEMORY_BUDGET_MB * 2**20) or None)
+    call_scheduler.configure(settings.LLM_COALESCE_ENABLED, settings.LLM_BATCH_WINDOW_MS, settings.LLM_MAX_BATCH)
+    cassette.configure_from_settings()
+    turn_scheduler.configure(settings.LLM_TURN_CONCURRENCY, settings.TURN_PRIORITY_AGING)
+    circuit_breaker.configure_from_settings()
+    health.configure_from_settings()
+    if settings.PREFILTER_ENABLED:
+        get_classifier(settings.PREFILTER_MODEL_PATH)
+    # Heavy modules (masai, LLM SDKs) are imported lazily; see app/core/warmup.py
+    if settings.FAST_START:
+        app.state.prewarm_task = asyncio.create_task(prewarm_in_background())
+    else:
+        prewarm()
+    sweep_task = asyncio.create_task(sweep_sessions_background_task(settings.SESSION_SWEEP_INTERVAL_SECONDS))
+    monitor_task = asyncio.create_task(health.MONITOR.run())
+    drain.reset()
+    yield
+    monitor_task.cancel()
+    # Refuse new turns, let running ones finish, flush callbacks, clean up managers
+    # (see app/core/drain.py), then close pooled outbound connections
+    app.state.drain_report = await drain.shutdown(
+        turn_timeout=settings.DRAIN_TIMEOUT_SECONDS,
+        callback_timeout=settings.FINAL_CALLBACK_DRAIN_SECONDS,
+        cleanup_concurrency=settings.DRAIN_CLEANUP_CONCURRENCY,
+        cleanup_timeout=settings.DRAIN_CLEANUP_SECONDS,
+        sweep_task=sweep_task,
+    )
+    await http_clients.ashutdown()
+    cassette.close()
+    # Write out queued traces and log records before the process exits
+    tracing.shutdown()
+    shutdown_logging()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -18,7 +91,27 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix=settings.API_V1_STR)
+app.include_router(session_channel_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Agentic Honey-Pot API"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz", include_in_schema=False)
+async def read_healthz():
+    """Liveness: 200 while the process serves requests; the body carries the load readings."""
+    return FastJSONResponse({"status": "ok", **health.MONITOR.report()})
+
+
+@app.get("/readyz", include_in_schema=False)
+async def read_readyz():
+    """Readiness: 503 while overloaded or draining (see app/core/health.py), so the balancer routes new sessions elsewhere."""
+    report = health.MONITOR.report()
+    return FastJSONResponse(report, status_code=200 if report["ready"] else 503)
@@ -10,4 +10,4 @@ class UserContext(BaseModel):
     metadata: Optional[Dict[str, Any]] = None # Generic metadata dict to be flexible
     
     def to_dict(self) -> Dict[str, Any]:
-        return self.dict()
+        return self.model_dump()
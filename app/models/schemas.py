@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union
+from typing import Annotated, List, Literal, Optional, Dict, Any, Union
 
 class Message(BaseModel):
     sender: str  # "scammer" or "user"
@@ -17,6 +17,21 @@ class AnalysisRequest(BaseModel):
     conversationHistory: List[Message] = []
     metadata: Optional[Metadata] = None
 
+# Session channel frames (WebSocket, see app/api/session_channel.py)
+class SessionOpenFrame(BaseModel):
+    type: Literal["open"]
+    sessionId: str
+    metadata: Optional[Metadata] = None
+    lastSeq: int = 0  # last reply the client received; later replies are re-sent on resume
+    conversationHistory: List[Message] = []  # seeds a new transcript (session started over REST)
+
+class SessionMessageFrame(BaseModel):
+    type: Literal["message"]
+    seq: int  # 1, 2, ... per session; a repeated seq gets the stored reply again
+    message: Message
+
+SessionFrame = Annotated[Union[SessionOpenFrame, SessionMessageFrame], Field(discriminator="type")]
+
 class EngagementMetrics(BaseModel):
     engagementDurationSeconds: int
     totalMessagesExchanged: int
@@ -38,3 +53,17 @@ class FinalResultPayload(BaseModel):
     totalMessagesExchanged: int
     extractedIntelligence: ExtractedIntelligence
     agentNotes: Optional[str] = None
+
+
+class EntitySighting(BaseModel):
+    sessionId: str
+    firstSeen: float  # epoch seconds
+    lastSeen: float
+
+class EntityCorrelationResponse(BaseModel):
+    type: str  # "upi", "phone", "link" or "bank"
+    entity: str  # normalized value
+    firstSeen: float
+    lastSeen: float
+    sessionCount: int
+    sessions: List[EntitySighting] = []
@@ -0,0 +1,176 @@
+"""
+Benchmark the API auth dependency (app/core/auth.py).
+
+1. Per-call cost of the check: the previous os.getenv() + `!=` compare, the
+   guard's constant-time lookup with the key bucket, and with the session
+   bucket as well; bytes allocated per allowed call (tracemalloc), and the
+   cost of rejections (403, 429).
+2. Requests/s through FastAPI (in-process ASGI) for a trivial endpoint with
+   no auth, the legacy dependency and the guard, so the overhead is seen at
+   high request rates next to the framework's own cost.
+3. Fairness: on simulated time, an abusive key sends --abuse-factor times its
+   limit while a well-behaved key stays under it; reports the share of each
+   key's requests that were served.
+
+Usage:
+    python scripts/bench_auth.py [--calls 200000] [--requests 20000] [--abuse-factor 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import Depends, FastAPI, HTTPException, Security
+import httpx
+
+from app.core import auth
+from app.api.routes import api_key_header
+
+KEY = "bench-key-0123456789abcdef"
+
+
+def legacy_check(api_key: str) -> str:
+    expected_key = os.getenv("API_KEY", "YOUR_SECRET_API_KEY")
+    if api_key != expected_key:
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+    return api_key
+
+
+def per_call(func: Callable[[int], None], calls: int) -> Dict[str, float]:
+    for i in range(1000):
+        func(i)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(10000):
+        func(i)
+    allocated = (tracemalloc.get_traced_memory()[0] - before) / 10000
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return {"ns": (time.perf_counter() - start) / calls * 1e9, "bytes": allocated}
+
+
+def rejected(func: Callable[[], None], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        try:
+            func()
+        except HTTPException:
+            pass
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def micro(args) -> None:
+    os.environ["API_KEY"] = KEY
+    guard = auth.ApiGuard([("bench", KEY, 1e12, 1e12)], session_rate=1e12, session_burst=1e12)
+    sessions = [f"session-{i}" for i in range(1000)]
+
+    def key_only(_i):
+        guard.authenticate(KEY)
+
+    def key_and_session(i):
+        guard.authenticate(KEY)
+        guard.limit_session(sessions[i % 1000])
+
+    limited = auth.ApiGuard([("bench", KEY, 1e-9, 1.0)])
+    limited.authenticate(KEY)
+
+    print(f"Per call ({args.calls} calls)")
+    header = f"{'check':<28} {'ns/call':>9} {'bytes/call':>11}"
+    print(header)
+    print("-" * len(header))
+    for label, func in (("legacy getenv + !=", lambda _i: legacy_check(KEY)),
+                        ("guard: key", key_only),
+                        ("guard: key + session", key_and_session)):
+        r = per_call(func, args.calls)
+        print(f"{label:<28} {r['ns']:>9.0f} {r['bytes']:>11.1f}")
+    calls = args.calls // 10
+    print(f"{'403 unknown key':<28} {rejected(lambda: guard.authenticate('wrong-key'), calls):>9.0f}")
+    print(f"{'429 key limited':<28} {rejected(lambda: limited.authenticate(KEY), calls):>9.0f}")
+
+
+async def through_app(args) -> None:
+    guard = auth.ApiGuard([("bench", KEY, 1e12, 1e12)])
+
+    async def legacy_dependency(api_key: str = Security(api_key_header)):
+        return legacy_check(api_key)
+
+    async def guard_dependency(api_key: str = Security(api_key_header)):
+        guard.authenticate(api_key)
+        return api_key
+
+    app = FastAPI()
+    app.get("/open")(lambda: {"ok": True})
+    app.get("/legacy", dependencies=[Depends(legacy_dependency)])(lambda: {"ok": True})
+    app.get("/guard", dependencies=[Depends(guard_dependency)])(lambda: {"ok": True})
+
+    print(f"\nThrough FastAPI ({args.requests} requests, {args.concurrency} concurrent, in-process ASGI)")
+    header = f"{'endpoint':<10} {'req/s':>9} {'us/req':>9}"
+    print(header)
+    print("-" * len(header))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"x-api-key": KEY}) as client:
+        for path in ("/open", "/legacy", "/guard"):
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with semaphore:
+                    response = await client.get(path)
+                    assert response.status_code == 200, response.status_code
+
+            await asyncio.gather(*(one() for _ in range(200)))
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            print(f"{path:<10} {args.requests / elapsed:>9.0f} {elapsed / args.requests * 1e6:>9.1f}")
+
+
+def fairness(args) -> None:
+    now = [0.0]
+    guard = auth.ApiGuard([("abusive", "abusive-key", args.rate, args.rate * 2),
+                           ("normal", "normal-key", args.rate, args.rate * 2)],
+                          session_rate=0, clock=lambda: now[0])
+    served = {"abusive": 0, "normal": 0}
+    sent = {"abusive": 0, "normal": 0}
+    retry_after = set()
+    step = 1.0 / (args.rate * args.abuse_factor)
+    normal_every = int(args.abuse_factor / 0.8)  # normal key runs at 80% of its limit
+    for i in range(int(60 / step)):
+        now[0] = i * step
+        for name, due in (("abusive", True), ("normal", i % normal_every == 0)):
+            if not due:
+                continue
+            sent[name] += 1
+            try:
+                guard.authenticate(f"{name}-key")
+                served[name] += 1
+            except HTTPException as e:
+                retry_after.add(e.headers["Retry-After"])
+    print(f"\nFairness (60 simulated seconds, limit {args.rate:.0f}/s per key, abusive key at {args.abuse_factor:.0f}x)")
+    for name in ("abusive", "normal"):
+        print(f"  {name:<8} sent {sent[name]:>6}  served {served[name]:>6} ({served[name] / sent[name]:.1%})")
+    print(f"  Retry-After values: {sorted(retry_after)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=20.0, help="per-key limit for the fairness run")
+    parser.add_argument("--abuse-factor", type=float, default=10.0)
+    args = parser.parse_args()
+    micro(args)
+    asyncio.run(through_app(args))
+    fairness(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark outbound connection handling for GUVI callbacks against the local
+callback stub (scripts/loadtest/callback_stub.py), over HTTPS with a
+throwaway self-signed certificate (needs the openssl CLI; --plain for HTTP).
+
+Modes, each posting the same callback payload --callbacks times from
+--threads worker threads (tools run off the event loop):
+
+  requests.post   previous behaviour: new connection (TCP+TLS) per callback
+  pooled sync     app/core/http_clients.py shared client (keep-alive + DNS cache)
+  pooled async    the per-loop async client, --threads concurrent tasks
+
+Reports throughput, per-call latency, connections accepted by the stub and
+DNS resolutions. The URL uses "localhost" so name resolution is exercised.
+
+Usage:
+    python scripts/bench_http_clients.py [--callbacks 2000] [--threads 16] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import http_clients
+from app.core.serialization import dumps_bytes
+from app.core.session_intel_store import build_callback_payload
+from scripts.loadtest.callback_stub import CallbackStub
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def make_certificate(directory: str) -> List[str]:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return [cert, key]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def run_threads(post: Callable[[], int], callbacks: int, threads: int) -> List[float]:
+    def one(_):
+        start = time.perf_counter()
+        status = post()
+        if status != 200:
+            raise RuntimeError(f"callback returned {status}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(one, range(callbacks)))
+
+
+async def run_async(manager: http_clients.HttpClientManager, url: str, body: bytes, callbacks: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await manager.async_client(url).post(url, content=body, headers=HEADERS)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(callbacks)))
+    await manager.aclose()
+    return latencies
+
+
+def dns_misses() -> int:
+    return int(http_clients.DNS_LOOKUPS.labels("miss").value)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callbacks", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub processing time per callback")
+    parser.add_argument("--plain", action="store_true", help="HTTP instead of HTTPS")
+    args = parser.parse_args()
+
+    intel = {"scam_detected": True, "message_count": 8, "bankAccounts": ["1234567890123"],
+             "upiIds": ["fraud@ybl"], "phoneNumbers": ["+919876543210"], "phishingLinks": ["http://sbi-kyc.example"],
+             "suspiciousKeywords": ["urgent", "blocked", "otp"]}
+    body = dumps_bytes(build_callback_payload("bench-session", intel))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = (None, None) if args.plain else make_certificate(tmp)
+        if certfile:
+            # Trust the throwaway certificate in both clients
+            os.environ["SSL_CERT_FILE"] = os.environ["REQUESTS_CA_BUNDLE"] = certfile
+        stub = CallbackStub(latency_ms=args.latency_ms, certfile=certfile, keyfile=keyfile).start()
+        url = f"{stub.scheme}://localhost:{stub.address[1]}/api/updateHoneyPotFinalResult"
+        import requests
+
+        manager = http_clients.HttpClientManager(max_connections_per_host=args.threads, max_keepalive_per_host=args.threads)
+        modes = [
+            ("requests.post", lambda: run_threads(
+                lambda: requests.post(url, data=body, headers=HEADERS, timeout=5).status_code, args.callbacks, args.threads)),
+            ("pooled sync", lambda: run_threads(
+                lambda: manager.client(url).post(url, content=body, headers=HEADERS, timeout=5).status_code,
+                args.callbacks, args.threads)),
+            ("pooled async", lambda: asyncio.run(run_async(manager, url, body, args.callbacks, args.threads))),
+        ]
+        print(f"{args.callbacks} callbacks, {args.threads} concurrent, stub {args.latency_ms:.0f}ms, "
+              f"{stub.scheme.upper()}, HTTP/2 {'on' if manager.http2 else 'off (h2 not installed)'}\n")
+        header = f"{'mode':<15} {'callbacks/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12} {'DNS lookups':>12}"
+        print(header)
+        print("-" * len(header))
+        try:
+            for label, run in modes:
+                connections_before, misses_before = stub.connections, dns_misses()
+                start = time.perf_counter()
+                latencies = run()
+                elapsed = time.perf_counter() - start
+                connections = stub.connections - connections_before
+                # requests resolves the host on every new connection
+                resolutions = connections if label == "requests.post" else dns_misses() - misses_before
+                print(f"{label:<15} {len(latencies) / elapsed:>12.1f} {percentile(latencies, 0.5):>8.2f} "
+                      f"{percentile(latencies, 0.99):>8.2f} {connections:>12} {resolutions:>12}")
+        finally:
+            manager.close()
+            stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Benchmark the provider-call scheduler (app/controllers/Agents/utils/call_scheduler.py)
+against a local fake LLM server.
+
+The fake server (Starlette under uvicorn, in a background thread) models a
+provider with limited concurrency: every HTTP request occupies one of
+--server-slots for --overhead-ms plus prompt-processing time (chars / 4 tokens
+x --token-us). Prompt prefixes (system messages) seen recently are cached
+server-side and processed at 10% cost, like provider prefix caching.
+POST /v1/batch processes several prompts for a single overhead.
+
+Sessions from the load-test generator issue router + evaluator calls per turn
+with the HONEYPOT preamble from PROMPTS.py, through the real RoleModelProxy,
+in one of two call shapes (--shape):
+
+  masai     what masai sends: one formatted string per call (preamble, role
+            instructions, <TIME> with the wall-clock minute, history) to a
+            chat model without abatch()
+  messages  role-tagged message lists (system preamble first) to a model
+            with abatch(); the best case for the scheduler
+
+Modes:
+
+  direct           scheduler disabled (one HTTP request per call)
+  coalesce         identical in-flight calls shared, no batching
+  coalesce+batch   coalescing plus micro-batching (window --window-ms)
+
+Usage:
+    python scripts/bench_llm_scheduler.py [--shape masai] [--sessions 200] [--turns 4] [--overhead-ms 40]
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from app.controllers.Agents.HONEYPOT.PROMPTS import HONEYPOT_AGENT_DESCRIPTION, HONEYPOT_AGENT_STYLE
+from app.controllers.Agents.utils import call_scheduler
+from app.controllers.Agents.utils.provider_proxy import RoleModelProxy
+from scripts.loadtest.sessions import generate_sessions
+
+
+class FakeLLMServer:
+    def __init__(self, slots: int, overhead_ms: float, token_us: float, cache_size: int = 256):
+        self.slots = slots
+        self.overhead_s = overhead_ms / 1000.0
+        self.token_s = token_us / 1e6
+        self.cache_size = cache_size
+        self.requests = 0
+        self.prompts = 0
+        self.prefix_hits = 0
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+        self._semaphore = None
+        self.port = self._free_port()
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _compute_seconds(self, messages: List[Dict[str, str]]) -> float:
+        system = "".join(m["content"] for m in messages if m["role"] == "system")
+        rest = sum(len(m["content"]) for m in messages if m["role"] != "system")
+        key = hashlib.blake2b(system.encode(), digest_size=8).hexdigest()
+        if not system:
+            system_tokens = 0.0
+        elif key in self._prefixes:
+            self.prefix_hits += 1
+            self._prefixes.move_to_end(key)
+            system_tokens = len(system) / 4 * 0.1
+        else:
+            self._prefixes[key] = None
+            if len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+            system_tokens = len(system) / 4
+        return (system_tokens + rest / 4) * self.token_s
+
+    def _reply(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        digest = hashlib.blake2b(messages[-1]["content"].encode(), digest_size=4).hexdigest()
+        return {"answer": f"reply-{digest}", "satisfied": True}
+
+    def _app(self):
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+
+        def slots() -> asyncio.Semaphore:
+            # Created on first use so it binds to the server's event loop
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.slots)
+            return self._semaphore
+
+        async def chat(request):
+            body = await request.json()
+            async with slots():
+                self.requests += 1
+                self.prompts += 1
+                await asyncio.sleep(self.overhead_s + self._compute_seconds(body["messages"]))
+            return JSONResponse(self._reply(body["messages"]))
+
+        async def batch(request):
+            body = await request.json()
+            async with slots():
+                self.requests += 1
+                self.prompts += len(body["requests"])
+                compute = sum(self._compute_seconds(m) for m in body["requests"])
+                await asyncio.sleep(self.overhead_s + compute)
+            return JSONResponse({"results": [self._reply(m) for m in body["requests"]]})
+
+        return Starlette(routes=[Route("/v1/chat", chat, methods=["POST"]), Route("/v1/batch", batch, methods=["POST"])])
+
+    def start(self) -> "FakeLLMServer":
+        import uvicorn
+        config = uvicorn.Config(self._app(), host="127.0.0.1", port=self.port, log_level="error", lifespan="off",
+                                backlog=4096, timeout_keep_alive=60)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def reset(self) -> None:
+        self.requests = self.prompts = self.prefix_hits = 0
+        self._prefixes.clear()
+
+
+class FakeHttpChatModel:
+    """Provider client for the fake server, shaped like a langchain chat model (ainvoke/abatch)."""
+
+    def __init__(self, model: str, client):
+        self.model = model
+        self._client = client
+
+    def with_structured_output(self, *args, **kwargs) -> "FakeHttpChatModel":
+        return self
+
+    async def ainvoke(self, messages):
+        response = await self._client.post("/v1/chat", json={"model": self.model, "messages": messages})
+        response.raise_for_status()
+        return response.json()
+
+    async def abatch(self, inputs, return_exceptions: bool = False):
+        try:
+            response = await self._client.post("/v1/batch", json={"model": self.model, "requests": list(inputs)})
+            response.raise_for_status()
+            return response.json()["results"]
+        except Exception as e:
+            if return_exceptions:
+                return [e] * len(inputs)
+            raise
+
+
+class FakeHttpStringModel(FakeHttpChatModel):
+    """masai's call shape: ainvoke() with one formatted prompt string, no batch request."""
+
+    abatch = None
+
+    async def ainvoke(self, prompt):
+        return await super().ainvoke([{"role": "user", "content": prompt}])
+
+
+ROLE_INSTRUCTIONS = {
+    "router": "Decide which agent should handle the message. Answer with a routing decision.",
+    "evaluator": "Evaluate the draft reply for persona consistency and intelligence extraction.",
+}
+
+
+async def run_mode(server: FakeLLMServer, sessions, args) -> Dict[str, float]:
+    import httpx
+    latencies: List[float] = []
+    async with httpx.AsyncClient(base_url=server.url, timeout=120,
+                                 limits=httpx.Limits(max_connections=args.concurrency * 2)) as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def session(s) -> None:
+            async with semaphore:
+                # One model object per session, like masai's per-manager role models
+                model_class = FakeHttpStringModel if args.shape == "masai" else FakeHttpChatModel
+                proxies = {role: RoleModelProxy(role, model_class(args.model, client)) for role in ROLE_INSTRUCTIONS}
+                history: List[str] = []
+                for text in s.messages[:args.turns]:
+                    user = ("Previous conversation:\n" + "\n".join(history) + "\n\n" if history else "") + \
+                        f"Scammer's latest message: {text}"
+                    for role, instruction in ROLE_INSTRUCTIONS.items():
+                        if args.shape == "masai":
+                            now = datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")
+                            messages = (f"{HONEYPOT_AGENT_DESCRIPTION}{HONEYPOT_AGENT_STYLE}\n{instruction}\n"
+                                        f"<TIME>:{now}</TIME>\n{user}")
+                        else:
+                            messages = [
+                                {"role": "system", "content": HONEYPOT_AGENT_DESCRIPTION + HONEYPOT_AGENT_STYLE},
+                                {"role": "system", "content": instruction},
+                                {"role": "user", "content": user},
+                            ]
+                        start = time.perf_counter()
+                        result = await proxies[role].ainvoke(messages)
+                        latencies.append(time.perf_counter() - start)
+                    history += [f"Scammer: {text}", f"You (victim): {result['answer']}"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(s) for s in sessions))
+        elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "elapsed": elapsed,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", choices=("masai", "messages"), default="masai")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--server-slots", type=int, default=16, help="concurrent requests the fake provider serves")
+    parser.add_argument("--overhead-ms", type=float, default=40.0, help="fixed cost per HTTP request")
+    parser.add_argument("--token-us", type=float, default=20.0, help="prompt processing per token")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--model", default="gemini-2.5-flash-lite")
+    parser.add_argument("--seed", type=int, default=1992)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    sessions = generate_sessions(args.sessions, turns=args.turns, benign_ratio=0.0, seed=args.seed)
+    server = FakeLLMServer(args.server_slots, args.overhead_ms, args.token_us).start()
+    modes = [
+        ("direct", dict(enabled=False)),
+        ("coalesce", dict(enabled=True, window_ms=0.0, max_batch=1)),
+        ("coalesce+batch", dict(enabled=True, window_ms=args.window_ms, max_batch=args.max_batch)),
+    ]
+    print(f"{args.shape} call shape: {args.sessions} sessions x {args.turns} turns x 2 roles, concurrency {args.concurrency}; server "
+          f"{args.server_slots} slots, {args.overhead_ms:.0f}ms/request overhead, {args.token_us:.0f}us/token\n")
+    header = f"{'mode':<16} {'calls/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'HTTP reqs':>10} {'prompts':>8} {'prefix hits':>12}"
+    print(header)
+    print("-" * len(header))
+    baseline = None
+    try:
+        for label, options in modes:
+            server.reset()
+            call_scheduler.configure(**options)
+            r = asyncio.run(run_mode(server, sessions, args))
+            throughput = r["calls"] / r["elapsed"]
+            baseline = baseline or throughput
+            print(f"{label:<16} {throughput:>9.1f} {r['p50']:>9.1f} {r['p99']:>9.1f} {server.requests:>10} "
+                  f"{server.prompts:>8} {server.prefix_hits:>12}   x{throughput / baseline:.2f}")
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
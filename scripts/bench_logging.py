@@ -0,0 +1,108 @@
+"""
+Effect of the logging pipeline on /analyze tail latency at high request rates.
+
+Drives the real app in process (mock agent, local callback stub, see
+scripts/loadtest) with logging pointed at a stream that emulates a congested
+stdout: every write costs --write-us and one in --stall-every writes blocks for
+--stall-ms (pipe buffer full while the log drain catches up). Compares:
+
+  sync         StreamHandler on the calling thread (the old behaviour)
+  async        queue + writer thread, rate limiting disabled
+  async+limit  queue + writer thread, default rate limiting
+
+Usage:
+    python scripts/bench_logging.py [--sessions 300] [--concurrency 100] [--write-us 50] [--stall-ms 20]
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.loadtest.callback_stub import CallbackStub
+from scripts.loadtest.run import API_KEY, drive, summarize
+from scripts.loadtest.sessions import generate_sessions
+
+
+class CongestedStream:
+    """File-like sink whose writes block like a backed-up stdout pipe."""
+
+    def __init__(self, write_us: float, stall_ms: float, stall_every: int):
+        self.write_s = write_us / 1e6
+        self.stall_s = stall_ms / 1e3
+        self.stall_every = stall_every
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self.writes += 1
+            stall = self.stall_every and self.writes % self.stall_every == 0
+        time.sleep(self.stall_s if stall else self.write_s)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+async def run_mode(app, sessions, concurrency: int) -> dict:
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        return await drive(client, sessions, concurrency)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--role-latency-ms", type=float, default=5.0)
+    parser.add_argument("--write-us", type=float, default=50.0)
+    parser.add_argument("--stall-ms", type=float, default=20.0)
+    parser.add_argument("--stall-every", type=int, default=200)
+    args = parser.parse_args()
+
+    stub = CallbackStub().start()
+    os.environ.update({"API_KEY": API_KEY, "RATE_LIMIT_ENABLED": "false", "GUVI_CALLBACK_URL": stub.url, "TRACING_ENABLED": "false"})
+
+    from app.main import app
+    from app.core import logging_config
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+
+    register_agent_factory("HONEYPOT", make_mock_factory(args.role_latency_ms, 1.0, 1992))
+    base = generate_sessions(args.sessions, turns=args.turns, seed=1992)
+    modes = [
+        ("sync", dict(asynchronous=False, rate_limit_burst=0)),
+        ("async", dict(asynchronous=True, rate_limit_burst=0)),
+        ("async+limit", dict(asynchronous=True)),
+    ]
+    header = f"{'mode':<12} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'log writes':>11}"
+    print(f"{args.sessions} sessions x {args.turns} turns, concurrency {args.concurrency}, "
+          f"write {args.write_us:.0f}us, stall {args.stall_ms:.0f}ms every {args.stall_every} writes\n")
+    print(header)
+    print("-" * len(header))
+    try:
+        for label, options in modes:
+            stream = CongestedStream(args.write_us, args.stall_ms, args.stall_every)
+            logging_config.setup_logging(stream=stream, **options)
+            # Fresh session ids per mode so managers/intel are created from scratch each run
+            sessions = [dataclasses.replace(s, session_id=f"{label}-{s.session_id}") for s in base]
+            raw = asyncio.run(run_mode(app, sessions, args.concurrency))
+            logging_config.shutdown_logging()
+            stats = summarize(raw["latencies"])
+            print(f"{label:<12} {len(raw['latencies']) / raw['elapsed_s']:>9.1f} {stats['p50_ms']:>9.2f} "
+                  f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} {stream.writes:>11}")
+    finally:
+        stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Measure the per-request overhead of the /analyze metrics instrumentation.
+
+Replays exactly the metric operations one /analyze turn performs (timers,
+histogram observations, counter increments) and compares the cost against
+the budget stated in app/core/metrics.py. Also times a /metrics scrape.
+
+Usage:
+    python scripts/bench_metrics.py [--requests 200000]
+Exit code is 1 if the measured overhead exceeds the budget.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import metrics
+from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+
+BUDGET_US = 10.0
+
+
+def one_request() -> None:
+    """Metric operations performed by a single /analyze turn with one tool call and one callback."""
+    perf = time.perf_counter
+    start = perf()
+    history_start = perf()
+    metrics.HISTORY_BUILD_LATENCY.observe(perf() - history_start)
+    agent_start = perf()
+    tool_start = perf()
+    callback_start = perf()
+    metrics.CALLBACK_LATENCY.observe(perf() - callback_start)
+    metrics.CALLBACK_OUTCOMES.labels("success").inc()
+    metrics.TOOL_LATENCY.observe(perf() - tool_start)
+    metrics.AGENT_LATENCY.observe(perf() - agent_start)
+    metrics.ANALYZE_LATENCY.observe(perf() - start)
+
+
+def baseline_request() -> None:
+    """Empty call, subtracted to remove loop and call overhead from the measurement."""
+    pass
+
+
+def bench(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Populate a cache so the scrape includes gauge collection work
+    cache = TtlLruCache(maxsize=500, ttl_seconds=3600)
+    for i in range(500):
+        cache.set(f"s{i}", {})
+    metrics.track_cache("bench", cache)
+
+    bench(one_request, 10_000)  # warm-up
+    instrumented = bench(one_request, args.requests)
+    baseline = bench(baseline_request, args.requests)
+    overhead = instrumented - baseline
+
+    scrape_start = time.perf_counter()
+    for _ in range(100):
+        metrics.render_metrics()
+    scrape_ms = (time.perf_counter() - scrape_start) / 100 * 1e3
+
+    print(f"requests simulated     : {args.requests}")
+    print(f"overhead per request   : {overhead:.2f} us (budget {BUDGET_US:.1f} us)")
+    print(f"/metrics render        : {scrape_ms:.3f} ms")
+    if overhead > BUDGET_US:
+        print("FAIL: metrics overhead exceeds budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
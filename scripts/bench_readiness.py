@@ -0,0 +1,180 @@
+"""
+Check the load-aware readiness endpoint (app/core/health.py).
+
+Part 1, cost: time LoadMonitor.report() (the body of /healthz and /readyz)
+with the session caches empty and with --fill sessions in the intel store.
+Part of the requirement is that the probe cost does not grow with the number
+of live sessions.
+
+Part 2, behaviour: the real app in process with the mock agent and
+LLM_TURN_CONCURRENCY=--capacity. Sessions arrive open-loop through three
+phases (--rates per second for --phase-s seconds each: normal, overload,
+normal) while a prober calls /readyz every --probe-s, like a load balancer.
+After the last phase no new sessions arrive; the prober keeps going (counted
+in the last phase) until the instance is ready again, for up to --settle-s,
+while the sessions already admitted finish their backlog. Reported per phase: ready probes, admission queue depth and loop lag seen by
+the probes, client p50 latency, and the readiness transitions with their
+times and reasons.
+
+Usage:
+    python scripts/bench_readiness.py [--fill 100000] [--capacity 8] [--rates 2 7 1]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+API_KEY = "readiness-key"
+ANALYZE_PATH = "/api/v1/analyze"
+PHASES = ("normal", "overload", "recovered")
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def bench_cost(args) -> None:
+    from app.core import session_intel_store as store
+    from app.core.health import MONITOR
+
+    def per_call_us() -> float:
+        MONITOR.report()
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            MONITOR.report()
+        return (time.perf_counter() - start) / args.calls * 1e6
+
+    empty = per_call_us()
+    store._SESSION_INTEL_STORE.maxsize = args.fill + 1
+    store.SESSION_CACHE_BUDGET.configure(None)
+    for i in range(args.fill):
+        store.get_session_intel(f"fill-{i:07d}")
+    full = per_call_us()
+    print(f"report() cost: {empty:.1f} us with empty caches, {full:.1f} us with {len(store._SESSION_INTEL_STORE)} "
+          f"live sessions ({args.calls} calls each)\n")
+    store._SESSION_INTEL_STORE.clear()
+
+
+async def bench_behaviour(args) -> None:
+    import httpx
+    from app.main import app
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+    from scripts.loadtest.sessions import generate_sessions
+
+    register_agent_factory("HONEYPOT", make_mock_factory(args.role_latency_ms, seed=args.seed))
+    rng = random.Random(args.seed)
+    ends = [args.phase_s * (i + 1) for i in range(len(PHASES))]
+    sessions = iter(generate_sessions(int(sum(args.rates) * args.phase_s * 1.5) + 10, turns=args.turns,
+                                      benign_ratio=0.0, seed=args.seed))
+    stats = {phase: {"probes": 0, "ready": 0, "queue": [], "lag": [], "latencies": []} for phase in PHASES}
+    transitions: List[Dict[str, Any]] = []
+    t0 = time.monotonic()
+
+    def phase_at(t: float) -> str:
+        return next((phase for phase, end in zip(PHASES, ends) if t < end), PHASES[-1])
+
+    async def talk(client, session) -> None:
+        history: List[Dict[str, Any]] = []
+        for turn, text in enumerate(session.messages):
+            message = {"sender": "scammer", "text": text, "timestamp": 1769000000000 + turn * 1000}
+            body = {"sessionId": session.session_id, "message": message, "conversationHistory": history,
+                    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}
+            start = time.monotonic()
+            response = await client.post(ANALYZE_PATH, json=body, headers={"x-api-key": API_KEY})
+            stats[phase_at(start - t0)]["latencies"].append(time.monotonic() - start)
+            reply = response.json().get("reply", "") if response.status_code == 200 else ""
+            history = history + [message, {"sender": "user", "text": reply, "timestamp": message["timestamp"] + 500}]
+            await asyncio.sleep(rng.expovariate(1.0 / args.think_s))
+
+    async def probe(client) -> None:
+        was_ready = True
+        while (elapsed := time.monotonic() - t0) < ends[-1] or (not was_ready and elapsed < ends[-1] + args.settle_s):
+            response = await client.get("/readyz")
+            report = response.json()
+            now = time.monotonic() - t0
+            phase = stats[phase_at(now)]
+            phase["probes"] += 1
+            phase["ready"] += response.status_code == 200
+            phase["queue"].append(report["admission"]["queued"])
+            phase["lag"].append(report["event_loop_lag_ms"])
+            if report["ready"] != was_ready:
+                transitions.append({"t": now, "ready": report["ready"], "reasons": report["reasons"],
+                                    "queued": report["admission"]["queued"]})
+                was_ready = report["ready"]
+            await asyncio.sleep(args.probe_s)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://readiness", timeout=120) as client:
+            prober = asyncio.create_task(probe(client))
+            tasks = []
+            while (elapsed := time.monotonic() - t0) < ends[-1]:
+                rate = args.rates[PHASES.index(phase_at(elapsed))]
+                await asyncio.sleep(rng.expovariate(rate))
+                tasks.append(asyncio.create_task(talk(client, next(sessions))))
+            await prober
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"capacity {args.capacity} turns, {args.role_latency_ms:.0f}ms per role call, sessions/s "
+          f"{'/'.join(f'{r:g}' for r in args.rates)} for {args.phase_s:.0f}s each, probe every {args.probe_s}s\n")
+    header = (f"{'phase':<10} {'probes':>7} {'ready':>6} {'queue p50':>10} {'queue max':>10} "
+              f"{'lag p50 ms':>11} {'turns':>6} {'client p50 s':>13}")
+    print(header)
+    print("-" * len(header))
+    for phase in PHASES:
+        s = stats[phase]
+        print(f"{phase:<10} {s['probes']:>7} {s['ready']:>6} {percentile(s['queue'], .5):>10} "
+              f"{max(s['queue'], default=0):>10} {percentile(s['lag'], .5):>11.2f} {len(s['latencies']):>6} "
+              f"{percentile(s['latencies'], .5):>13.2f}")
+    print()
+    for t in transitions:
+        state = "ready" if t["ready"] else "NOT ready"
+        print(f"t={t['t']:6.2f}s  {state:<9} queue {t['queued']:>4}  {', '.join(t['reasons'])}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fill", type=int, default=100_000, help="live sessions for the cost check")
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--capacity", type=int, default=8, help="LLM_TURN_CONCURRENCY")
+    parser.add_argument("--max-queue", type=int, default=16, help="READY_MAX_TURN_QUEUE")
+    parser.add_argument("--rates", type=float, nargs=3, default=(2.0, 7.0, 1.0), metavar=("NORMAL", "OVERLOAD", "RECOVERED"))
+    parser.add_argument("--phase-s", type=float, default=20.0)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--think-s", type=float, default=0.5)
+    parser.add_argument("--role-latency-ms", type=float, default=100.0)
+    parser.add_argument("--probe-s", type=float, default=0.25)
+    parser.add_argument("--settle-s", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "API_KEY": API_KEY,
+        "RATE_LIMIT_ENABLED": "false",
+        "GUVI_CALLBACK_URL": "http://127.0.0.1:9/unused",
+        "CALLBACK_FINAL_FLUSH_ENABLED": "false",
+        "LOG_LEVEL": "ERROR",
+        "PREFILTER_ENABLED": "false",
+        "LLM_TURN_CONCURRENCY": str(args.capacity),
+        "READY_MAX_TURN_QUEUE": str(args.max_queue),
+        "HEALTH_RATE_WINDOW_SECONDS": "5",
+    })
+    bench_cost(args)
+    logging.disable(logging.ERROR)
+    asyncio.run(bench_behaviour(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark the per-turn request context (app/core/execution_context.py): the
+previous dict with string keys against the slotted RequestContext.
+
+For each variant, --turns contexts are built and set on the ContextVar, and
+the accessors tools call during a turn (session id, message count, deadline,
+trace) are read --reads times. Reports bytes allocated per turn (tracemalloc,
+objects kept alive until the end so nothing is reused), retained size of one
+context, and time per turn. Also checks that the context reaches a tool run
+via loop.run_in_executor(), with and without run_in_executor() from
+execution_context.
+
+Usage:
+    python scripts/bench_request_context.py [--turns 100000] [--reads 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import execution_context
+from app.core.execution_context import RequestContext, session_context
+
+_legacy_context: ContextVar[Dict[str, Any]] = ContextVar("legacy_session_context", default={})
+
+
+def legacy_turn(i: int, metadata: Dict[str, Any], intel: Dict[str, Any], reads: int) -> Any:
+    token = _legacy_context.set({
+        "session_id": f"session-{i}",
+        "message_count": i % 20,
+        "metadata": metadata,
+        "trace": None,
+        "deadline": 1000.0 + i,
+        "extracted_intelligence": {},
+        "scam_detected": False,
+    })
+    for _ in range(reads):
+        ctx = _legacy_context.get()
+        ctx.get("session_id", ""), ctx.get("message_count", 0), ctx.get("deadline"), ctx.get("trace")
+    return token
+
+
+def slotted_turn(i: int, metadata: Dict[str, Any], intel: Dict[str, Any], reads: int) -> Any:
+    token = session_context.set(RequestContext(
+        session_id=f"session-{i}", message_count=i % 20, metadata=metadata, deadline=1000.0 + i, intel=intel))
+    for _ in range(reads):
+        execution_context.get_session_id(), execution_context.get_message_count()
+        execution_context.get_deadline(), execution_context.get_trace()
+    return token
+
+
+def measure(turn: Callable, args) -> Dict[str, float]:
+    metadata = {"channel": "SMS", "language": "English", "locale": "IN"}
+    intel: Dict[str, Any] = {}
+    kept: List[Any] = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(args.turns):
+        kept.append(turn(i, metadata, intel, args.reads))
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Tokens keep the values alive; subtract the list of tokens and the session id strings
+    overhead = sys.getsizeof(kept) + sum(sys.getsizeof(f"session-{i}") for i in range(args.turns))
+    del kept
+
+    start = time.perf_counter()
+    for i in range(args.turns):
+        turn(i, metadata, intel, args.reads)
+    elapsed = time.perf_counter() - start
+    return {"bytes": (allocated - overhead) / args.turns, "us": elapsed / args.turns * 1e6}
+
+
+async def propagation() -> Dict[str, str]:
+    loop = asyncio.get_running_loop()
+    token = session_context.set(RequestContext(session_id="propagated"))
+    try:
+        with ThreadPoolExecutor(1) as pool:
+            plain = await loop.run_in_executor(pool, execution_context.get_session_id)
+            bound = await execution_context.run_in_executor(pool, execution_context.get_session_id)
+            to_thread = await asyncio.to_thread(execution_context.get_session_id)
+    finally:
+        session_context.reset(token)
+    return {"loop.run_in_executor": plain, "execution_context.run_in_executor": bound, "asyncio.to_thread": to_thread}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100000)
+    parser.add_argument("--reads", type=int, default=8, help="context reads per turn")
+    args = parser.parse_args()
+
+    legacy_size = sys.getsizeof({"session_id": "", "message_count": 0, "metadata": {}, "trace": None, "deadline": 0.0,
+                                 "extracted_intelligence": {}, "scam_detected": False}) + sys.getsizeof({})
+    slotted_size = sys.getsizeof(RequestContext(session_id="s"))
+
+    print(f"{args.turns} turns, {args.reads} context reads per turn\n")
+    header = f"{'context':<10} {'bytes/turn':>11} {'object bytes':>13} {'us/turn':>8}"
+    print(header)
+    print("-" * len(header))
+    for label, turn, size in (("dict", legacy_turn, legacy_size), ("slotted", slotted_turn, slotted_size)):
+        r = measure(turn, args)
+        print(f"{label:<10} {r['bytes']:>11.0f} {size:>13} {r['us']:>8.2f}")
+
+    print("\nsession_id seen by a pool thread:")
+    for label, seen in asyncio.run(propagation()).items():
+        print(f"  {label:<36} {seen or '(empty)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Microbenchmark of the /analyze parse-to-respond overhead, excluding the agent.
+
+1. Component timings: request parsing (json.loads + model_validate vs
+   model_validate_json), response rendering (JSONResponse vs FastJSONResponse)
+   and callback payload encoding (log dump + requests' json= vs one dumps_bytes).
+2. End-to-end ASGI round trips through a minimal app exposing the legacy
+   endpoint shape (typed body parameter, response_model encoding) and the
+   current one (parse_body dependency, FastJSONResponse), both calling an
+   instant handler, so the difference is pure framework/serialization work.
+
+Usage:
+    python scripts/bench_serialization.py [--history 20] [--iterations 20000] [--requests 3000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dumps_bytes, parse_body
+from app.models.schemas import AnalysisRequest, AnalysisResponse
+
+REPLY = "Oh no, what should I do now? Please guide me, I am very worried about my account."
+
+
+def make_body(history: int) -> bytes:
+    messages = [
+        {"sender": "scammer" if i % 2 == 0 else "user",
+         "text": f"Message {i}: your SBI account will be blocked, share OTP and pay to verify@ybl now",
+         "timestamp": 1769000000000 + i * 1000}
+        for i in range(history)
+    ]
+    return json.dumps({
+        "sessionId": "bench-session",
+        "message": {"sender": "scammer", "text": "Send the OTP immediately or face arrest.", "timestamp": 1769000999000},
+        "conversationHistory": messages,
+        "metadata": {"channel": "SMS", "language": "English", "locale": "IN"},
+    }).encode()
+
+
+def make_payload() -> dict:
+    return {
+        "sessionId": "bench-session",
+        "scamDetected": True,
+        "totalMessagesExchanged": 18,
+        "extractedIntelligence": {
+            "bankAccounts": ["1234-5678-9012-3456"],
+            "upiIds": ["scammer@ybl", "refund.desk@paytm"],
+            "phishingLinks": ["http://sbi-kyc-update.example/verify"],
+            "phoneNumbers": ["+91-9876543210"],
+            "suspiciousKeywords": ["urgent", "otp", "blocked", "verify", "arrest"],
+        },
+        "agentNotes": "Scammer used urgency tactics; payment redirection via UPI; impersonated bank officials",
+    }
+
+
+def bench(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def components(body: bytes, iterations: int) -> None:
+    payload = make_payload()
+    response = {"status": "success", "reply": REPLY}
+    rows = [
+        ("parse: json.loads + model_validate", lambda: AnalysisRequest.model_validate(json.loads(body))),
+        ("parse: model_validate_json", lambda: AnalysisRequest.model_validate_json(body)),
+        ("respond: JSONResponse(model)", lambda: JSONResponse(AnalysisResponse(**response).model_dump())),
+        ("respond: FastJSONResponse", lambda: FastJSONResponse(response)),
+        # Before: json.dumps for the log line, then requests re-encodes for json=
+        ("callback: json.dumps x2", lambda: (json.dumps(payload), json.dumps(payload).encode())),
+        ("callback: dumps_bytes x1", lambda: dumps_bytes(payload)),
+    ]
+    print(f"=== components ({iterations} iterations, backend={'orjson' if serialization.orjson else 'json'})")
+    for name, fn in rows:
+        print(f"{name:<40} {bench(fn, iterations):>9.2f} us")
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/legacy", response_model=AnalysisResponse)
+    async def legacy(request: AnalysisRequest):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            request.metadata.dict()
+        return AnalysisResponse(status="success", reply=REPLY)
+
+    async def parse(raw: Request) -> AnalysisRequest:
+        return await parse_body(raw, AnalysisRequest)
+
+    @app.post("/fast", response_model=AnalysisResponse, response_class=FastJSONResponse)
+    async def fast(request: AnalysisRequest = Depends(parse)):
+        request.metadata.model_dump()
+        return FastJSONResponse(AnalysisResponse(status="success", reply=REPLY).model_dump())
+
+    return app
+
+
+async def round_trips(body: bytes, requests: int) -> None:
+    import httpx
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Content-Type": "application/json"}
+    print(f"\n=== ASGI round trip, instant handler ({requests} requests)")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for path in ("/legacy", "/fast"):
+            for _ in range(200):  # warm up
+                await client.post(path, content=body, headers=headers)
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = await client.post(path, content=body, headers=headers)
+            results[path] = (time.perf_counter() - start) / requests * 1e6
+            assert response.status_code == 200, response.text
+            print(f"{path:<40} {results[path]:>9.1f} us/request")
+        saved = results["/legacy"] - results["/fast"]
+        print(f"{'saved per request':<40} {saved:>9.1f} us ({saved / results['/legacy']:.1%})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=20, help="conversationHistory length")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=3_000)
+    args = parser.parse_args()
+
+    body = make_body(args.history)
+    print(f"request body: {len(body)} bytes, {args.history} history messages\n")
+    components(body, args.iterations)
+    asyncio.run(round_trips(body, args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
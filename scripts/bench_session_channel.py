@@ -0,0 +1,210 @@
+"""
+Benchmark long sessions over REST (/analyze with the full conversationHistory
+every turn) against the WebSocket session channel (app/api/session_channel.py,
+one open frame, then only the new message).
+
+The app runs under uvicorn in a subprocess (mock agent, tracing off, rate
+limits off). --sessions conversations of --turns scammer messages run in
+lockstep: turn k of every session is sent, all replies are awaited, then
+turn k+1. For each turn index the server process's CPU time
+(/proc/<pid>/stat) and the bytes each way through a counting TCP proxy in
+front of the server (HTTP/WebSocket framing included) are sampled, so the
+growth with session length is visible per turn, not just on average.
+
+Usage:
+    python scripts/bench_session_channel.py [--sessions 50] [--turns 40] [--port 8771]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import httpx
+import websockets
+
+from scripts.loadtest.sessions import generate_sessions
+
+API_KEY = "bench-channel"
+HEADERS = {"x-api-key": API_KEY}
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+class CountingProxy:
+    """TCP proxy to the server counting bytes client -> server (rx) and server -> client (tx)."""
+
+    def __init__(self, upstream_port: int):
+        self.upstream_port = upstream_port
+        self.rx = self.tx = 0
+        self.port = 0
+        self._server = None
+        self._handlers = set()
+
+    async def start(self) -> "CountingProxy":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        # Let the pipes see EOF from the closed client connections instead of cancelling them
+        self._server.close()
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=5)
+
+    async def _handle(self, client_reader, client_writer) -> None:
+        self._handlers.add(asyncio.current_task())
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", self.upstream_port)
+
+        async def pipe(reader, writer, direction):
+            try:
+                while True:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+                    setattr(self, direction, getattr(self, direction) + len(data))
+                    writer.write(data)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        await asyncio.gather(pipe(client_reader, server_writer, "rx"), pipe(server_reader, client_writer, "tx"))
+
+
+def server_counters(pid: int, proxy: CountingProxy) -> Dict[str, float]:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return {"cpu": (int(fields[11]) + int(fields[12])) / CLK_TCK, "rx": proxy.rx, "tx": proxy.tx}
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, API_KEY=API_KEY, RATE_LIMIT_ENABLED="false", TRACING_ENABLED="false",
+               LOG_LEVEL="CRITICAL", PREFILTER_ENABLED="false", GUVI_CALLBACK_URL="http://127.0.0.1:9/unused")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "critical",
+         "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def message(text: str, turn: int) -> Dict:
+    return {"sender": "scammer", "text": text, "timestamp": 1700000000000 + turn * 1000}
+
+
+async def run_rest(port: int, sessions, turns: int, pid: int, tag: str) -> List[Dict[str, float]]:
+    proxy = await CountingProxy(port).start()
+    base = f"http://127.0.0.1:{proxy.port}"
+    histories = {s.session_id: [] for s in sessions}
+    per_turn = [{"cpu": 0.0, "rx": 0.0, "tx": 0.0}]  # nothing to open
+    async with httpx.AsyncClient(base_url=base, headers=HEADERS, timeout=30,
+                                 limits=httpx.Limits(max_connections=len(sessions))) as client:
+        async def turn(s, k):
+            history = histories[s.session_id]
+            body = {"sessionId": f"{tag}-{s.session_id}", "message": message(s.messages[k], k),
+                    "conversationHistory": history, "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}
+            response = await client.post("/api/v1/analyze", json=body)
+            response.raise_for_status()
+            history.append(body["message"])
+            history.append({"sender": "user", "text": response.json()["reply"], "timestamp": body["message"]["timestamp"] + 1})
+
+        for k in range(turns):
+            before = server_counters(pid, proxy)
+            await asyncio.gather(*(turn(s, k) for s in sessions))
+            per_turn.append(delta(before, server_counters(pid, proxy), len(sessions)))
+    await proxy.close()
+    return per_turn
+
+
+async def run_channel(port: int, sessions, turns: int, pid: int, tag: str) -> List[Dict[str, float]]:
+    proxy = await CountingProxy(port).start()
+    url = f"ws://127.0.0.1:{proxy.port}/api/v1/session"
+    sockets = {}
+    opened_before = server_counters(pid, proxy)
+    for s in sessions:
+        ws = await websockets.connect(url, additional_headers=HEADERS, compression=None)
+        await ws.send(json.dumps({"type": "open", "sessionId": f"{tag}-{s.session_id}",
+                                  "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}))
+        opened = json.loads(await ws.recv())
+        assert opened["type"] == "opened", opened
+        sockets[s.session_id] = ws
+
+    async def turn(s, k):
+        ws = sockets[s.session_id]
+        await ws.send(json.dumps({"type": "message", "seq": k + 1, "message": message(s.messages[k], k)}))
+        reply = json.loads(await ws.recv())
+        assert reply["type"] == "reply", reply
+
+    per_turn = [delta(opened_before, server_counters(pid, proxy), len(sessions))]  # handshake + open frame
+    try:
+        for k in range(turns):
+            before = server_counters(pid, proxy)
+            await asyncio.gather(*(turn(s, k) for s in sessions))
+            per_turn.append(delta(before, server_counters(pid, proxy), len(sessions)))
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets.values()))
+        await proxy.close()
+    return per_turn
+
+
+def delta(before: Dict[str, float], after: Dict[str, float], count: int) -> Dict[str, float]:
+    return {key: (after[key] - before[key]) / count for key in before}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8771)
+    args = parser.parse_args()
+
+    sessions = generate_sessions(args.sessions, turns=args.turns, benign_ratio=0.0)
+    proc = start_server(args.port)
+    try:
+        # Warm both paths so imports and first-use costs are not attributed to turn 1
+        asyncio.run(run_rest(args.port, sessions[:2], 2, proc.pid, "warm"))
+        asyncio.run(run_channel(args.port, sessions[:2], 2, proc.pid, "warm"))
+        results = {
+            "REST": asyncio.run(run_rest(args.port, sessions, args.turns, proc.pid, "rest")),
+            "channel": asyncio.run(run_channel(args.port, sessions, args.turns, proc.pid, "ws")),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+    print(f"{args.sessions} sessions x {args.turns} turns, per turn and session\n")
+    header = f"{'turn':>5}  {'REST rx B':>10} {'REST tx B':>10} {'REST cpu ms':>12}  {'WS rx B':>8} {'WS tx B':>8} {'WS cpu ms':>10}"
+    print(header)
+    print("-" * len(header))
+    marks = sorted({0, 1, 2, 5, 10, 20, 30, args.turns} & set(range(args.turns + 1)))
+    for k in marks:
+        r, w = results["REST"][k], results["channel"][k]
+        print(f"{'open' if k == 0 else k:>5}  {r['rx']:>10.0f} {r['tx']:>10.0f} {r['cpu'] * 1000:>12.2f}  "
+              f"{w['rx']:>8.0f} {w['tx']:>8.0f} {w['cpu'] * 1000:>10.2f}")
+    totals = {name: {key: sum(t[key] for t in rows) for key in ("rx", "tx", "cpu")} for name, rows in results.items()}
+    r, w = totals["REST"], totals["channel"]
+    print("-" * len(header))
+    print(f"{'all':>5}  {r['rx']:>10.0f} {r['tx']:>10.0f} {r['cpu'] * 1000:>12.2f}  "
+          f"{w['rx']:>8.0f} {w['tx']:>8.0f} {w['cpu'] * 1000:>10.2f}")
+    print(f"\nchannel vs REST over the whole session: bytes received {1 - w['rx'] / r['rx']:.1%} fewer, "
+          f"server CPU {1 - w['cpu'] / r['cpu']:.1%} less")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Benchmark the end-of-session path (app/core/session_intel_store.py): a wave
+of sessions expiring at once, each needing a final callback, while the event
+loop keeps serving.
+
+--sessions sessions are written to the intel store (--scam-share of them with
+callback-worthy intel that was never posted), the TTL passes, and the sweep
+background task expires them. A 1ms ticker on the same event loop measures
+loop lag, i.e. how long request handling would be held up. Callbacks go to a
+minimal asyncio HTTP/1.1 endpoint in a child process (the threaded callback
+stub of the load test collapses beyond ~8 concurrent connections).
+
+Modes:
+  inline       removal listener posts the final callback synchronously
+               (naive wiring: the sweep blocks on HTTP)
+  dispatcher   the shipped wiring: listeners queue on the BatchedDispatcher
+
+Usage:
+    python scripts/bench_session_expiry.py [--sessions 20000] [--scam-share 0.5] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import metrics, session_intel_store as store
+from app.core.callback_dispatcher import BatchedDispatcher
+
+
+def serve_stub(latency_ms: float, urls) -> None:
+    """Keep-alive HTTP/1.1 endpoint answering every POST with 200 after `latency_ms`."""
+    response = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 20\r\n\r\n{\"status\":\"success\"}"
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                if latency_ms:
+                    await asyncio.sleep(latency_ms / 1000.0)
+                writer.write(response)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def main() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+        urls.put(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/api/updateHoneyPotFinalResult")
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def callbacks_sent() -> int:
+    return int(metrics.CALLBACK_OUTCOMES.labels("success").value)
+
+
+def fill(count: int, scam_share: float, prefix: str) -> None:
+    cache = store._SESSION_INTEL_STORE
+    cache.maxsize = count + 1
+    for i in range(count):
+        session_id = f"{prefix}-{i:06d}"
+        if i < count * scam_share:
+            store.update_session_intel(session_id, upi_ids=[f"user{i}@ybl"], phone_numbers=["+919876543210"],
+                                       suspicious_keywords=["urgent"], scam_detected=True, message_count=6)
+        else:
+            store.update_session_intel(session_id, suspicious_keywords=["hello"], message_count=2)
+
+
+async def run(args, inline: bool) -> Dict[str, float]:
+    cache = store._SESSION_INTEL_STORE
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    fill(args.sessions, args.scam_share, "inline" if inline else "dispatch")
+    await asyncio.sleep(args.ttl + 0.05)
+    sent_before = callbacks_sent()
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    sweeper = asyncio.create_task(store.sweep_sessions_background_task(interval_seconds=0.1))
+    while len(cache) or store._FINAL_CALLBACKS.pending():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    sweeper.cancel()
+    done.set()
+    await tick
+    ordered = sorted(lags)
+    return {
+        "expired": args.sessions,
+        "callbacks": callbacks_sent() - sent_before,
+        "elapsed": elapsed,
+        "lag_p50": ordered[len(ordered) // 2] * 1000,
+        "lag_p99": ordered[int(len(ordered) * 0.99)] * 1000,
+        "lag_max": ordered[-1] * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--scam-share", type=float, default=0.5, help="share of sessions that need a final callback")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="callback stub latency")
+    parser.add_argument("--ttl", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="dispatcher concurrency")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    urls = multiprocessing.Queue()
+    stub = multiprocessing.Process(target=serve_stub, args=(args.latency_ms, urls), daemon=True)
+    stub.start()
+    store.CALLBACK_URL = urls.get(timeout=10)
+    cache = store._SESSION_INTEL_STORE
+    cache.ttl = args.ttl
+    cache.idle_seconds = None
+    from app.core.http_clients import configure
+    configure(max_connections_per_host=args.concurrency, max_keepalive_per_host=args.concurrency)
+
+    print(f"{args.sessions} sessions expiring at once, {args.scam_share:.0%} need a final callback, "
+          f"stub {args.latency_ms:.0f}ms\n")
+    header = f"{'mode':<12} {'expiries/min':>13} {'callbacks':>10} {'drain s':>8} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}"
+    print(header)
+    print("-" * len(header))
+    try:
+        for mode in ("inline", "dispatcher"):
+            if mode == "inline":
+                store._FINAL_CALLBACKS = BatchedDispatcher("bench-unused", store.aflush_session_callback)
+                listener = lambda sid, intel, _reason: store.flush_session_callback(sid, intel)
+            else:
+                store._FINAL_CALLBACKS = BatchedDispatcher("bench", store.aflush_session_callback,
+                                                           concurrency=args.concurrency)
+                listener = store._queue_final_callback
+            cache._listeners = [l for l in cache._listeners if l is not store._queue_final_callback]
+            cache.add_listener(listener)
+            r = asyncio.run(run(args, inline=(mode == "inline")))
+            cache._listeners.remove(listener)
+            cache._listeners.append(store._queue_final_callback)
+            store._FINAL_CALLBACKS.close()
+            print(f"{mode:<12} {r['expired'] / r['elapsed'] * 60:>13.0f} {r['callbacks']:>10} {r['elapsed']:>8.2f} "
+                  f"{r['lag_p50']:>11.2f} {r['lag_p99']:>11.2f} {r['lag_max']:>11.1f}")
+    finally:
+        stub.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Benchmark event-loop lag under concurrent scam_intel tool calls
+(app/controllers/Agents/Tools/scam_extraction_tools.py).
+
+--concurrency simulated turns run side by side until --calls tool calls are
+made; each turn awaits an LLM call (exponential, mean --llm-ms) and then calls
+the tool for its own session with a new UPI ID and a scam score above the
+threshold, so every call merges and has a callback due. Callbacks go to the minimal asyncio endpoint of
+bench_session_expiry.py in a child process, answering after --latency-ms. A
+1ms ticker on the same event loop measures loop lag, i.e. how long every
+other request on the worker is held up.
+
+Modes:
+  sync-inline  the sync tool called on the loop (a framework running sync
+               tools inline): the callback POST blocks the loop
+  sync-thread  the sync tool in asyncio.to_thread (how masai runs sync tools):
+               one worker thread held per call for the POST
+  async        asave_scam_intel awaited on the loop: merge inline, callback
+               enqueued on the dispatcher (the shipped wiring)
+
+Reported per mode: tool calls/s, tool latency p50/p99, loop lag p50/p99/max
+and ticks per second (a blocked loop ticks rarely, so its few ticks are
+long), peak threads and callbacks posted (the async mode waits for its
+dispatcher to drain).
+
+Usage:
+    python scripts/bench_tool_loop_lag.py [--calls 2000] [--concurrency 64] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import metrics, session_intel_store as store
+from app.core.execution_context import RequestContext, session_context
+from app.controllers.Agents.Tools.scam_extraction_tools import asave_scam_intel, save_scam_intel
+from scripts.bench_session_expiry import serve_stub
+
+MODES = ("sync-inline", "sync-thread", "async")
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+async def run(args, mode: str) -> Dict[str, float]:
+    sync_tool = getattr(save_scam_intel, "func", save_scam_intel)
+    async_tool = getattr(asave_scam_intel, "func", asave_scam_intel)
+    lags: List[float] = []
+    latencies: List[float] = []
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+    rng = random.Random(7)
+    calls = iter(range(args.calls))
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def turns() -> None:
+        nonlocal peak_threads
+        for i in calls:
+            await asyncio.sleep(rng.expovariate(1000.0 / args.llm_ms))
+            kwargs = {"upi_ids": [f"{mode}{i}@ybl"], "phone_numbers": ["+919876543210"],
+                      "suspicious_keywords": ["urgent"], "scam_score": 90}
+            token = session_context.set(RequestContext(session_id=f"{mode}-{i:06d}", message_count=5))
+            start = time.perf_counter()
+            try:
+                if mode == "sync-inline":
+                    sync_tool(**kwargs)
+                elif mode == "sync-thread":
+                    await asyncio.to_thread(sync_tool, **kwargs)
+                else:
+                    await async_tool(**kwargs)
+            finally:
+                session_context.reset(token)
+            latencies.append(time.perf_counter() - start)
+            peak_threads = max(peak_threads, threading.active_count())
+
+    sent_before = metrics.CALLBACK_OUTCOMES.labels("success").value
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(turns() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    while store._LIVE_CALLBACKS.pending():
+        await asyncio.sleep(0.01)
+    done.set()
+    await tick
+    return {
+        "rate": args.calls / elapsed,
+        "tool_p50": percentile(latencies, .5) * 1000, "tool_p99": percentile(latencies, .99) * 1000,
+        "lag_p50": percentile(lags, .5) * 1000, "lag_p99": percentile(lags, .99) * 1000, "lag_max": max(lags) * 1000,
+        "ticks": len(lags) / (time.perf_counter() - start),
+        "threads": peak_threads, "callbacks": metrics.CALLBACK_OUTCOMES.labels("success").value - sent_before,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent turns")
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="mean LLM time before each tool call")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="callback endpoint latency")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    urls = multiprocessing.Queue()
+    stub = multiprocessing.Process(target=serve_stub, args=(args.latency_ms, urls), daemon=True)
+    stub.start()
+    store.CALLBACK_URL = urls.get(timeout=10)
+    store._SESSION_INTEL_STORE.maxsize = len(MODES) * args.calls + 1
+
+    print(f"{args.calls} tool calls from {args.concurrency} concurrent turns ({args.llm_ms:.0f}ms LLM before each), "
+          f"each with a callback due; "
+          f"endpoint {args.latency_ms:.0f}ms\n")
+    header = (f"{'mode':<12} {'calls/s':>8} {'tool p50 ms':>12} {'tool p99 ms':>12} {'lag p50 ms':>11} "
+              f"{'lag p99 ms':>11} {'lag max ms':>11} {'ticks/s':>8} {'threads':>8} {'callbacks':>10}")
+    print(header)
+    print("-" * len(header))
+    try:
+        for mode in MODES:
+            r = asyncio.run(run(args, mode))
+            print(f"{mode:<12} {r['rate']:>8.0f} {r['tool_p50']:>12.2f} {r['tool_p99']:>12.2f} {r['lag_p50']:>11.2f} "
+                  f"{r['lag_p99']:>11.2f} {r['lag_max']:>11.1f} {r['ticks']:>8.0f} {r['threads']:>8} {r['callbacks']:>10.0f}")
+    finally:
+        store.close_final_callbacks()
+        stub.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
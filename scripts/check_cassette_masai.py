@@ -0,0 +1,211 @@
+"""
+Record/replay check for LLM cassettes (app/controllers/Agents/utils/cassette.py)
+against the real masai HONEYPOT agent.
+
+Runs the real app in process with the real agent (create_honeypot_agent on a
+masai AgentManager, model routing from model_config.json); only the provider
+under each role's RoleModelProxy is replaced by FakeProvider, which answers
+masai's structured-output calls with its AnswerFormat after a random latency.
+Replies are numbered in the order the provider answered, so a replay that
+serves a recording to the wrong call returns a different reply.
+
+Two phases, each in a fresh subprocess:
+
+  record  sessions arrive in one order and the cassette records every call
+  replay  strict replay (a call with no recording fails the turn): sessions
+          arrive in a different order, masai's clock is moved forward by
+          --clock-shift-min (the <TIME> field of every prompt changes) and
+          recorded latencies are scaled by --latency-scale (the model router
+          sees different latencies)
+
+Reported: turns whose reply differs between the phases, cassette hits,
+misses and role fallbacks, and the models that served the recorded calls.
+Exits 1 unless every replayed reply matches its recording.
+
+Needs masai_framework (requirements.txt); no network access or API key is
+used.
+
+Usage:
+    python scripts/check_cassette_masai.py [--sessions 20] [--turns 4] [--clock-shift-min 1477]
+"""
+import argparse
+import asyncio
+import datetime
+import importlib.util
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.loadtest.callback_stub import CallbackStub
+from scripts.loadtest.sessions import generate_sessions
+
+API_KEY = "cassette-check-key"
+ANALYZE_PATH = "/api/v1/analyze"
+PHASES = ("record", "replay")
+
+
+class FakeProvider:
+    """Stands in for masai's provider chat model: structured output only, no network."""
+
+    _replies = itertools.count(1)
+
+    def __init__(self, model_name: str, latency_ms: float, rng: random.Random):
+        self.model_name = model_name
+        self._latency_ms = latency_ms
+        self._rng = rng
+        self._schema: Any = None
+
+    def with_structured_output(self, schema: Any, method: str = "json_mode") -> "FakeProvider":
+        self._schema = schema
+        return self
+
+    async def ainvoke(self, messages: Any) -> Any:
+        await asyncio.sleep(self._rng.expovariate(1000.0 / self._latency_ms))
+        reply = next(self._replies)
+        return self._schema(reasoning=f"fake reasoning {reply}", answer=f"Oh no, what should I do? ({reply})",
+                            satisfied=True, tool=None, tool_input=None, delegate_to_agent=None)
+
+
+def fake_provider_factory(latency_ms: float, seed: int):
+    from app.controllers.Agents.HONEYPOT.honeypot_agent import create_honeypot_agent
+    from app.controllers.Agents.utils.provider_proxy import AGENT_ROLES, RoleModelProxy
+    rng = random.Random(seed)
+
+    def factory(manager: Any) -> Any:
+        agent = create_honeypot_agent(manager)
+        for role in AGENT_ROLES:
+            proxy = getattr(getattr(agent, f"llm_{role}", None), "model", None)
+            if isinstance(proxy, RoleModelProxy) and not isinstance(proxy.inner, FakeProvider):
+                name = getattr(proxy.inner, "model_name", None) or getattr(proxy.inner, "model", None)
+                proxy._inner = FakeProvider(str(name), latency_ms, rng)
+                proxy._tier_models.clear()
+        return agent
+    return factory
+
+
+def shift_masai_clock(minutes: float) -> None:
+    """Move the wall clock masai formats into its prompts (<TIME>) forward."""
+    import masai.GenerativeModel.generativeModels as generative_models
+
+    class ShiftedDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return super().now(tz) + datetime.timedelta(minutes=minutes)
+
+    generative_models.datetime = ShiftedDatetime
+
+
+async def run_phase(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.controllers.Agents.register import register_agent_factory
+    from app.controllers.Agents.utils.cassette import CASSETTE_CALLS
+
+    register_agent_factory("HONEYPOT", fake_provider_factory(args.role_latency_ms, args.seed))
+    if args.phase == "replay":
+        shift_masai_clock(args.clock_shift_min)
+    rng = random.Random(args.seed + PHASES.index(args.phase))  # arrival order differs per phase
+    sessions = generate_sessions(args.sessions, turns=args.turns, benign_ratio=0.0, seed=args.seed)
+    replies: Dict[str, List[str]] = {}
+
+    async def talk(client, session) -> None:
+        await asyncio.sleep(rng.uniform(0, args.spread_s))
+        history: List[Dict[str, Any]] = []
+        replies[session.session_id] = []
+        for turn, text in enumerate(session.messages):
+            message = {"sender": "scammer", "text": text, "timestamp": 1769000000000 + turn * 1000}
+            body = {"sessionId": session.session_id, "message": message, "conversationHistory": history,
+                    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}
+            response = await client.post(ANALYZE_PATH, json=body, headers={"x-api-key": API_KEY})
+            reply = response.json().get("reply", "") if response.status_code == 200 else f"HTTP {response.status_code}"
+            replies[session.session_id].append(reply)
+            history = history + [message, {"sender": "user", "text": reply, "timestamp": message["timestamp"] + 500}]
+            await asyncio.sleep(rng.uniform(0, args.think_s))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cassette-check", timeout=120) as client:
+            await asyncio.gather(*(talk(client, session) for session in sessions))
+    calls = {values[0]: int(child.value) for values, child in CASSETTE_CALLS._children.items()}
+    return {"phase": args.phase, "replies": replies, "cassette_calls": calls}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=4, help="masai summarizes history (a real LLM call) past 10")
+    parser.add_argument("--role-latency-ms", type=float, default=30.0)
+    parser.add_argument("--spread-s", type=float, default=1.0, help="sessions start within this window")
+    parser.add_argument("--think-s", type=float, default=0.2)
+    parser.add_argument("--clock-shift-min", type=float, default=1477.0, help="replay: masai clock moved forward")
+    parser.add_argument("--latency-scale", type=float, default=0.2, help="replay: recorded latencies scaled")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--phase", choices=PHASES, help=argparse.SUPPRESS)
+    parser.add_argument("--cassette", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        if importlib.util.find_spec("masai") is None:
+            print("masai_framework is not installed (see requirements.txt)", file=sys.stderr)
+            return 2
+        callbacks = CallbackStub().start()
+        os.environ.update({
+            "API_KEY": API_KEY,
+            "RATE_LIMIT_ENABLED": "false",
+            "GUVI_CALLBACK_URL": callbacks.url,
+            "LOG_LEVEL": "CRITICAL",
+            "TRACING_ENABLED": "false",
+            "PREFILTER_ENABLED": "false",
+            "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "unused-fake-provider"),
+            "LLM_CASSETTE_MODE": args.phase,
+            "LLM_CASSETTE_PATH": args.cassette,
+            "LLM_CASSETTE_STRICT": "true",
+            "LLM_CASSETTE_LATENCY_SCALE": str(args.latency_scale),
+        })
+        result = asyncio.run(run_phase(args))
+        callbacks.stop()
+        print(json.dumps(result))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = os.path.join(tmp, "masai.jsonl.gz")
+        results = {}
+        for phase in PHASES:
+            out = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--phase", phase, "--cassette", cassette],
+                                 capture_output=True, text=True)
+            if out.returncode != 0:
+                print(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"{phase} failed", file=sys.stderr)
+                return out.returncode
+            results[phase] = json.loads(out.stdout.strip().splitlines()[-1])
+        import gzip
+        with gzip.open(cassette, "rt", encoding="utf-8") as f:
+            next(f)
+            served_by = Counter((r["role"], r["model"], r["served_by"]) for r in map(json.loads, f))
+
+    recorded, replayed = results["record"]["replies"], results["replay"]["replies"]
+    turns = sum(len(replies) for replies in recorded.values())
+    differ = [(sid, i, recorded[sid][i], replayed[sid][i]) for sid in recorded
+              for i in range(len(recorded[sid])) if recorded[sid][i] != replayed[sid][i]]
+    print(f"{args.sessions} sessions x {args.turns} turns on the real masai agent; replay: strict, "
+          f"clock +{args.clock_shift_min:g} min, latency x{args.latency_scale}, different arrival order\n")
+    print(f"record cassette calls: {results['record']['cassette_calls']}")
+    print(f"replay cassette calls: {results['replay']['cassette_calls']}")
+    print(f"recorded calls by role / base model / served by: "
+          f"{', '.join(f'{r}/{m}/{s} {n}' for (r, m, s), n in sorted(served_by.items()))}")
+    print(f"\nreplies identical in replay: {turns - len(differ)}/{turns}")
+    for sid, turn, before, after in differ[:5]:
+        print(f"  {sid} turn {turn + 1}: recorded {before!r:.60} replayed {after!r:.60}")
+    return 0 if not differ and not results["replay"]["cassette_calls"].get("miss") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
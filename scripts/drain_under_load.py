@@ -0,0 +1,180 @@
+"""
+Rolling-restart check for the graceful drain (app/core/drain.py).
+
+Runs the real app in process with the mock agent (--role-latency-ms per LLM
+role call) and the callback endpoint on a local CallbackStub. Scam sessions
+arrive open-loop (Poisson, --arrival-rate per second) and talk through their
+turns; --shutdown-after-s into the run the lifespan shutdown starts while
+sessions keep sending. A session whose turn is refused with 503 stops (its
+client moves to another instance). When the shutdown returns the process
+"exits": turns still running are cancelled and counted as dropped.
+
+Two modes, each in a fresh subprocess:
+
+  drain   the shipped shutdown: refuse new turns, wait for running ones,
+          flush callbacks for live sessions, clean up managers
+  legacy  the two losses of the lifespan before the drain: no wait for
+          running turns (they are dropped at exit) and no flush of live
+          sessions (only callbacks already queued are posted); the 503 gate
+          and the manager cleanup stay on
+
+Reported per mode: turns running when shutdown began and how many of them
+completed, turns dropped, 503 refusals, shutdown duration, callbacks the
+endpoint received during shutdown, sessions whose latest intel never reached
+the endpoint ("intel lost"), and the drain report.
+
+Usage:
+    python scripts/drain_under_load.py [--arrival-rate 20] [--shutdown-after-s 5] [--role-latency-ms 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.loadtest.callback_stub import CallbackStub
+from scripts.loadtest.sessions import generate_sessions
+
+API_KEY = "drain-check-key"
+ANALYZE_PATH = "/api/v1/analyze"
+MODES = ("drain", "legacy")
+
+
+def unsent_sessions() -> int:
+    """Sessions in the intel store whose entities / scam verdict never reached the endpoint."""
+    from app.core import session_intel_store as store
+    lost = 0
+    for session_id, intel in store._SESSION_INTEL_STORE.items():
+        if store.should_send_callback(intel):
+            payload = store.build_callback_payload(session_id, intel)
+            lost += store.callback_fingerprints(payload)[0] != intel.get("callback_fingerprint")
+    return lost
+
+
+async def run_mode(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.core import session_intel_store
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+
+    if args.mode == "legacy":
+        session_intel_store.flush_live_sessions = lambda: 0
+    register_agent_factory("HONEYPOT", make_mock_factory(args.role_latency_ms, seed=args.seed))
+    rng = random.Random(args.seed)
+    sessions = iter(generate_sessions(int(args.arrival_rate * args.shutdown_after_s * 2) + 10, turns=args.turns,
+                                      benign_ratio=0.0, seed=args.seed))
+    stats = {"turns_ok": 0, "refused": 0, "errors": 0, "in_flight_at_shutdown": 0,
+             "completed_during_drain": 0, "dropped": 0}
+    running: Dict[int, bool] = {}  # turn id -> started before shutdown began
+    shutdown_started = asyncio.Event()
+
+    async def talk(client, session) -> None:
+        history: List[Dict[str, Any]] = []
+        for turn, text in enumerate(session.messages):
+            message = {"sender": "scammer", "text": text, "timestamp": 1769000000000 + turn * 1000}
+            body = {"sessionId": session.session_id, "message": message, "conversationHistory": history,
+                    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}
+            turn_id = id(body)
+            running[turn_id] = not shutdown_started.is_set()
+            try:
+                response = await client.post(ANALYZE_PATH, json=body, headers={"x-api-key": API_KEY})
+            except asyncio.CancelledError:
+                stats["dropped"] += 1
+                raise
+            finally:
+                before_shutdown = running.pop(turn_id)
+            if response.status_code == 503:
+                stats["refused"] += 1
+                return
+            data = response.json() if response.status_code == 200 else {}
+            if data.get("status") != "success":
+                stats["errors"] += 1
+                return
+            stats["turns_ok"] += 1
+            stats["completed_during_drain"] += before_shutdown and shutdown_started.is_set()
+            history = history + [message, {"sender": "user", "text": data["reply"], "timestamp": message["timestamp"] + 500}]
+            await asyncio.sleep(rng.expovariate(1.0 / args.think_s))
+
+    lifespan = app.router.lifespan_context(app)
+    await lifespan.__aenter__()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://drain-check", timeout=120) as client:
+        tasks = []
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < args.shutdown_after_s:
+            await asyncio.sleep(rng.expovariate(args.arrival_rate))
+            tasks.append(asyncio.create_task(talk(client, next(sessions))))
+
+        received = args.callbacks.received
+        stats["in_flight_at_shutdown"] = len(running)
+        shutdown_started.set()
+        start = time.monotonic()
+        await lifespan.__aexit__(None, None, None)
+        stats["shutdown_s"] = time.monotonic() - start
+        stats["callbacks_during_shutdown"] = args.callbacks.received - received
+        # Process exit: whatever is still running goes with it
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    stats["sessions"] = len(tasks)
+    stats["intel_lost"] = unsent_sessions()
+    stats["report"] = getattr(app.state, "drain_report", None)
+    return {"mode": args.mode, **stats}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arrival-rate", type=float, default=20.0, help="new sessions per second")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--think-s", type=float, default=0.3, help="mean scammer think time")
+    parser.add_argument("--shutdown-after-s", type=float, default=5.0)
+    parser.add_argument("--role-latency-ms", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        args.callbacks = CallbackStub(latency_ms=20).start()
+        os.environ.update({
+            "API_KEY": API_KEY,
+            "RATE_LIMIT_ENABLED": "false",
+            "GUVI_CALLBACK_URL": args.callbacks.url,
+            "LOG_LEVEL": "ERROR",
+            "PREFILTER_ENABLED": "false",
+            "DRAIN_TIMEOUT_SECONDS": "0" if args.mode == "legacy" else "30",
+        })
+        print(json.dumps(asyncio.run(run_mode(args))))
+        return 0
+
+    results = []
+    for mode in MODES:
+        out = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode],
+                             check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.arrival_rate}/s sessions of {args.turns} turns, {args.role_latency_ms:.0f}ms per role call, "
+          f"shutdown after {args.shutdown_after_s:.0f}s\n")
+    header = (f"{'mode':<7} {'sessions':>9} {'turns ok':>9} {'running at stop':>16} {'completed':>10} "
+              f"{'dropped':>8} {'refused 503':>12} {'shutdown s':>11} {'callbacks':>10} {'intel lost':>11}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['mode']:<7} {r['sessions']:>9} {r['turns_ok']:>9} {r['in_flight_at_shutdown']:>16} "
+              f"{r['completed_during_drain']:>10} {r['dropped']:>8} {r['refused']:>12} {r['shutdown_s']:>11.2f} "
+              f"{r['callbacks_during_shutdown']:>10} {r['intel_lost']:>11}")
+    print()
+    for r in results:
+        print(f"{r['mode']:<7} drain report: {r['report']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
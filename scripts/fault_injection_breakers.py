@@ -0,0 +1,264 @@
+"""
+Fault injection for the circuit breakers (app/core/circuit_breaker.py).
+
+Runs the real app in process against two local fake servers (CallbackStub):
+a fake LLM provider, which the mock agent's role models call over the app's
+pooled HTTP client, and the fake GUVI callback endpoint. Scam sessions arrive
+open-loop (Poisson, --arrival-rate per second) and talk through their turns
+with a short think time while the servers go through four phases:
+
+  healthy       provider answers in --role-latency-ms, callbacks in 20 ms
+  llm_down      the provider fails (callbacks healthy, though few are due
+                while turns get fallback replies)
+  callback_down the callback endpoint fails (provider healthy again)
+  recovery      both healthy
+
+A failing server either hangs (--outage hang: requests stall for 60s, past
+every timeout) or answers HTTP 500 at once (--outage error). The provider
+model gives up after --provider-timeout-s, like an SDK request timeout; this
+also bounds provider calls that coalesced turns still share after the outage.
+
+The agent fails the way masai's does (--agent masai, the default):
+Agent.initiate_agent catches the provider error and returns its state with
+current_node="error" and "Agent execution failed with error: ..." as the
+answer. --agent raise lets the error propagate instead. Replies that are
+such an error text reaching the scammer are counted as "leaked".
+
+Two modes, each in a fresh subprocess: `breakers` (the default settings, with
+--recovery-s between probes) and `none` (CIRCUIT_BREAKERS_ENABLED=false). The
+agent timeout is scaled down to --agent-timeout-s to keep the run short; the
+callback POST keeps its 5s timeout.
+
+Reported per phase: client latency p50/p99/max, fallback replies, the peak
+number of requests in flight and callbacks the endpoint received. At the end:
+callback outcomes (circuit_open = parked in the outbox), callbacks still
+parked after --settle-s, and the breakers' final states.
+
+Usage:
+    python scripts/fault_injection_breakers.py [--outage hang|error] [--agent masai|raise] [--arrival-rate 4]
+        [--phase-s 10 15 15 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.loadtest.callback_stub import CallbackStub
+from scripts.loadtest.sessions import generate_sessions
+
+API_KEY = "fault-injection-key"
+ANALYZE_PATH = "/api/v1/analyze"
+PHASES = ("healthy", "llm_down", "callback_down", "recovery")
+HANG_MS = 60000.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ProviderModel:
+    """Role model that calls the fake provider server; non-200 answers raise like an SDK would."""
+
+    def __init__(self, role: str, url: str, timeout: float):
+        self.role = role
+        self.model = f"fake-{role}"
+        self.url = url
+        self.timeout = timeout
+
+    def with_structured_output(self, *args, **kwargs) -> "ProviderModel":
+        return self
+
+    async def ainvoke(self, messages: Any) -> Dict[str, Any]:
+        from app.core.http_clients import get_http_clients
+        response = await get_http_clients().async_client(self.url).post(self.url, content=b"{}", timeout=self.timeout)
+        response.raise_for_status()
+        return {"role": self.role, "answer": None}
+
+
+class MasaiShapedAgent:
+    """Returns masai's error state on failure (singular_agent.Agent.initiate_agent) instead of raising."""
+
+    def __init__(self, inner: Any):
+        self._inner = inner
+
+    async def initiate_agent(self, query: str, passed_from: Any = None) -> Dict[str, Any]:
+        try:
+            return await self._inner.initiate_agent(query, passed_from=passed_from)
+        except Exception as e:
+            return {"messages": [{"role": "user", "content": query}], "answer": f"Agent execution failed with error: {e}",
+                    "satisfied": False, "reasoning": f"Error during ainvoke: {e}", "current_node": "error",
+                    "tool_output": f"Error: {e}"}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+
+def masai_shaped(factory):
+    def wrapped(manager: Any) -> MasaiShapedAgent:
+        agent = factory(manager)
+        return agent if isinstance(agent, MasaiShapedAgent) else MasaiShapedAgent(agent)
+    return wrapped
+
+
+async def drive(args, client, provider: CallbackStub, callbacks: CallbackStub) -> Dict[str, Any]:
+    from app.api.routes import FALLBACK_RESPONSES
+    rng = random.Random(args.seed)
+    ends = [sum(args.phase_s[:i + 1]) for i in range(len(PHASES))]
+    sessions = iter(generate_sessions(int(args.arrival_rate * ends[-1] * 2) + 10, turns=args.turns,
+                                      benign_ratio=0.0, seed=args.seed))
+    stats = {phase: {"latencies": [], "fallbacks": 0, "errors": 0, "leaked": 0, "peak_in_flight": 0, "callbacks": 0}
+             for phase in PHASES}
+    in_flight = 0
+    t0 = time.monotonic()
+
+    def phase_at(t: float) -> str:
+        return next((phase for phase, end in zip(PHASES, ends) if t < end), PHASES[-1])
+
+    async def talk(session) -> None:
+        nonlocal in_flight
+        history: List[Dict[str, Any]] = []
+        for turn, text in enumerate(session.messages):
+            message = {"sender": "scammer", "text": text, "timestamp": 1769000000000 + turn * 1000}
+            body = {"sessionId": session.session_id, "message": message, "conversationHistory": history,
+                    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}}
+            start = time.monotonic()
+            phase = stats[phase_at(start - t0)]
+            in_flight += 1
+            phase["peak_in_flight"] = max(phase["peak_in_flight"], in_flight)
+            try:
+                response = await client.post(ANALYZE_PATH, json=body, headers={"x-api-key": API_KEY})
+                data = response.json() if response.status_code == 200 else {}
+            except Exception:
+                data = {}
+            finally:
+                in_flight -= 1
+            phase["latencies"].append(time.monotonic() - start)
+            reply = data.get("reply", "")
+            phase["fallbacks"] += reply in FALLBACK_RESPONSES
+            phase["errors"] += data.get("status") != "success"
+            phase["leaked"] += reply.startswith("Agent execution failed")
+            history = history + [message, {"sender": "user", "text": reply, "timestamp": message["timestamp"] + 500}]
+            await asyncio.sleep(rng.expovariate(1.0 / args.think_s))
+
+    async def faults() -> None:
+        received = 0
+        for phase, end in zip(PHASES, ends):
+            for server, down, latency_ms in ((provider, phase == "llm_down", args.role_latency_ms),
+                                             (callbacks, phase == "callback_down", 20.0)):
+                server.latency_ms = HANG_MS if down and args.outage == "hang" else latency_ms
+                server.status = 500 if down and args.outage == "error" else 200
+            await asyncio.sleep(max(0.0, t0 + end - time.monotonic()))
+            stats[phase]["callbacks"] = callbacks.received - received
+            received = callbacks.received
+
+    tasks = []
+    fault_task = asyncio.create_task(faults())
+    while time.monotonic() - t0 < ends[-1]:
+        await asyncio.sleep(rng.expovariate(args.arrival_rate))
+        tasks.append(asyncio.create_task(talk(next(sessions))))
+    await fault_task
+    await asyncio.gather(*tasks)
+    return stats
+
+
+async def run_mode(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.api import routes
+    from app.core import circuit_breaker, metrics
+    from app.core import session_intel_store as store
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+
+    routes.AGENT_TIMEOUT_SECONDS = args.agent_timeout_s
+    provider_url, timeout = args.provider_url, args.provider_timeout_s
+    factory = make_mock_factory(0, seed=args.seed, model_factory=lambda role: ProviderModel(role, provider_url, timeout))
+    register_agent_factory("HONEYPOT", masai_shaped(factory) if args.agent == "masai" else factory)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fault-injection", timeout=120) as client:
+            stats = await drive(args, client, args.provider, args.callbacks)
+            await asyncio.sleep(args.settle_s)  # the sweep task re-queues parked callbacks
+            outbox = len(store._CALLBACK_OUTBOX)
+    outcomes = {values[0]: child.value for values, child in metrics.CALLBACK_OUTCOMES._children.items()}
+    for phase in stats.values():
+        latencies = phase.pop("latencies")
+        phase.update(turns=len(latencies), p50_s=percentile(latencies, .5), p99_s=percentile(latencies, .99),
+                     max_s=max(latencies, default=float("nan")))
+    return {"mode": args.mode, "phases": stats, "callback_outcomes": outcomes, "outbox_after_settle": outbox,
+            "circuits": circuit_breaker.snapshot()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--outage", choices=("hang", "error"), default="hang")
+    parser.add_argument("--agent", choices=("masai", "raise"), default="masai", help="how the agent reports a provider failure")
+    parser.add_argument("--arrival-rate", type=float, default=4.0, help="new sessions per second")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--think-s", type=float, default=0.5, help="mean scammer think time")
+    parser.add_argument("--phase-s", type=float, nargs=4, default=(10.0, 15.0, 15.0, 20.0),
+                        metavar=("HEALTHY", "LLM_DOWN", "CALLBACK_DOWN", "RECOVERY"))
+    parser.add_argument("--role-latency-ms", type=float, default=50.0)
+    parser.add_argument("--agent-timeout-s", type=float, default=4.0, help="stands in for AGENT_TIMEOUT_SECONDS (25)")
+    parser.add_argument("--provider-timeout-s", type=float, default=10.0)
+    parser.add_argument("--recovery-s", type=float, default=3.0, help="open time before a probe, both circuits")
+    parser.add_argument("--settle-s", type=float, default=4.0, help="wait after the last turn before counting the outbox")
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--mode", choices=("breakers", "none"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        args.provider = CallbackStub().start()
+        args.provider_url = args.provider.url
+        args.callbacks = CallbackStub().start()
+        os.environ.update({
+            "API_KEY": API_KEY,
+            "RATE_LIMIT_ENABLED": "false",
+            "GUVI_CALLBACK_URL": args.callbacks.url,
+            "LOG_LEVEL": "ERROR",
+            "SESSION_SWEEP_INTERVAL_SECONDS": "1",
+            "CIRCUIT_BREAKERS_ENABLED": str(args.mode == "breakers").lower(),
+            "AGENT_CIRCUIT_RECOVERY_SECONDS": str(args.recovery_s),
+            "CALLBACK_CIRCUIT_RECOVERY_SECONDS": str(args.recovery_s),
+        })
+        print(json.dumps(asyncio.run(run_mode(args))))
+        return 0
+
+    results = []
+    for mode in ("breakers", "none"):
+        out = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode],
+                             check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"outage: {args.outage}, agent: {args.agent}, phases {'/'.join(f'{s:.0f}' for s in args.phase_s)}s, "
+          f"{args.arrival_rate}/s sessions of {args.turns} turns, agent timeout {args.agent_timeout_s}s, "
+          f"callback timeout 5s, probe every {args.recovery_s}s\n")
+    header = (f"{'mode':<9} {'phase':<13} {'turns':>6} {'p50 s':>7} {'p99 s':>7} {'max s':>7} "
+              f"{'fallbacks':>10} {'errors':>7} {'leaked':>7} {'peak in flight':>15} {'callbacks rx':>13}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        for phase in PHASES:
+            p = r["phases"][phase]
+            print(f"{r['mode']:<9} {phase:<13} {p['turns']:>6} {p['p50_s']:>7.2f} {p['p99_s']:>7.2f} {p['max_s']:>7.2f} "
+                  f"{p['fallbacks']:>10} {p['errors']:>7} {p['leaked']:>7} {p['peak_in_flight']:>15} {p['callbacks']:>13}")
+    print()
+    for r in results:
+        outcomes = ", ".join(f"{k} {v:.0f}" for k, v in sorted(r["callback_outcomes"].items()))
+        print(f"{r['mode']:<9} callbacks: {outcomes}; parked after settle: {r['outbox_after_settle']}; circuits: {r['circuits']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
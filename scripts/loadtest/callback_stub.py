@@ -0,0 +1,90 @@
+"""
+Local stand-in for the GUVI callback endpoint.
+
+A threaded HTTP server that accepts POSTs, optionally sleeps to emulate a slow
+endpoint, and counts requests and accepted connections. Used by the load test
+so callbacks never leave the machine. With `certfile` it serves HTTPS (the TLS
+handshake runs on the connection's handler thread).
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+import ssl
+import threading
+import time
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024  # default 5 drops SYNs when many clients connect at once
+    daemon_threads = True
+
+
+class CallbackStub:
+    def __init__(self, latency_ms: float = 0.0, status: int = 200, host: str = "127.0.0.1", port: int = 0,
+                 certfile: Optional[str] = None, keyfile: Optional[str] = None):
+        self.latency_ms = latency_ms
+        self.status = status
+        self.received = 0
+        self.connections = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body leave in one segment (flushed per request); otherwise
+            # Nagle + delayed ACK add ~40ms to every keep-alive response
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with stub._lock:
+                    stub.connections += 1
+                super().setup()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                with stub._lock:
+                    stub.received += 1
+                    stub.bytes_received += length
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000.0)
+                body = b'{"status":"success"}'
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # keep benchmark output clean
+                pass
+
+        self._server = _Server((host, port), Handler)
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True, do_handshake_on_connect=False)
+            self.scheme = "https"
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"{self.scheme}://{host}:{port}/api/updateHoneyPotFinalResult"
+
+    def start(self) -> "CallbackStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="callback-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+__all__ = ["CallbackStub"]
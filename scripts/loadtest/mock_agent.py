@@ -0,0 +1,129 @@
+"""
+Configurable-latency stand-in for the HONEYPOT agent.
+
+Mimics the masai turn shape (router -> evaluator -> optional scam_intel tool
+call in a worker thread -> reflector) with per-role simulated provider latency.
+Role models are exposed as `llm_<role>.model` so the app's RoleModelProxy
+instruments them exactly like real masai role models.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import inspect
+import random
+
+from app.core.session_intel_store import UPI_PATTERN, PHONE_PATTERN, URL_PATTERN, BANK_PATTERN
+from app.controllers.Agents.utils.provider_proxy import instrument_agent_roles
+
+LATEST_MARKER = "Scammer's latest message: "
+
+REPLIES = [
+    "Oh no, what should I do now? Please guide me.",
+    "I am trying but the app is showing some error, can you tell again?",
+    "Which account should I use? I have two accounts.",
+    "Sorry I am not good with phones, is there another way?",
+]
+
+
+class LatencyModel:
+    """Lognormal latency around a mean (ms); sigma controls the tail."""
+
+    def __init__(self, mean_ms: float, sigma: float = 0.35, seed: Optional[int] = None):
+        self.mean_ms = mean_ms
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.mean_ms <= 0:
+            return 0.0
+        # Choose mu so the distribution mean equals mean_ms
+        mu = 0.0 - (self.sigma ** 2) / 2
+        return self.mean_ms * self._rng.lognormvariate(mu, self.sigma) / 1000.0
+
+
+class FakeRoleModel:
+    """Provider chat model stand-in: sleeps for a sampled latency and returns a structured dict."""
+
+    def __init__(self, role: str, latency: LatencyModel):
+        self.role = role
+        self.model = f"fake-{role}"
+        self._latency = latency
+
+    def with_structured_output(self, *args, **kwargs) -> "FakeRoleModel":
+        return self
+
+    async def ainvoke(self, messages: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self._latency.sample())
+        return {"role": self.role, "answer": None}
+
+
+class FakeRoleLLM:
+    def __init__(self, model: FakeRoleModel):
+        self.model = model
+        self.chat_history: List[Dict[str, str]] = []
+
+
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    """Regex extraction over the latest scammer message (what the real agent would report)."""
+    latest = text.rsplit(LATEST_MARKER, 1)[-1]
+    links = URL_PATTERN.findall(latest)
+    without_links = URL_PATTERN.sub(" ", latest)
+    return {
+        "upi_ids": UPI_PATTERN.findall(without_links),
+        "phone_numbers": [m.group(0) for m in PHONE_PATTERN.finditer(without_links)],
+        "phishing_links": links,
+        "bank_accounts": [b.strip() for b in BANK_PATTERN.findall(without_links) if len(b.strip()) >= 12],
+    }
+
+
+class MockHoneypotAgent:
+    def __init__(self, role_latency_ms: float, tool_probability: float = 1.0, seed: Optional[int] = None,
+                 model_factory: Optional[Callable[[str], Any]] = None):
+        """model_factory(role) replaces the sleeping FakeRoleModel (e.g. with one calling a fake provider server)."""
+        self.name = "honeypot"
+        seeds = [None] * 3 if seed is None else [seed, seed + 1, seed + 2]
+        if model_factory is None:
+            latencies = dict(zip(("router", "evaluator", "reflector"), seeds))
+            model_factory = lambda role: FakeRoleModel(role, LatencyModel(role_latency_ms, seed=latencies[role]))
+        self.llm_router = FakeRoleLLM(model_factory("router"))
+        self.llm_evaluator = FakeRoleLLM(model_factory("evaluator"))
+        self.llm_reflector = FakeRoleLLM(model_factory("reflector"))
+        self.llm_planner = None
+        self._tool_probability = tool_probability
+        self._rng = random.Random(seed)
+        instrument_agent_roles(self)
+
+    async def initiate_agent(self, query: str, passed_from: Optional[str] = None) -> Dict[str, Any]:
+        await self.llm_router.model.ainvoke(query)
+        await self.llm_evaluator.model.ainvoke(query)
+
+        entities = extract_entities(query)
+        if any(entities.values()) and self._rng.random() < self._tool_probability:
+            await _call_scam_intel(suspicious_keywords=["urgent"], scam_score=90, **entities)
+
+        await self.llm_reflector.model.ainvoke(query)
+        return {"answer": self._rng.choice(REPLIES)}
+
+
+async def _call_scam_intel(**kwargs) -> Any:
+    """Invoke the real tool the way masai does: async tools awaited, sync tools in a worker thread."""
+    from app.controllers.Agents.Tools.scam_extraction_tools import asave_scam_intel
+    func = getattr(asave_scam_intel, "func", asave_scam_intel)
+    if inspect.iscoroutinefunction(func):
+        return await func(**kwargs)
+    return await asyncio.to_thread(func, **kwargs)
+
+
+def make_mock_factory(role_latency_ms: float, tool_probability: float = 1.0, seed: Optional[int] = None,
+                      model_factory: Optional[Callable[[str], Any]] = None):
+    """Agent factory for register_agent_factory("HONEYPOT", ...): one mock agent per manager."""
+    def factory(manager: Any) -> MockHoneypotAgent:
+        agents = manager.agents
+        agent = agents.get("honeypot")
+        if agent is None:
+            agent = MockHoneypotAgent(role_latency_ms, tool_probability, seed, model_factory)
+            agents["honeypot"] = agent
+        return agent
+    return factory
+
+
+__all__ = ["LatencyModel", "MockHoneypotAgent", "extract_entities", "make_mock_factory"]
@@ -0,0 +1,303 @@
+"""
+Offline load test / benchmark for the /analyze pipeline.
+
+Generates deterministic multi-turn scam sessions, drives the real FastAPI app
+(in process through an ASGI transport, or over a local uvicorn), replaces the
+LLM agent with a configurable-latency mock, and points callbacks at a local
+stub. Reports throughput, client latency and p50/p95/p99 per pipeline stage
+(from the app's own tracing spans), and can save/compare JSON results.
+
+With --cassette the provider calls are recorded to, or replayed from, an LLM
+cassette (app/controllers/Agents/utils/cassette.py). A replay never calls the
+provider, so a cassette recorded once against the real agent gives CI runs
+with the same prompts, answers and latency distribution (--latency-scale to
+stretch or shrink it) to --compare across code versions.
+
+Usage:
+    python scripts/loadtest/run.py --sessions 200 --concurrency 50 --role-latency-ms 300
+    python scripts/loadtest/run.py --cassette llm.jsonl.gz --cassette-mode record
+    python scripts/loadtest/run.py --cassette llm.jsonl.gz --output replay.json   # replay
+    python scripts/loadtest/run.py --mode uvicorn --output results.json
+    python scripts/loadtest/run.py --compare baseline.json   # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.loadtest.sessions import SyntheticSession, generate_sessions
+from scripts.loadtest.callback_stub import CallbackStub
+
+API_KEY = "loadtest-key"
+ANALYZE_PATH = "/api/v1/analyze"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_ms": (sum(ordered) / len(ordered) * 1e3) if ordered else float("nan"),
+        "p50_ms": percentile(ordered, 0.50) * 1e3,
+        "p95_ms": percentile(ordered, 0.95) * 1e3,
+        "p99_ms": percentile(ordered, 0.99) * 1e3,
+        "max_ms": (ordered[-1] * 1e3) if ordered else float("nan"),
+    }
+
+
+async def drive_session(client, session: SyntheticSession, latencies: List[float], statuses: Dict[str, int]) -> None:
+    history: List[Dict[str, Any]] = []
+    for turn, text in enumerate(session.messages):
+        message = {"sender": "scammer", "text": text, "timestamp": 1769000000000 + turn * 1000}
+        body = {
+            "sessionId": session.session_id,
+            "message": message,
+            "conversationHistory": history,
+            "metadata": {"channel": "SMS", "language": "English", "locale": "IN"},
+        }
+        start = time.perf_counter()
+        try:
+            response = await client.post(ANALYZE_PATH, json=body, headers={"x-api-key": API_KEY})
+            latencies.append(time.perf_counter() - start)
+            data = response.json() if response.status_code == 200 else {}
+            status = data.get("status", f"http_{response.status_code}")
+        except Exception as e:
+            latencies.append(time.perf_counter() - start)
+            status = f"exception:{type(e).__name__}"
+            data = {}
+        statuses[status] += 1
+        history = history + [message, {"sender": "user", "text": data.get("reply", ""), "timestamp": message["timestamp"] + 500}]
+
+
+async def drive(client, sessions: List[SyntheticSession], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = defaultdict(int)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(session: SyntheticSession) -> None:
+        async with semaphore:
+            await drive_session(client, session, latencies, statuses)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(s) for s in sessions))
+    elapsed = time.perf_counter() - start
+    return {"elapsed_s": elapsed, "latencies": latencies, "statuses": dict(statuses)}
+
+
+async def run_inprocess(args, sessions: List[SyntheticSession]) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+
+    register_agent_factory("HONEYPOT", make_mock_factory(args.role_latency_ms, args.tool_probability, args.seed))
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            raw = await drive(client, sessions, args.concurrency)
+    if args.cassette:
+        # Replay misses / role fallbacks mean the prompts drifted from the recording
+        from app.controllers.Agents.utils.cassette import CASSETTE_CALLS
+        raw["cassette_calls"] = {values[0]: int(child.value) for values, child in CASSETTE_CALLS._children.items()}
+    return raw
+
+
+async def run_uvicorn(args, sessions: List[SyntheticSession], env: Dict[str, str]) -> Dict[str, Any]:
+    import httpx
+    cmd = [
+        sys.executable, os.path.join(ROOT, "scripts", "loadtest", "serve.py"),
+        "--port", str(args.port),
+        "--role-latency-ms", str(args.role_latency_ms),
+        "--tool-probability", str(args.tool_probability),
+        "--seed", str(args.seed),
+    ]
+    server = subprocess.Popen(cmd, env=env, cwd=ROOT)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn server did not become ready")
+                await asyncio.sleep(0.1)
+            return await drive(client, sessions, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def stage_stats(trace_path: str) -> Dict[str, Dict[str, float]]:
+    from scripts.trace_report import load_traces
+    if not os.path.exists(trace_path):
+        return {}
+    durations: Dict[str, List[float]] = defaultdict(list)
+    for spans in load_traces(trace_path).values():
+        for span in spans:
+            durations[span["name"]].append((span["end"] - span["start"]) / 1e9)
+    return {name: summarize(values) for name, values in sorted(durations.items())}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return human-readable regressions (higher latency / lower throughput beyond threshold)."""
+    regressions = []
+    base_tp, cur_tp = baseline["throughput_turns_per_s"], current["throughput_turns_per_s"]
+    print(f"\n=== comparison vs {baseline['meta']['revision']} (threshold {threshold:.0%})")
+    print(f"{'throughput (turns/s)':<36} {base_tp:>10.1f} -> {cur_tp:>10.1f}")
+    if cur_tp < base_tp * (1 - threshold):
+        regressions.append(f"throughput dropped {base_tp:.1f} -> {cur_tp:.1f}")
+    rows = [("client", baseline["client_latency"], current["client_latency"])]
+    rows += [(name, baseline["stages"][name], stats) for name, stats in current["stages"].items() if name in baseline["stages"]]
+    for name, base, cur in rows:
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            b, c = base[key], cur[key]
+            flag = ""
+            # Ignore sub-millisecond noise
+            if c > b * (1 + threshold) and c - b > 1.0:
+                flag = "  REGRESSION"
+                regressions.append(f"{name} {key} {b:.2f} -> {c:.2f} ms")
+            print(f"{name + ' ' + key:<36} {b:>10.2f} -> {c:>10.2f}{flag}")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\nrevision {result['meta']['revision']}  mode={result['meta']['mode']}  "
+          f"sessions={result['meta']['sessions']}  turns={result['turns']}  concurrency={result['meta']['concurrency']}")
+    print(f"elapsed {result['elapsed_s']:.2f}s  throughput {result['throughput_turns_per_s']:.1f} turns/s  "
+          f"statuses {result['statuses']}  callbacks received {result['callbacks_received']}")
+    if result.get("cassette_calls"):
+        print(f"cassette {result['meta']['cassette']}: {result['cassette_calls']}")
+    header = f"{'stage':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = [("client (end-to-end)", result["client_latency"])] + list(result["stages"].items())
+    for name, stats in rows:
+        print(f"{name:<28} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--benign-ratio", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=50, help="sessions in flight at once")
+    parser.add_argument("--role-latency-ms", type=float, default=300.0, help="mean simulated latency per agent role call")
+    parser.add_argument("--tool-probability", type=float, default=1.0)
+    parser.add_argument("--callback-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=1992)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cassette", help="LLM cassette file (see module docstring)")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="replay: multiply recorded provider latencies")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative regression threshold")
+    args = parser.parse_args()
+
+    sessions = generate_sessions(args.sessions, turns=args.turns, benign_ratio=args.benign_ratio, seed=args.seed)
+    stub = CallbackStub(latency_ms=args.callback_latency_ms).start()
+    trace_file = tempfile.NamedTemporaryFile(prefix="loadtest-traces-", suffix=".jsonl", delete=False)
+    trace_file.close()
+
+    # Configure the app through its environment before it is imported
+    env_overrides = {
+        "API_KEY": API_KEY,
+        # A session's turns are replayed back to back, far faster than its 1/s bucket allows;
+        # measure the agent path, not 429s (the per-key limit is off by default)
+        "RATE_LIMIT_ENABLED": "false",
+        "GUVI_CALLBACK_URL": stub.url,
+        "TRACING_ENABLED": "true",
+        "TRACE_EXPORT_PATH": trace_file.name,
+        "TRACE_SAMPLE_RATE": "1.0",
+        "TRACE_SLOW_SECONDS": "0",
+    }
+    if args.cassette:
+        env_overrides.update({
+            "LLM_CASSETTE_MODE": args.cassette_mode,
+            "LLM_CASSETTE_PATH": args.cassette,
+            "LLM_CASSETTE_LATENCY_SCALE": str(args.latency_scale),
+        })
+    os.environ.update(env_overrides)
+    try:
+        if args.mode == "inprocess":
+            raw = asyncio.run(run_inprocess(args, sessions))
+        else:
+            raw = asyncio.run(run_uvicorn(args, sessions, dict(os.environ)))
+        stages = stage_stats(trace_file.name)
+    finally:
+        stub.stop()
+        os.unlink(trace_file.name)
+
+    turns = len(raw["latencies"])
+    result = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mode": args.mode,
+            "sessions": args.sessions,
+            "turns_per_session": args.turns,
+            "concurrency": args.concurrency,
+            "role_latency_ms": args.role_latency_ms,
+            "callback_latency_ms": args.callback_latency_ms,
+            "seed": args.seed,
+            "cassette": args.cassette and f"{args.cassette_mode} {args.cassette} x{args.latency_scale}",
+        },
+        "turns": turns,
+        "elapsed_s": raw["elapsed_s"],
+        "throughput_turns_per_s": turns / raw["elapsed_s"] if raw["elapsed_s"] else 0.0,
+        "statuses": raw["statuses"],
+        "callbacks_received": stub.received,
+        "cassette_calls": raw.get("cassette_calls"),
+        "client_latency": summarize(raw["latencies"]),
+        "stages": stages,
+    }
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
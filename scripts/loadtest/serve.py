@@ -0,0 +1,35 @@
+"""
+Run the real FastAPI app under uvicorn with the mock HONEYPOT agent installed.
+
+Started by scripts/loadtest/run.py in --mode uvicorn; can also be run by hand:
+    python scripts/loadtest/serve.py --port 8765 --role-latency-ms 300
+Callback URL and trace export are configured through the environment
+(GUVI_CALLBACK_URL, TRACE_EXPORT_PATH, TRACE_SAMPLE_RATE) before the app imports.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--role-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tool-probability", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    from app.main import app
+    from app.controllers.Agents.register import register_agent_factory
+    from scripts.loadtest.mock_agent import make_mock_factory
+
+    register_agent_factory("HONEYPOT", make_mock_factory(args.role_latency_ms, args.tool_probability, args.seed))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Synthetic multi-turn scam (and benign) sessions for load testing.
+
+Sessions follow the patterns in docs/problem_statement: an opening hook
+(account block, KYC, digital arrest, lottery, job offer, electricity bill),
+escalating pressure, then gradual disclosure of payment entities (UPI IDs,
+phone numbers, phishing links, bank accounts). Entities are drawn from a small
+shared pool so campaigns repeat across sessions, like real traffic.
+Generation is seeded and fully deterministic.
+"""
+from dataclasses import dataclass, field
+from typing import List
+import random
+
+SCENARIOS = {
+    "bank_block": {
+        "opening": [
+            "URGENT: Your SBI account will be blocked today due to pending KYC. Reply immediately.",
+            "Dear customer, your bank account is suspended. Verify now to avoid permanent block.",
+        ],
+        "pressure": [
+            "This is final warning. Account will be frozen in 2 hours.",
+            "Sir please cooperate, otherwise all your money will be locked by RBI.",
+            "Why you are delaying? Share OTP received on your mobile to verify.",
+        ],
+    },
+    "digital_arrest": {
+        "opening": [
+            "This is Officer Sharma from Mumbai Cyber Police. A parcel with drugs is booked in your name.",
+            "CBI notice: your Aadhaar is linked to money laundering case. Stay on line.",
+        ],
+        "pressure": [
+            "You are under digital arrest. Do not disconnect or tell anyone.",
+            "To clear your name you must deposit security amount for verification.",
+            "Government department will issue arrest warrant in 1 hour if you do not pay.",
+        ],
+    },
+    "lottery": {
+        "opening": [
+            "Congratulations! You have won Rs 25,00,000 in KBC lucky draw.",
+            "Your number is selected for Jio anniversary prize of 10 lakh rupees.",
+        ],
+        "pressure": [
+            "Pay processing fee today itself to release the prize amount.",
+            "Offer expires at midnight, transfer the tax amount immediately.",
+        ],
+    },
+    "job_offer": {
+        "opening": [
+            "Hi, we have part time work from home job. Earn 5000 daily by liking videos.",
+            "Amazon hiring for online task job, salary 30k per month, interested?",
+        ],
+        "pressure": [
+            "Complete first task and deposit 2000 to unlock higher commission.",
+            "Your account shows negative balance, send payment to withdraw earnings.",
+        ],
+    },
+    "electricity": {
+        "opening": [
+            "Dear consumer your electricity connection will be disconnected tonight at 9.30 pm.",
+            "Electricity bill not updated. Power will be cut today. Contact officer immediately.",
+        ],
+        "pressure": [
+            "Pay the pending bill now to avoid disconnection.",
+            "Update your consumer details urgently, last reminder.",
+        ],
+    },
+}
+
+BENIGN_MESSAGES = [
+    "Hello, how are you?",
+    "Are we still meeting for lunch tomorrow?",
+    "Happy birthday! Have a great day.",
+    "Can you send me the notes from yesterday's class?",
+    "Thanks for your help with the move last week.",
+    "What time does the match start tonight?",
+]
+
+UPI_POOL = ["scammer.fraud@fakebank", "kyc.verify@ybl", "refund.desk@paytm", "rbi.helpdesk@okaxis", "prize.release@upi"]
+PHONE_POOL = ["+91-9876543210", "+91 8765432109", "7654321098", "+919123456780"]
+LINK_POOL = ["http://sbi-kyc-update.xyz/verify", "https://secure-rbi-refund.in/claim", "http://bit.ly/3kycnow", "https://jio-prize.co/win"]
+BANK_POOL = ["1234 5678 9012 3456", "5012-3456-7890", "9876543210123456"]
+
+DISCLOSURE_TEMPLATES = [
+    ("upi", "Send the amount to UPI ID {value} right now."),
+    ("phone", "Call our officer on {value} for verification."),
+    ("link", "Click this link and fill your details: {value}"),
+    ("bank", "Transfer to account number {value}, IFSC SBIN0001234."),
+]
+
+
+@dataclass
+class SyntheticSession:
+    session_id: str
+    scenario: str
+    messages: List[str] = field(default_factory=list)
+    is_scam: bool = True
+
+
+def generate_sessions(count: int, turns: int = 8, benign_ratio: float = 0.1, seed: int = 1992) -> List[SyntheticSession]:
+    """Generate `count` sessions with up to `turns` scammer messages each."""
+    rng = random.Random(seed)
+    pools = {"upi": UPI_POOL, "phone": PHONE_POOL, "link": LINK_POOL, "bank": BANK_POOL}
+    sessions = []
+    for i in range(count):
+        session_id = f"load-{seed}-{i:06d}"
+        if rng.random() < benign_ratio:
+            msgs = rng.sample(BENIGN_MESSAGES, k=min(len(BENIGN_MESSAGES), max(1, turns // 3)))
+            sessions.append(SyntheticSession(session_id, "benign", msgs, is_scam=False))
+            continue
+        scenario = rng.choice(list(SCENARIOS))
+        spec = SCENARIOS[scenario]
+        msgs = [rng.choice(spec["opening"])]
+        disclosures = rng.sample(DISCLOSURE_TEMPLATES, k=rng.randint(1, len(DISCLOSURE_TEMPLATES)))
+        while len(msgs) < turns:
+            # Roughly half of the later turns disclose an entity, the rest apply pressure
+            if disclosures and (len(msgs) >= 2 and rng.random() < 0.5):
+                kind, template = disclosures.pop()
+                msgs.append(template.format(value=rng.choice(pools[kind])))
+            else:
+                msgs.append(rng.choice(spec["pressure"]))
+        sessions.append(SyntheticSession(session_id, scenario, msgs, is_scam=True))
+    return sessions
+
+
+__all__ = ["SyntheticSession", "generate_sessions"]
@@ -0,0 +1,160 @@
+"""
+Replay synthetic sessions through the real save_scam_intel tool and count the
+GUVI callbacks each callback policy would post (app/core/session_intel_store.py).
+
+Every scammer turn the simulated LLM reports the entities of the latest
+message, re-reports each previously seen entity with probability --rereport
+(the redundant calls the dedup targets), and the suspicious keywords that
+appear in the message.
+Turns are --turn-gap simulated seconds apart; when a session ends it is
+removed from the intel store, which triggers the final flush.
+
+Callbacks are captured at the POST boundary (_post_callback), so the replay
+runs without a network. For each session the last captured payload is
+compared with the payload built from its final intel; a mismatch means the
+platform was left with a stale final result.
+
+Policies:
+  legacy          post on every qualifying tool call, no final flush
+  dedup           post only when content changed, final flush on session end
+  dedup+interval  dedup plus --min-interval seconds between posts
+
+Every policy runs the current tool, which returns early on reports with
+nothing new (counted in the "redundant" column). Legacy therefore posts only
+on calls that changed the record and, having no final flush, leaves stale
+final results; "fewer" compares with one post per tool call, the original
+behaviour.
+
+Usage:
+    python scripts/replay_callbacks.py [--sessions 1000] [--turns 8] [--rereport 0.6] [--turn-gap 6]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.controllers.Agents.Tools.scam_extraction_tools import save_scam_intel
+from app.core import metrics
+from app.core import session_intel_store as store
+from app.core.callback_dispatcher import BatchedDispatcher
+from app.core.execution_context import RequestContext, session_context
+from scripts.loadtest.mock_agent import extract_entities
+from scripts.loadtest.sessions import generate_sessions
+
+KEYWORDS = ["urgent", "otp", "blocked", "kyc", "verify", "account", "police", "refund"]
+FIELDS = ("upi_ids", "phone_numbers", "phishing_links", "bank_accounts")
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Recorder:
+    """Stands in for the HTTP POST; keeps the last payload per session."""
+
+    def __init__(self):
+        self.posts = 0
+        self.last: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, session_id: str, payload: Dict[str, Any]) -> bool:
+        with self._lock:
+            self.posts += 1
+            self.last[session_id] = payload
+        return True
+
+    async def apost(self, session_id: str, payload: Dict[str, Any]) -> bool:
+        return self(session_id, payload)
+
+
+def replay(sessions, args, dedup: bool, min_interval: float, final_flush: bool) -> Dict[str, float]:
+    rng = random.Random(args.seed)
+    clock, recorder = SimClock(), Recorder()
+    store._clock = clock
+    store._post_callback = recorder
+    store._apost_callback = recorder.apost
+    store.CALLBACK_DEDUP_ENABLED = dedup
+    store.CALLBACK_MIN_INTERVAL_SECONDS = min_interval
+    store.CALLBACK_FINAL_FLUSH_ENABLED = final_flush
+    store._FINAL_CALLBACKS = BatchedDispatcher("replay", store.aflush_session_callback)
+    tool = getattr(save_scam_intel, "func", save_scam_intel)
+
+    tool_calls = 0
+    redundant = metrics.INTEL_TOOL_CALLS.labels("redundant").value
+    final_intel: Dict[str, Dict[str, Any]] = {}
+    for s in sessions:
+        seen: Dict[str, List[str]] = {field: [] for field in FIELDS}
+        for turn, text in enumerate(s.messages):
+            clock.now += args.turn_gap
+            new = extract_entities(text)
+            report = {field: list(new[field]) for field in FIELDS}
+            for field in FIELDS:
+                report[field] += [v for v in seen[field] if v not in new[field] and rng.random() < args.rereport]
+                seen[field] += [v for v in new[field] if v not in seen[field]]
+            if not any(report.values()):
+                continue
+            token = session_context.set(RequestContext(session_id=s.session_id, message_count=2 * turn + 1))
+            try:
+                keywords = [k for k in KEYWORDS if k in text.lower()] or ["urgent"]
+                tool(suspicious_keywords=keywords, scam_score=90, **report)
+            finally:
+                session_context.reset(token)
+            tool_calls += 1
+        intel = store._SESSION_INTEL_STORE.get(s.session_id)
+        if intel is not None:
+            if store.should_send_callback(intel):
+                final_intel[s.session_id] = store.build_callback_payload(s.session_id, intel)
+            store._SESSION_INTEL_STORE.delete(s.session_id)
+    store._FINAL_CALLBACKS.close()
+
+    stale = 0
+    for session_id, expected in final_intel.items():
+        sent = recorder.last.get(session_id)
+        stale += sent is None or store.callback_fingerprints(sent)[1] != store.callback_fingerprints(expected)[1]
+    redundant = metrics.INTEL_TOOL_CALLS.labels("redundant").value - redundant
+    return {"tool_calls": tool_calls, "redundant": redundant, "posts": recorder.posts, "stale": stale,
+            "sessions": len(final_intel)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--rereport", type=float, default=0.6, help="chance the LLM re-reports an already saved entity")
+    parser.add_argument("--turn-gap", type=float, default=6.0, help="simulated seconds between scammer turns")
+    parser.add_argument("--min-interval", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=1992)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    sessions = generate_sessions(args.sessions, turns=args.turns, benign_ratio=0.0, seed=args.seed)
+    policies = [
+        ("legacy", False, 0.0, False),
+        ("dedup", True, 0.0, True),
+        ("dedup+interval", True, args.min_interval, True),
+    ]
+    print(f"{args.sessions} sessions x {args.turns} turns, re-report {args.rereport:.0%}, "
+          f"turn gap {args.turn_gap:.0f}s, min interval {args.min_interval:.0f}s\n")
+    header = f"{'policy':<16} {'tool calls':>11} {'redundant':>10} {'callbacks':>10} {'per session':>12} {'stale final':>12}"
+    print(header)
+    print("-" * len(header))
+    baseline = None
+    for label, dedup, interval, final_flush in policies:
+        r = replay(sessions, args, dedup, interval, final_flush)
+        baseline = baseline or r["tool_calls"]
+        print(f"{label:<16} {r['tool_calls']:>11} {r['redundant']:>10.0f} {r['posts']:>10} {r['posts'] / r['sessions']:>12.2f} "
+              f"{r['stale']:>12}   {1 - r['posts'] / baseline:>6.1%} fewer")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
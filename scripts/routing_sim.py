@@ -0,0 +1,221 @@
+"""
+Offline simulator for per-role model routing (app/controllers/Agents/utils/model_router.py).
+
+Fake providers stand in for the model tiers in model_config.json's "routing"
+section: each model has a lognormal latency, a relative quality score and an
+error rate, and one model can be degraded (latency multiplied) for a window of
+the run to exercise fallbacks. Sessions run turns of router -> evaluator ->
+reflector (-> planner) calls through the real RoleModelProxy + ModelRouter,
+under the same per-turn deadline as /analyze. Wall-clock time is scaled down
+by --time-scale; all reported times are unscaled.
+
+Policies compared:
+  static-<tier>  every role always on one tier (what model_config "all" does)
+  routed         the routing section as configured (also when "enabled": false)
+
+Usage:
+    python scripts/routing_sim.py [--sessions 200] [--turns 8] [--degrade balanced:4.0]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from app.controllers.Agents.utils.model_router import (
+    ModelRouter, ModelTier, RoutingConfig, load_routing_config, register_model_factory,
+)
+from app.controllers.Agents.utils.provider_proxy import RoleModelProxy
+from app.core.execution_context import RequestContext, session_context
+
+# Real-world shape per model: mean latency (ms), lognormal sigma, quality (0-1), error rate
+DEFAULT_PROFILES = {
+    "gemini-2.5-flash-lite": {"mean_ms": 1200.0, "sigma": 0.45, "quality": 0.70, "error_rate": 0.005},
+    "gemini-2.5-flash": {"mean_ms": 3200.0, "sigma": 0.55, "quality": 0.85, "error_rate": 0.01},
+}
+TURN_DEADLINE_S = 25.0  # routes.AGENT_TIMEOUT_SECONDS
+
+
+class SimState:
+    """Shared clock-independent knobs: which model is degraded and when."""
+
+    def __init__(self, total_turns: int, degrade_model: Optional[str], factor: float, window=(0.3, 0.6)):
+        self.total_turns = total_turns
+        self.turns_started = 0
+        self.degrade_model = degrade_model
+        self.factor = factor
+        self.window = window
+
+    def multiplier(self, model_name: str) -> float:
+        if model_name != self.degrade_model:
+            return 1.0
+        progress = self.turns_started / max(1, self.total_turns)
+        return self.factor if self.window[0] <= progress < self.window[1] else 1.0
+
+
+class FakeChatModel:
+    """Provider stand-in; sleeps scaled latency, occasionally raises, records what served the call."""
+
+    def __init__(self, model_name: str, profile: Dict[str, float], state: SimState, scale: float, rng: random.Random):
+        self.model = model_name
+        self.profile = profile
+        self.state = state
+        self.scale = scale
+        self.rng = rng
+
+    def with_structured_output(self, *args, **kwargs) -> "FakeChatModel":
+        return self
+
+    async def ainvoke(self, messages):
+        p = self.profile
+        mu = -(p["sigma"] ** 2) / 2
+        latency_ms = p["mean_ms"] * self.rng.lognormvariate(mu, p["sigma"]) * self.state.multiplier(self.model)
+        await asyncio.sleep(latency_ms / 1000.0 * self.scale)
+        if self.rng.random() < p["error_rate"]:
+            raise RuntimeError(f"{self.model}: 503 overloaded")
+        return {"model": self.model, "quality": p["quality"]}
+
+
+def scaled_config(config: RoutingConfig, scale: float) -> RoutingConfig:
+    tiers = {
+        name: ModelTier(name, t.model_name, "fake", t.latency_budget_ms * scale, t.cost)
+        for name, t in config.tiers.items()
+    }
+    return RoutingConfig(
+        tiers, config.roles, config.stages, enabled=True,
+        reserve_ms=config.reserve_ms * scale, timeout_factor=config.timeout_factor,
+        slow_factor=config.slow_factor, cooldown_seconds=config.cooldown_seconds * scale,
+        failure_threshold=config.failure_threshold, ewma_alpha=config.ewma_alpha,
+    )
+
+
+async def run_policy(name: str, config: RoutingConfig, static_tier: Optional[str], args) -> Dict[str, float]:
+    rng = random.Random(args.seed)
+    total_turns = args.sessions * args.turns
+    degrade_model = None
+    if args.degrade:
+        tier_name, factor = args.degrade.split(":")
+        degrade_model = config.tiers[tier_name].model_name
+        state = SimState(total_turns, degrade_model, float(factor))
+    else:
+        state = SimState(total_turns, None, 1.0)
+
+    models: Dict[str, FakeChatModel] = {
+        t.model_name: FakeChatModel(t.model_name, DEFAULT_PROFILES.get(t.model_name, DEFAULT_PROFILES["gemini-2.5-flash-lite"]),
+                                    state, args.time_scale, rng)
+        for t in config.tiers.values()
+    }
+    register_model_factory("fake", lambda tier, base: models[tier.model_name])
+
+    router = None
+    if static_tier is None:
+        router = ModelRouter(config)
+        base_model = models[config.tiers[next(iter(config.tiers))].model_name]
+    else:
+        base_model = models[config.tiers[static_tier].model_name]
+
+    turn_latency: List[float] = []
+    qualities: List[float] = []
+    costs: List[float] = []
+    misses = errors = 0
+    tier_calls: Dict[str, int] = defaultdict(int)
+    cost_by_model = {t.model_name: t.cost for t in config.tiers.values()}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def turn(proxies: Dict[str, RoleModelProxy], message_count: int) -> None:
+        nonlocal misses, errors
+        deadline = time.monotonic() + TURN_DEADLINE_S * args.time_scale
+        token = session_context.set(RequestContext(message_count=message_count, deadline=deadline))
+        start = time.monotonic()
+        served = []
+        try:
+            roles = ["router", "evaluator", "reflector"] + (["planner"] if rng.random() < args.planner_rate else [])
+
+            async def calls():
+                for role in roles:
+                    served.append(await proxies[role].ainvoke([{"role": "user", "content": "..."}]))
+
+            await asyncio.wait_for(calls(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            misses += 1
+        except Exception:
+            errors += 1
+        finally:
+            session_context.reset(token)
+        turn_latency.append((time.monotonic() - start) / args.time_scale)
+        for result in served:
+            tier_calls[result["model"]] += 1
+        if served:
+            qualities.append(sum(r["quality"] for r in served) / len(served))
+            costs.append(sum(cost_by_model[r["model"]] for r in served))
+
+    async def session() -> None:
+        async with semaphore:
+            proxies = {role: RoleModelProxy(role, base_model, router=router)
+                       for role in ("router", "evaluator", "reflector", "planner")}
+            for t in range(args.turns):
+                state.turns_started += 1
+                await turn(proxies, message_count=2 * t + 1)
+
+    wall = time.monotonic()
+    await asyncio.gather(*(session() for _ in range(args.sessions)))
+    wall = time.monotonic() - wall
+
+    ordered = sorted(turn_latency)
+    q = lambda f: ordered[min(len(ordered) - 1, int(f * len(ordered)))] * 1000
+    calls = sum(tier_calls.values()) or 1
+    return {
+        "policy": name,
+        "p50": q(0.50), "p95": q(0.95), "p99": q(0.99),
+        "miss": misses / len(ordered), "errors": errors / len(ordered),
+        "quality": sum(qualities) / max(1, len(qualities)),
+        "cost": sum(costs) / max(1, len(costs)),
+        "mix": {m: c / calls for m, c in tier_calls.items()},
+        "wall": wall,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(ROOT, "model_config", "model_config.json"))
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--planner-rate", type=float, default=0.3, help="share of turns that also call the planner")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="wall seconds per simulated second")
+    parser.add_argument("--degrade", default="balanced:4.0", help="tier:factor slowed down for 30-60%% of the run ('' for none)")
+    parser.add_argument("--seed", type=int, default=1992)
+    args = parser.parse_args()
+    # Per-call fallback warnings would drown the report
+    logging.disable(logging.WARNING)
+
+    # Simulated whether or not the app has routing enabled
+    config = load_routing_config(args.config, enabled_only=False)
+    if config is None:
+        print(f"no routing section in {args.config}")
+        return 1
+    config = scaled_config(config, args.time_scale)
+
+    policies = [(f"static-{tier}", tier) for tier in config.tiers] + [("routed", None)]
+    print(f"{args.sessions} sessions x {args.turns} turns, concurrency {args.concurrency}, "
+          f"deadline {TURN_DEADLINE_S:.0f}s, degrade {args.degrade or 'none'}\n")
+    header = f"{'policy':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'miss':>6} {'errors':>7} {'quality':>8} {'cost/turn':>10}  model mix"
+    print(header)
+    print("-" * (len(header) + 20))
+    for name, static_tier in policies:
+        r = asyncio.run(run_policy(name, config, static_tier, args))
+        mix = ", ".join(f"{m} {share:.0%}" for m, share in sorted(r["mix"].items()))
+        print(f"{r['policy']:<18} {r['p50']:>8.0f} {r['p95']:>8.0f} {r['p99']:>8.0f} {r['miss']:>6.1%} {r['errors']:>7.1%} "
+              f"{r['quality']:>8.3f} {r['cost']:>10.2f}  {mix}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
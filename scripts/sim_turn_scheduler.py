@@ -0,0 +1,211 @@
+"""
+Discrete-event simulator for the agent turn scheduler (app/core/turn_scheduler.py)
+under LLM overload.
+
+Sessions arrive as a Poisson process. A scam session is confirmed
+(scam_detected) after a few turns and then reveals one of the entity types
+the scammer holds (UPI, phone, bank, link) with some probability per turn;
+benign sessions never yield intel. Each turn holds one of --capacity LLM
+slots for a lognormal service time. The scammer answers after an
+exponential think time and gives up after a geometric number of turns, or
+earlier when a reply is slow: after a reply that took L seconds (queue wait
+plus service, or the deadline for a fallback reply) they leave with
+probability 1 - exp(-L / --tolerance-s). Fallback replies make no progress.
+
+The real TurnQueue, turn_priority() and starvation flag run on simulated
+time with these policies:
+
+  fifo              arrival order (every turn has the same value)
+  priority          turn_priority() ranking, no starvation protection
+  priority+session  ranking plus the per-session starvation flag (the service default)
+  priority+aging    ranking, flag, and --aging per second waited (hard bound 1 / aging)
+
+Reported per policy, averaged over --seeds runs and measured while sessions
+arrive (the drain afterwards is excluded): entities extracted, LLM-seconds
+used, entities per LLM-minute (and the change against fifo), turns that
+expired in the queue, the longest run of consecutive fallback replies any
+session got, and queue wait p50/p99 for confirmed-scam and unconfirmed turns.
+
+Usage:
+    python scripts/sim_turn_scheduler.py [--capacity 16] [--arrival-rate 3] [--duration 900] [--seeds 4]
+"""
+import argparse
+import heapq
+import itertools
+import math
+import os
+import random
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.turn_scheduler import ENTITY_FIELDS, STARVED_FLAG, TurnQueue, turn_priority
+
+POLICIES = ("fifo", "priority", "priority+session", "priority+aging")
+
+
+class Session:
+    __slots__ = ("sid", "is_scam", "detect_turn", "held", "patience", "turns", "fallbacks", "intel")
+
+    def __init__(self, sid: int, rng: random.Random, args):
+        self.sid = sid
+        self.is_scam = rng.random() < args.scam_ratio
+        self.detect_turn = rng.randint(2, 4)
+        held = [field for field in ENTITY_FIELDS if rng.random() < 0.6]
+        self.held = held or [rng.choice(ENTITY_FIELDS)]
+        mean = args.scam_turns if self.is_scam else args.benign_turns
+        self.patience = 1 + int(rng.expovariate(1.0 / (mean - 1)))
+        self.turns = 0
+        self.fallbacks = 0  # consecutive
+        self.intel: Dict = {field: [] for field in ENTITY_FIELDS}
+        self.intel["scam_detected"] = False
+
+
+class Turn:
+    __slots__ = ("session", "arrived", "deadline", "confirmed", "waiter", "started")
+
+    def __init__(self, session: Session, now: float, timeout: float):
+        self.session = session
+        self.arrived = now
+        self.deadline = now + timeout
+        self.confirmed = bool(session.intel["scam_detected"])
+        self.waiter = None
+        self.started = False
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def simulate(args, policy: str, seed: int) -> Dict:
+    rng = random.Random(seed)
+    service_rng = random.Random(seed + 1)
+    queue = TurnQueue(aging=args.aging if policy == "priority+aging" else 0.0)
+    protect = policy in ("priority+session", "priority+aging")
+    events: list = []
+    seq = itertools.count()
+    active = 0
+    llm_seconds = 0.0
+    entities = expired = worst_run = 0
+    waits = {"confirmed": [], "unconfirmed": []}
+    sigma = 0.5
+    mu = math.log(args.service_s) - sigma * sigma / 2
+
+    def schedule(at: float, kind: str, payload) -> None:
+        heapq.heappush(events, (at, next(seq), kind, payload))
+
+    def start(turn: Turn, now: float) -> None:
+        nonlocal active, llm_seconds
+        turn.started = True
+        active += 1
+        if protect:
+            turn.session.intel.pop(STARVED_FLAG, None)
+        duration = service_rng.lognormvariate(mu, sigma)
+        llm_seconds += max(0.0, min(now + duration, args.duration) - now)  # within the measured window
+        if now <= args.duration:
+            waits["confirmed" if turn.confirmed else "unconfirmed"].append(now - turn.arrived)
+        schedule(now + duration, "done", turn)
+
+    def next_message(session: Session, now: float, latency: float) -> None:
+        if session.turns >= session.patience or rng.random() < 1.0 - math.exp(-latency / args.tolerance_s):
+            return
+        schedule(now + rng.expovariate(1.0 / args.think_s), "message", session)
+
+    t = 0.0
+    sid = itertools.count()
+    while t < args.duration:
+        t += rng.expovariate(args.arrival_rate)
+        schedule(t, "message", Session(next(sid), rng, args))
+
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == "message":
+            turn = Turn(payload, now, args.timeout)
+            value = 0.0 if policy == "fifo" else turn_priority(payload.intel, 2 * payload.turns + 1)
+            if active < args.capacity and not queue:
+                start(turn, now)
+            else:
+                turn.waiter = queue.push(turn, value, now, turn.deadline)
+                schedule(turn.deadline, "deadline", turn)
+        elif kind == "deadline":
+            turn = payload
+            if not turn.started:
+                queue.cancel(turn.waiter)
+                session = turn.session
+                expired += now <= args.duration
+                session.turns += 1
+                session.fallbacks += 1
+                worst_run = max(worst_run, session.fallbacks)
+                if protect:
+                    session.intel[STARVED_FLAG] = True
+                next_message(session, now, now - turn.arrived)
+        else:  # done
+            turn = payload
+            session = turn.session
+            session.turns += 1
+            session.fallbacks = 0
+            if session.is_scam:
+                if session.turns >= session.detect_turn:
+                    session.intel["scam_detected"] = True
+                missing = [field for field in session.held if not session.intel[field]]
+                if session.intel["scam_detected"] and missing and rng.random() < args.reveal_p:
+                    session.intel[rng.choice(missing)].append(f"entity-{session.sid}")
+                    entities += now <= args.duration
+            next_message(session, now, now - turn.arrived)
+            active -= 1
+            waiter = queue.pop()
+            if waiter is not None:
+                start(waiter.item, now)
+
+    return {"entities": entities, "llm_seconds": llm_seconds, "expired": expired,
+            "worst_run": worst_run, "waits": waits}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=16, help="concurrent LLM turns")
+    parser.add_argument("--arrival-rate", type=float, default=3.0, help="new sessions per second")
+    parser.add_argument("--duration", type=float, default=900.0, help="seconds of arrivals (the measured window)")
+    parser.add_argument("--service-s", type=float, default=2.0, help="mean LLM seconds per turn")
+    parser.add_argument("--think-s", type=float, default=5.0, help="mean scammer think time")
+    parser.add_argument("--timeout", type=float, default=25.0, help="turn deadline (AGENT_TIMEOUT_SECONDS)")
+    parser.add_argument("--tolerance-s", type=float, default=60.0, help="scale of the scammers' tolerance for slow replies")
+    parser.add_argument("--aging", type=float, default=0.05, help="for the priority+aging policy")
+    parser.add_argument("--scam-ratio", type=float, default=0.7)
+    parser.add_argument("--scam-turns", type=float, default=12.0, help="mean scammer patience in turns")
+    parser.add_argument("--benign-turns", type=float, default=4.0)
+    parser.add_argument("--reveal-p", type=float, default=0.35, help="chance a confirmed turn reveals a missing entity")
+    parser.add_argument("--seeds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    offered = args.arrival_rate * (args.scam_ratio * args.scam_turns + (1 - args.scam_ratio) * args.benign_turns) * args.service_s
+    print(f"capacity {args.capacity} LLM slots, offered load ~{offered / args.capacity:.1f}x capacity "
+          f"({args.arrival_rate}/s sessions for {args.duration:.0f}s), {args.seeds} seeds\n")
+    header = (f"{'policy':<17} {'entities':>9} {'LLM s':>8} {'ent/LLM-min':>13} {'expired':>8} {'fallback run':>13}  "
+              f"{'wait p50/p99 s: confirmed':>26} {'unconfirmed':>12}")
+    print(header)
+    print("-" * len(header))
+    baseline = None
+    for policy in POLICIES:
+        runs = [simulate(args, policy, args.seed + i) for i in range(args.seeds)]
+        entities = sum(r["entities"] for r in runs) / len(runs)
+        llm = sum(r["llm_seconds"] for r in runs) / len(runs)
+        expired = sum(r["expired"] for r in runs) / len(runs)
+        confirmed = [w for r in runs for w in r["waits"]["confirmed"]]
+        unconfirmed = [w for r in runs for w in r["waits"]["unconfirmed"]]
+        rate = entities / llm * 60
+        baseline = baseline or rate
+        print(f"{policy:<17} {entities:>9.0f} {llm:>8.0f} {rate:>7.2f} {rate / baseline - 1:>+5.0%} {expired:>8.0f} "
+              f"{max(r['worst_run'] for r in runs):>13}  "
+              f"{percentile(confirmed, .5):>19.1f}/{percentile(confirmed, .99):<6.1f} "
+              f"{percentile(unconfirmed, .5):>5.1f}/{percentile(unconfirmed, .99):.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
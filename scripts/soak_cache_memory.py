@@ -0,0 +1,137 @@
+"""
+Soak test for byte-aware TtlLruCache eviction (memory_budget.py).
+
+Simulates per-session state with a skewed size distribution: session turn
+counts follow a Pareto law, so most conversations are short and a few are
+very long. Each turn grows the session's transcript in place (as the agent
+memory does) and re-measures it with resize(). Two caches mirror the app's
+session caches (agent state and intel records).
+
+Modes, each in a fresh subprocess so RSS is not shared:
+  count   entry-count limit only (the previous behaviour)
+  budget  same count limit, plus one shared MemoryBudget of --budget-mb
+
+Reports peak and final RSS (/proc/self/statm), the caches' own byte
+accounting, hit rate and evictions by trigger (count, max_bytes, budget).
+
+Usage:
+    python scripts/soak_cache_memory.py [--sessions 3000] [--maxsize 2000] [--budget-mb 8]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE
+
+
+def run_mode(args) -> dict:
+    from app.controllers.Agents.utils.memory_budget import MemoryBudget, deep_sizeof
+    from app.controllers.Agents.utils.ttl_lruCache import TtlLruCache
+
+    budget = MemoryBudget(int(args.budget_mb * 2**20), "soak") if args.mode == "budget" else None
+    sizer = deep_sizeof if budget is not None else None
+    state = TtlLruCache(maxsize=args.maxsize, ttl_seconds=3600, sizer=sizer, budget=budget)
+    intel = TtlLruCache(maxsize=args.maxsize, ttl_seconds=3600, sizer=sizer, budget=budget)
+
+    rng = random.Random(args.seed)
+    line = "scammer: please share the OTP sent to your registered mobile number now " * 2
+    active = []
+    started = 0
+    peak = base = rss()
+    turns = 0
+    hits = misses = 0
+    t0 = time.perf_counter()
+    while started < args.sessions or active:
+        # Keep --concurrent conversations interleaved; new ones start as old ones end
+        while len(active) < args.concurrent and started < args.sessions:
+            length = min(int(rng.paretovariate(args.alpha) * 4), args.max_turns)
+            active.append([f"s{started}", length])
+            started += 1
+        slot = rng.randrange(len(active))
+        session_id, remaining = active[slot]
+        memory = state.get(session_id)
+        if memory is None:
+            misses += 1
+            memory = {"history": [], "notes": {}}
+            state.set(session_id, memory)
+        else:
+            hits += 1
+        memory["history"].append(f"{line} #{turns}")
+        memory["history"].append(f"user: which number do you mean? #{turns}")
+        state.resize(session_id)
+        record = intel.get(session_id) or {"upi": [], "phones": []}
+        if turns % 3 == 0:
+            record["phones"].append(f"+91{rng.randrange(10**9, 10**10)}")
+        intel.set(session_id, record)
+        turns += 1
+        if remaining <= 1:
+            active.pop(slot)
+        else:
+            active[slot][1] = remaining - 1
+        if turns % 500 == 0:
+            peak = max(peak, rss())
+    elapsed = time.perf_counter() - t0
+    evictions = {"count": 0, "max_bytes": 0, "budget": 0}
+    for cache in (state, intel):
+        evictions["budget"] += cache.stats["budget_evictions"]
+        evictions["max_bytes"] += cache.stats["size_evictions"]
+        evictions["count"] += cache.stats["evictions"] - cache.stats["budget_evictions"] - cache.stats["size_evictions"]
+    accounted = deep_sizeof(state._store, max_objects=10**8) + deep_sizeof(intel._store, max_objects=10**8)
+    return {
+        "mode": args.mode, "turns": turns, "seconds": elapsed,
+        "peak_rss_mb": (peak - base) / 2**20, "final_rss_mb": (rss() - base) / 2**20,
+        "cache_mb": accounted / 2**20, "tracked_mb": (state.bytes + intel.bytes) / 2**20,
+        "entries": len(state) + len(intel), "hit_rate": hits / max(1, hits + misses), "evictions": evictions,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--concurrent", type=int, default=300, help="conversations in flight at once")
+    parser.add_argument("--maxsize", type=int, default=2000, help="entry limit of each cache")
+    parser.add_argument("--budget-mb", type=float, default=8.0)
+    parser.add_argument("--alpha", type=float, default=1.2, help="Pareto shape of session length (smaller: heavier tail)")
+    parser.add_argument("--max-turns", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=("count", "budget"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args)))
+        return 0
+
+    results = []
+    for mode in ("count", "budget"):
+        out = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode],
+                             check=True, capture_output=True, text=True, env=dict(os.environ, LOG_LEVEL="ERROR"))
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.sessions} sessions (Pareto alpha {args.alpha}), {args.concurrent} concurrent, "
+          f"maxsize {args.maxsize} per cache, budget {args.budget_mb:.0f} MB\n")
+    header = (f"{'mode':<7} {'turns':>7} {'s':>6} {'peak RSS MB':>12} {'final RSS MB':>13} {'cached MB':>10} "
+              f"{'tracked MB':>11} {'entries':>8} {'hit rate':>9}  evictions count/max_bytes/budget")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        e = r["evictions"]
+        print(f"{r['mode']:<7} {r['turns']:>7} {r['seconds']:>6.1f} {r['peak_rss_mb']:>12.1f} {r['final_rss_mb']:>13.1f} "
+              f"{r['cache_mb']:>10.1f} {r['tracked_mb']:>11.1f} {r['entries']:>8} {r['hit_rate']:>9.1%}  "
+              f"{e['count']}/{e['max_bytes']}/{e['budget']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Soak test and leak detector for the AgentManager lifecycle (register.py,
+cleanupAgentResources.py, TtlLruCache cleanup).
+
+Churns --sessions sessions through the real turn path (routes.run_agent_turn
+with the mock agent, intel store and callbacks to a local CallbackStub),
+--concurrent at a time, each for 1-6 turns. Managers leave the cache every
+way the app removes them:
+
+  evicted         LRU beyond --maxsize entries
+  expired         TTL (--ttl-s), found by periodic sweeps as in
+                  cleanup_managers_background_task
+  deleted         expire_session_manager() on the event loop (--delete share)
+  thread-deleted  expire_session_manager() from a worker thread, as a cache
+                  removal triggered inside a sync tool running in
+                  asyncio.to_thread would do (--thread-delete share)
+  shutdown        the lifespan's close_managers() at the end
+
+Every manager is a counting subclass of the mock AgentManager with a
+document_store whose async cleanup() is counted too, and is tracked with a
+weakref finalizer. At the end (after close_managers() and gc.collect())
+reported are:
+
+- cleanup calls per manager, for manager.cleanup() and
+  document_store.cleanup(): how many managers got 0, 1, 2, ... calls
+  (exactly one of each is correct), by the way they left the cache;
+- residual managers: still alive although no cache holds them, with the
+  types referring to the first one;
+- checkpoints every --checkpoint sessions: RSS, tracemalloc traced memory,
+  managers alive, cache entries, cleanup tasks pending, plus the RSS and
+  traced growth per 10k sessions after the warm-up (the first --warmup share
+  of the sessions);
+- the --top allocation sites that grew most between the end of the warm-up
+  and the end, this script's own ledger left out (tracemalloc;
+  --no-tracemalloc runs about four times as fast). The traced column does
+  include the ledger, which grows by a few hundred bytes per manager.
+
+How many managers are evicted rather than expired depends on throughput:
+slower runs (tracemalloc) let the TTL expire managers before LRU pressure
+evicts them, including managers of sessions between turns, which are then
+created again.
+
+Exit status 1 if any manager was not cleaned up exactly once or leaked.
+
+Usage:
+    python scripts/soak_manager_lifecycle.py [--sessions 20000] [--concurrent 60] [--maxsize 100] [--ttl-s 0.3]
+"""
+import argparse
+import asyncio
+import collections
+import gc
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import weakref
+from typing import Any, Counter, Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+ENDINGS = ("evicted", "expired", "deleted", "thread-deleted", "shutdown")
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE
+
+
+class Ledger:
+    """Per-manager lifecycle counts, keyed by a serial number (managers are never referenced)."""
+
+    def __init__(self):
+        self.serials = itertools.count()
+        self.created = 0
+        self.finalized = 0
+        self.cleanups: Counter[int] = collections.Counter()
+        self.store_cleanups: Counter[int] = collections.Counter()
+        self.ending: Dict[int, str] = {}
+        self.alive: "weakref.WeakValueDictionary[int, Any]" = weakref.WeakValueDictionary()
+
+    def on_finalize(self) -> None:
+        self.finalized += 1
+
+
+LEDGER = Ledger()
+
+
+def make_manager_cls():
+    from app.controllers.Agents.register import _MockAgentManager
+
+    class SoakDocumentStore:
+        __slots__ = ("serial",)
+
+        def __init__(self, serial: int):
+            self.serial = serial
+
+        async def cleanup(self) -> None:
+            await asyncio.sleep(0)  # like a vector store call: suspends at least once
+            LEDGER.store_cleanups[self.serial] += 1
+
+    class SoakManager(_MockAgentManager):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.serial = next(LEDGER.serials)
+            self.document_store = SoakDocumentStore(self.serial)
+            LEDGER.created += 1
+            LEDGER.alive[self.serial] = self
+            weakref.finalize(self, LEDGER.on_finalize)
+
+        def cleanup(self) -> None:
+            LEDGER.cleanups[self.serial] += 1
+            super().cleanup()
+
+    return SoakManager
+
+
+def census(*type_names: str) -> Dict[str, int]:
+    counts = dict.fromkeys(type_names, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+async def soak(args) -> int:
+    from app.api import routes
+    from app.controllers.Agents import register
+    from app.controllers.Agents.utils import cleanupAgentResources
+    from app.controllers.Agents.utils.ttl_lruCache import REASON_EVICTED, REASON_EXPIRED
+    from app.core import session_intel_store, tracing
+    from app.models.context import UserContext
+    from scripts.loadtest.mock_agent import make_mock_factory
+    from scripts.loadtest.sessions import generate_sessions
+
+    register._AGENT_MANAGER_CLS = make_manager_cls()
+    register.register_agent_factory("HONEYPOT", make_mock_factory(0, seed=args.seed))
+    cache = register._MANAGER_CACHE
+    cache.maxsize = args.maxsize
+    cache.ttl = args.ttl_s
+    reasons = {REASON_EVICTED: "evicted", REASON_EXPIRED: "expired"}
+
+    def on_removed(_session_id: str, manager: Any, reason: str) -> None:
+        LEDGER.ending.setdefault(manager.serial, reasons.get(reason, "?"))
+
+    cache.add_listener(on_removed)
+    rng = random.Random(args.seed)
+    scripts = generate_sessions(1000, turns=6, benign_ratio=0.2, seed=args.seed)
+    sessions = iter(range(args.sessions))
+    checkpoints: List[Dict[str, Any]] = []
+    base_rss = rss()
+    t0 = time.perf_counter()
+    warm_snapshot: Optional[str] = None  # dumped to a file: held in memory it would inflate RSS
+
+    def checkpoint(done: int) -> None:
+        nonlocal warm_snapshot
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        checkpoints.append({
+            "sessions": done, "seconds": time.perf_counter() - t0, "rss_mb": (rss() - base_rss) / 2**20,
+            "traced_mb": traced / 2**20, "alive": LEDGER.created - LEDGER.finalized, "cached": len(cache),
+            "intel": len(session_intel_store._SESSION_INTEL_STORE),
+            "pending": len(getattr(cleanupAgentResources, "_PENDING_CLEANUPS", ())),
+        })
+        if warm_snapshot is None and done >= args.warmup * args.sessions and tracemalloc.is_tracing():
+            warm_snapshot = os.path.join(tempfile.mkdtemp(prefix="soak-"), "warm.tracemalloc")
+            tracemalloc.take_snapshot().dump(warm_snapshot)
+            gc.collect()
+
+    async def talk(index: int) -> None:
+        script = scripts[index % len(scripts)]
+        session_id = f"soak-{index:07d}"
+        ctx = UserContext.model_construct(session_id=session_id, metadata={"channel": "SMS"})
+        history: List[str] = []
+        for text in script.messages[:rng.randint(1, len(script.messages))]:
+            result = await routes.run_agent_turn(ctx, text, history, tracing.start_trace())
+            history += [routes.format_history_line("scammer", text), routes.format_history_line("user", result.reply)]
+        ending = rng.random()
+        manager = cache._store.get(session_id, (None, None))[1]
+        if ending < args.delete:
+            if manager is not None:
+                LEDGER.ending[manager.serial] = "deleted"
+            register.expire_session_manager(session_id)
+        elif ending < args.delete + args.thread_delete:
+            if manager is not None:
+                LEDGER.ending[manager.serial] = "thread-deleted"
+            await asyncio.to_thread(register.expire_session_manager, session_id)
+
+    async def worker() -> None:
+        for index in sessions:
+            await talk(index)
+            done = index + 1
+            if done % args.checkpoint == 0:
+                checkpoint(done)
+
+    async def sweeper() -> None:
+        while True:
+            await asyncio.sleep(args.sweep_s)
+            cache.sweep()
+
+    sweep_task = asyncio.create_task(sweeper())
+    await asyncio.gather(*(worker() for _ in range(args.concurrent)))
+    sweep_task.cancel()
+
+    in_cache = {manager.serial for _, manager in cache.items()}
+    for serial in in_cache:
+        LEDGER.ending.setdefault(serial, "shutdown")
+    shutdown = await register.close_managers(concurrency=8, timeout=30.0)
+    await asyncio.sleep(0.1)  # cleanups cancelled or scheduled late
+    session_intel_store.close_final_callbacks(10.0)
+    checkpoint(args.sessions)
+    final_snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+    return report(args, checkpoints, shutdown, warm_snapshot, final_snapshot)
+
+
+def report(args, checkpoints, shutdown, warm_snapshot, final_snapshot) -> int:
+    print(f"{args.sessions} sessions, {args.concurrent} concurrent, manager cache maxsize {args.maxsize}, "
+          f"TTL {args.ttl_s}s (sweep every {args.sweep_s}s), delete {args.delete:.0%}, "
+          f"thread delete {args.thread_delete:.0%}\n")
+    header = (f"{'sessions':>9} {'s':>7} {'RSS MB':>8} {'traced MB':>10} {'alive':>7} {'cached':>7} "
+              f"{'intel':>6} {'pending':>8}")
+    print(header)
+    print("-" * len(header))
+    for c in checkpoints:
+        print(f"{c['sessions']:>9} {c['seconds']:>7.1f} {c['rss_mb']:>8.1f} {c['traced_mb']:>10.2f} {c['alive']:>7} "
+              f"{c['cached']:>7} {c['intel']:>6} {c['pending']:>8}")
+    warm = [c for c in checkpoints[:-1] if c["sessions"] >= args.warmup * args.sessions]
+    if len(warm) > 1:
+        # A one-off step (allocator arenas) shows in the first figure only; a leak in both
+        print()
+        for label, rows in (("after warm-up", warm), ("second half", warm[len(warm) // 2:])):
+            first, last = rows[0], rows[-1]  # the last row (after shutdown) is left out
+            per = 10_000 / max(1, last["sessions"] - first["sessions"])
+            print(f"growth {label}: RSS {(last['rss_mb'] - first['rss_mb']) * per:+.2f} MB, "
+                  f"traced {(last['traced_mb'] - first['traced_mb']) * per:+.2f} MB per 10k sessions")
+    print(f"shutdown close_managers(): {shutdown}")
+
+    print(f"\nmanagers created {LEDGER.created}, finalized {LEDGER.finalized}")
+    header = f"{'left the cache by':<17} {'managers':>9}   manager.cleanup() calls   document_store.cleanup() calls"
+    print(header)
+    print("-" * len(header))
+    failures = 0
+    for ending in ENDINGS + ("?",):
+        serials = [serial for serial, how in LEDGER.ending.items() if how == ending]
+        if not serials:
+            continue
+        calls = collections.Counter(LEDGER.cleanups[serial] for serial in serials)
+        store_calls = collections.Counter(LEDGER.store_cleanups[serial] for serial in serials)
+        failures += sum(n for count, n in calls.items() if count != 1)
+        failures += sum(n for count, n in store_calls.items() if count != 1)
+        fmt = lambda counts: "  ".join(f"{count}x: {n}" for count, n in sorted(counts.items()))
+        print(f"{ending:<17} {len(serials):>9}   {fmt(calls):<24}  {fmt(store_calls)}")
+    never_left = LEDGER.created - len(LEDGER.ending)
+    if never_left:
+        print(f"{'(never removed)':<17} {never_left:>9}")
+        failures += never_left
+
+    gc.collect()
+    residual = list(LEDGER.alive.values())
+    print(f"\nresidual managers (alive, in no cache): {len(residual)}")
+    if residual:
+        failures += len(residual)
+        referrers = collections.Counter(type(r).__name__ for r in gc.get_referrers(residual[0]))
+        print(f"  referrers of the first: {dict(referrers)}")
+    del residual
+    print(f"objects by type at the end: {census('SoakManager', 'MockHoneypotAgent', 'SoakDocumentStore', 'Task')}")
+
+    if warm_snapshot is not None and final_snapshot is not None:
+        print(f"\ntop {args.top} allocation sites by growth since warm-up:")
+        own = [tracemalloc.Filter(False, __file__)]  # the ledger grows per manager by design
+        warm = tracemalloc.Snapshot.load(warm_snapshot).filter_traces(own)
+        for stat in final_snapshot.filter_traces(own).compare_to(warm, "lineno")[:args.top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7} blocks  "
+                  f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno}")
+    print(f"\n{'FAIL' if failures else 'OK'}: {failures} managers not cleaned up exactly once or leaked")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--concurrent", type=int, default=60)
+    parser.add_argument("--maxsize", type=int, default=100, help="manager cache entries (the app's limit)")
+    parser.add_argument("--ttl-s", type=float, default=0.3, help="manager cache TTL")
+    parser.add_argument("--sweep-s", type=float, default=0.1)
+    parser.add_argument("--delete", type=float, default=0.2, help="share of sessions deleted on the loop")
+    parser.add_argument("--thread-delete", type=float, default=0.1, help="share deleted from a worker thread")
+    parser.add_argument("--checkpoint", type=int, default=2000)
+    parser.add_argument("--warmup", type=float, default=0.25, help="share of sessions before growth is measured")
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    from scripts.loadtest.callback_stub import CallbackStub
+    callbacks = CallbackStub().start()
+    os.environ.update({
+        "API_KEY": "soak-key",
+        "GUVI_CALLBACK_URL": callbacks.url,
+        "LOG_LEVEL": "CRITICAL",
+        "TRACING_ENABLED": "false",
+        "PREFILTER_ENABLED": "false",
+        "LLM_TURN_CONCURRENCY": "0",
+    })
+    if not args.no_tracemalloc:
+        tracemalloc.start(1)
+    return asyncio.run(soak(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
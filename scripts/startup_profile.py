@@ -0,0 +1,114 @@
+"""
+Cold-start profile for the API process.
+
+1. Import-time profile of `app.main` (python -X importtime), top modules by
+   cumulative time.
+2. Time-to-ready of a fresh uvicorn process (spawn -> first 200 on `/`) and the
+   latency of the first /analyze turn, for the default eager startup and for
+   FAST_START=true (deferred imports, background pre-warm).
+
+Usage:
+    python scripts/startup_profile.py [--runs 3] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def import_profile(top: int) -> None:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    total = next((c for c, _, n in rows if n.strip() == "app.main"), 0)
+    print(f"=== import app.main: {total / 1000:.1f} ms cumulative")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_time, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {self_time / 1000:>9.1f}  {name}")
+
+
+def _get(url: str, timeout: float = 1.0) -> int:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status
+
+
+def _post_analyze(base: str) -> float:
+    body = json.dumps({
+        "sessionId": f"startup-{time.time_ns()}",
+        "message": {"sender": "scammer", "text": "Hello, is this Priya?", "timestamp": 1769000000000},
+        "conversationHistory": [],
+    }).encode()
+    request = urllib.request.Request(
+        f"{base}/api/v1/analyze", data=body, method="POST",
+        headers={"Content-Type": "application/json", "x-api-key": "startup-profile"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def time_to_ready(fast_start: bool, port: int) -> tuple:
+    env = dict(os.environ, FAST_START=str(fast_start).lower(), API_KEY="startup-profile",
+               GUVI_CALLBACK_URL="http://127.0.0.1:9/unused", TRACING_ENABLED="false")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            try:
+                if _get(f"{base}/") == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            if time.perf_counter() - start > 60:
+                raise RuntimeError("server not ready after 60s")
+            time.sleep(0.005)
+        ready = time.perf_counter() - start
+        first_turn = _post_analyze(base)
+        return ready, first_turn
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+
+    print(f"\n=== time-to-ready over {args.runs} run(s) (median)")
+    print(f"{'mode':<22} {'ready ms':>10} {'first /analyze ms':>18}")
+    for label, fast in (("eager (default)", False), ("FAST_START=true", True)):
+        results = [time_to_ready(fast, args.port) for _ in range(args.runs)]
+        ready = statistics.median(r[0] for r in results)
+        first = statistics.median(r[1] for r in results)
+        print(f"{label:<22} {ready * 1000:>10.1f} {first * 1000:>18.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 import requests
 import json
+import os
 import time
 
 BASE_URL = "http://127.0.0.1:8000/api/v1"
 
+HEADERS = {"x-api-key": os.getenv("API_KEY", "YOUR_SECRET_API_KEY")}
+
 def test_analyze_endpoint():
     print("Testing /analyze endpoint...")
     url = f"{BASE_URL}/analyze"
@@ -24,13 +27,15 @@ def test_analyze_endpoint():
     }
     
     try:
-        response = requests.post(url, json=payload)
+        response = requests.post(url, json=payload, headers=HEADERS)
         response.raise_for_status()
         data = response.json()
         print("Response:", json.dumps(data, indent=2))
         
-        assert data["scamDetected"] == True
-        print("✅ /analyze test passed (Scam Detected)")
+        # AnalysisResponse is {status, reply}; intel is reported via the GUVI callback
+        assert data["status"] == "success"
+        assert data["reply"]
+        print("✅ /analyze test passed (Scam Message)")
     except Exception as e:
         print(f"❌ /analyze test failed: {e}")
 
@@ -49,12 +54,13 @@ def test_safe_message():
     }
     
     try:
-        response = requests.post(url, json=payload)
+        response = requests.post(url, json=payload, headers=HEADERS)
         response.raise_for_status()
         data = response.json()
         print("Response:", json.dumps(data, indent=2))
         
-        assert data["scamDetected"] == False
+        assert data["status"] == "success"
+        assert data["reply"]
         print("✅ /analyze test passed (Safe Message)")
     except Exception as e:
         print(f"❌ /analyze test failed: {e}")
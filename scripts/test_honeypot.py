@@ -10,13 +10,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from app.models.schemas import AnalysisRequest, AnalysisResponse, Message, Metadata
 from app.controllers.Agents.register import ensure_agent
 from app.models.context import UserContext
-from app.core.execution_context import session_context
+from app.core.execution_context import RequestContext, session_context
 from app.core.session_intel_store import get_session_intel
 
-# Constants for context keys (matching routes.py)
-KEY_SESSION_ID = "session_id"
-KEY_MESSAGE_COUNT = "message_count"
-KEY_METADATA = "metadata"
 
 async def run_analysis(request: AnalysisRequest) -> AnalysisResponse:
     """
@@ -37,13 +33,12 @@ async def run_analysis(request: AnalysisRequest) -> AnalysisResponse:
         # 3. Set Execution Context
         current_msg_count = len(request.conversationHistory) + 1
         
-        token = session_context.set({
-            KEY_SESSION_ID: request.sessionId,
-            KEY_MESSAGE_COUNT: current_msg_count,
-            KEY_METADATA: ctx_metadata,
-            "extracted_intelligence": {},
-            "scam_detected": False
-        })
+        token = session_context.set(RequestContext(
+            session_id=request.sessionId,
+            message_count=current_msg_count,
+            metadata=ctx_metadata,
+            intel=get_session_intel(request.sessionId),
+        ))
         
         # 4. Invoke Agent
         user_message = request.message.text
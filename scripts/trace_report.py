@@ -0,0 +1,123 @@
+"""
+Flame-style breakdown of the slowest traced turns.
+
+Reads the OTLP/JSON lines written by app/core/tracing.py and prints, for the
+N slowest turns, the span tree on a timeline plus an aggregate of self-time
+per span name (router / evaluator / reflector / planner / tools / callback).
+
+Usage:
+    python scripts/trace_report.py --file /path/to/traces.jsonl [--top 10] [--width 60]
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            for resource_spans in record.get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for span in scope_spans.get("spans", []):
+                        span["start"] = int(span["startTimeUnixNano"])
+                        span["end"] = int(span["endTimeUnixNano"])
+                        span["attrs"] = {
+                            a["key"]: next(iter(a["value"].values()), "") for a in span.get("attributes", [])
+                        }
+                        traces[span["traceId"]].append(span)
+    return traces
+
+
+def build_tree(spans: List[Dict[str, Any]]):
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    roots = []
+    ids = {s["spanId"] for s in spans}
+    for s in spans:
+        parent = s.get("parentSpanId")
+        if parent and parent in ids:
+            children[parent].append(s)
+        else:
+            roots.append(s)
+    for kids in children.values():
+        kids.sort(key=lambda s: s["start"])
+    roots.sort(key=lambda s: s["start"])
+    return roots, children
+
+
+def self_time(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]]) -> int:
+    child_total = sum(c["end"] - c["start"] for c in children.get(span["spanId"], []))
+    return max(0, (span["end"] - span["start"]) - child_total)
+
+
+def print_trace(trace_id: str, spans: List[Dict[str, Any]], width: int) -> None:
+    roots, children = build_tree(spans)
+    t0 = min(s["start"] for s in spans)
+    t1 = max(s["end"] for s in spans)
+    total = max(t1 - t0, 1)
+    root_attrs = roots[0]["attrs"] if roots else {}
+    print(f"\n=== trace {trace_id}  session={root_attrs.get('session_id', '?')}  "
+          f"total={total / 1e6:.1f} ms")
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        offset = int((span["start"] - t0) / total * width)
+        length = max(1, int((span["end"] - span["start"]) / total * width))
+        bar = " " * offset + "#" * min(length, width - offset)
+        label = ("  " * depth + span["name"])[:40]
+        duration_ms = (span["end"] - span["start"]) / 1e6
+        error = "  !" if span.get("status", {}).get("code") == 2 else ""
+        print(f"{label:<40} {duration_ms:>9.1f} ms |{bar:<{width}}|{error}")
+        for child in children.get(span["spanId"], []):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", required=True, help="TRACE_EXPORT_PATH of the traced run")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--width", type=int, default=60)
+    args = parser.parse_args()
+
+    try:
+        traces = load_traces(args.file)
+    except FileNotFoundError:
+        print(f"No trace file at {args.file}")
+        return 1
+    if not traces:
+        print("No traces found.")
+        return 0
+
+    def duration(item):
+        spans = item[1]
+        return max(s["end"] for s in spans) - min(s["start"] for s in spans)
+
+    slowest = sorted(traces.items(), key=duration, reverse=True)[:args.top]
+    for trace_id, spans in slowest:
+        print_trace(trace_id, spans, args.width)
+
+    # Aggregate self-time per span name across the slowest turns
+    totals: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    for _, spans in slowest:
+        _, children = build_tree(spans)
+        for s in spans:
+            totals[s["name"]] += self_time(s, children)
+            counts[s["name"]] += 1
+    grand_total = sum(totals.values()) or 1
+    print(f"\n=== self time across {len(slowest)} slowest turn(s)")
+    for name, ns in sorted(totals.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"{name:<32} {ns / 1e6:>10.1f} ms  {ns / grand_total:>6.1%}  ({counts[name]} span(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
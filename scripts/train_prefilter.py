@@ -0,0 +1,176 @@
+"""
+Train and evaluate the scam-intent pre-classifier (app/core/prefilter.py).
+
+Corpus: scripts/data/prefilter_corpus.jsonl ({"text", "label": 1 scam / 0 benign})
+plus the scam openers/pressure lines and benign messages of the load-test
+generator. Logistic regression over featurize() is fitted with SGD (L2);
+the benign threshold is set below the lowest scam score on the training
+set (capped by --threshold-cap), so no training scam is short-circuited.
+
+Reports k-fold precision/recall (positive = escalate to the agent), the
+share of benign first messages skipped, per-message scoring cost, and the
+estimated agent cost saved for a given benign share of traffic; then fits on
+the full corpus and writes model_config/prefilter_model.json.
+
+Usage:
+    python scripts/train_prefilter.py [--folds 5] [--benign-share 0.2] [--agent-seconds 4.0] [--llm-calls 4]
+    python scripts/train_prefilter.py --no-save      # evaluate only
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from app.core.prefilter import DEFAULT_MODEL_PATH, PreClassifier, entity_hits, featurize
+from scripts.loadtest.sessions import BENIGN_MESSAGES, SCENARIOS
+
+CORPUS_PATH = os.path.join(ROOT, "scripts", "data", "prefilter_corpus.jsonl")
+
+Example = Tuple[str, int]
+
+
+def load_corpus(path: str) -> List[Example]:
+    examples: List[Example] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append((row["text"], int(row["label"])))
+    for spec in SCENARIOS.values():
+        examples.extend((text, 1) for text in spec["opening"] + spec["pressure"])
+    examples.extend((text, 0) for text in BENIGN_MESSAGES)
+    # Dedupe, keep order deterministic
+    return list(dict.fromkeys(examples))
+
+
+def train(examples: List[Example], epochs: int, lr: float, l2: float, seed: int) -> Tuple[Dict[int, float], float]:
+    rng = random.Random(seed)
+    data = [(featurize(text), label) for text, label in examples]
+    weights: Dict[int, float] = {}
+    bias = 0.0
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        step = lr / (1.0 + 0.1 * epoch)
+        for features, label in data:
+            z = bias + sum(weights.get(i, 0.0) * v for i, v in features.items())
+            p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+            gradient = p - label
+            bias -= step * gradient
+            for i, v in features.items():
+                w = weights.get(i, 0.0)
+                weights[i] = w - step * (gradient * v + l2 * w)
+    return weights, bias
+
+
+def pick_threshold(model: PreClassifier, examples: List[Example], cap: float) -> float:
+    scam_scores = [model.score(text) for text, label in examples if label == 1]
+    return min(cap, min(scam_scores) * 0.9) if scam_scores else cap
+
+
+def fold_of(text: str, folds: int) -> int:
+    return zlib.crc32(text.encode("utf-8")) % folds
+
+
+def evaluate(examples: List[Example], args) -> Dict[str, float]:
+    """Out-of-fold predictions: escalate (positive) vs short-circuit as benign."""
+    tp = fp = tn = fn = 0
+    for k in range(args.folds):
+        train_set = [e for e in examples if fold_of(e[0], args.folds) != k]
+        test_set = [e for e in examples if fold_of(e[0], args.folds) == k]
+        weights, bias = train(train_set, args.epochs, args.lr, args.l2, args.seed)
+        model = PreClassifier(weights, bias, threshold=0.0)
+        model.threshold = pick_threshold(model, train_set, args.threshold_cap)
+        for text, label in test_set:
+            escalate = not model.is_clearly_benign(text)
+            if escalate and label:
+                tp += 1
+            elif escalate:
+                fp += 1
+            elif label:
+                fn += 1
+            else:
+                tn += 1
+                continue
+            if args.verbose and (escalate != bool(label)):
+                print(f"  misclassified (label={label}, score={model.score(text):.3f}): {text}")
+    return {
+        "precision": tp / (tp + fp) if tp + fp else float("nan"),
+        "recall": tp / (tp + fn) if tp + fn else float("nan"),
+        "benign_skip_rate": tn / (tn + fp) if tn + fp else float("nan"),
+        "scams_short_circuited": fn,
+        "tp": tp, "fp": fp, "tn": tn, "fn": fn,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--output", default=os.path.join(ROOT, DEFAULT_MODEL_PATH))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--lr", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--threshold-cap", type=float, default=0.3, help="never short-circuit above this scam probability")
+    parser.add_argument("--seed", type=int, default=1992)
+    parser.add_argument("--benign-share", type=float, default=0.2, help="share of sessions whose first message is benign")
+    parser.add_argument("--agent-seconds", type=float, default=4.0, help="mean agent time for one turn")
+    parser.add_argument("--llm-calls", type=float, default=4.0, help="LLM calls per agent turn (router/evaluator/reflector/planner)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="print out-of-fold misclassifications")
+    args = parser.parse_args()
+
+    examples = load_corpus(args.corpus)
+    scams = sum(label for _, label in examples)
+    print(f"corpus: {len(examples)} messages ({scams} scam, {len(examples) - scams} benign)")
+
+    report = evaluate(examples, args)
+    print(f"\n=== {args.folds}-fold out-of-fold results (positive = escalate to agent)")
+    print(f"precision {report['precision']:.3f}  recall {report['recall']:.3f}  "
+          f"benign skipped {report['benign_skip_rate']:.1%}  scams short-circuited {report['scams_short_circuited']}")
+    print(f"confusion: tp={report['tp']} fp={report['fp']} tn={report['tn']} fn={report['fn']}")
+
+    weights, bias = train(examples, args.epochs, args.lr, args.l2, args.seed)
+    model = PreClassifier(weights, bias, threshold=0.0)
+    model.threshold = pick_threshold(model, examples, args.threshold_cap)
+
+    texts = [text for text, _ in examples]
+    iterations = max(1, 20_000 // len(texts))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            model.is_clearly_benign(text)
+    score_us = (time.perf_counter() - start) / (iterations * len(texts)) * 1e6
+
+    skipped = args.benign_share * report["benign_skip_rate"]
+    print("\n=== cost (first messages only)")
+    print(f"scoring cost             {score_us:.1f} us/message")
+    print(f"first turns skipped      {skipped:.1%} of sessions (benign share {args.benign_share:.0%})")
+    print(f"agent time saved         {skipped * 1000 * args.agent_seconds:.0f} agent-seconds per 1000 sessions "
+          f"({args.agent_seconds:.1f}s per turn)")
+    print(f"LLM calls saved          {skipped * 1000 * args.llm_calls:.0f} per 1000 sessions "
+          f"(plus {skipped * 1000:.0f} AgentManager builds)")
+    print(f"threshold                {model.threshold:.4f}  non-zero weights {sum(1 for w in weights.values() if abs(w) > 1e-6)}")
+
+    missed = [text for text, label in examples if label and model.is_clearly_benign(text)]
+    if missed:
+        print(f"WARNING: {len(missed)} training scam(s) would be short-circuited")
+    if any(entity_hits(text) for text, label in examples if not label and model.is_clearly_benign(text)):
+        print("WARNING: a short-circuited benign message contains an entity")
+
+    if not args.no_save:
+        model.save(args.output, trained_on=len(examples), folds=args.folds,
+                   cv_precision=round(report["precision"], 4), cv_recall=round(report["recall"], 4))
+        print(f"\nmodel written to {os.path.relpath(args.output, ROOT)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())